@@ -0,0 +1,72 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Conditional GETs of BGPVPN resources
+
+The Neutron API layer does not support If-None-Match requests. This
+middleware sets the revision number of a BGPVPN or of an association as the
+ETag of the response to its GET request, and answers with a 304 Not Modified
+when it matches the If-None-Match header of the request. It is enabled by
+adding it to the Neutron API pipeline in api-paste.ini:
+
+    [filter:bgpvpn_conditional_get]
+    paste.filter_factory = networking_bgpvpn.neutron.api.conditional_get:\
+ConditionalGet.factory
+"""
+
+from neutron_lib.api.definitions import bgpvpn as bgpvpn_api_def
+from oslo_serialization import jsonutils
+import webob.dec
+
+from networking_bgpvpn.neutron.extensions import bgpvpn_revisions
+
+
+class ConditionalGet(object):
+
+    def __init__(self, application):
+        self.application = application
+
+    @classmethod
+    def factory(cls, global_config, **local_config):
+        def _factory(application):
+            return cls(application)
+        return _factory
+
+    @staticmethod
+    def _revision_number(response):
+        if (response.status_int != 200 or
+                response.content_type != 'application/json'):
+            return None
+        try:
+            body = jsonutils.loads(response.body)
+        except ValueError:
+            return None
+        # only single resources have a revision number, not collections
+        if not isinstance(body, dict) or len(body) != 1:
+            return None
+        resource = list(body.values())[0]
+        if not isinstance(resource, dict):
+            return None
+        return resource.get(bgpvpn_revisions.REVISION_NUMBER)
+
+    @webob.dec.wsgify
+    def __call__(self, request):
+        response = request.get_response(self.application)
+        if (request.method != 'GET' or
+                '/%s/' % bgpvpn_api_def.ALIAS not in request.path):
+            return response
+        revision_number = self._revision_number(response)
+        if revision_number is not None:
+            response.etag = str(revision_number)
+            # webob answers with a 304 if the If-None-Match header matches
+            response.conditional_response = True
+        return response
@@ -13,31 +13,58 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import datetime
+import itertools
+
 from oslo_db import exception as db_exc
 from oslo_log import log
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
 from oslo_utils import uuidutils
 import sqlalchemy as sa
+from sqlalchemy.ext import hybrid
 from sqlalchemy import orm
 from sqlalchemy.orm import exc
 
 from neutron.db import _model_query as model_query
 from neutron.db import api as db_api
 from neutron.db import common_db_mixin
+from neutron.db.models import l3
+from neutron.db import models_v2
 
 from neutron_lib.api.definitions import bgpvpn as bgpvpn_def
 from neutron_lib.api.definitions import bgpvpn_routes_control as bgpvpn_rc_def
 from neutron_lib.api.definitions import bgpvpn_vni as bgpvpn_vni_def
+from neutron_lib import constants as const
 from neutron_lib.db import constants as db_const
 from neutron_lib.db import model_base
+from neutron_lib import exceptions as n_exc
 from neutron_lib.plugins import directory
 
+from networking_bgpvpn._i18n import _
 from networking_bgpvpn.neutron.extensions import bgpvpn as bgpvpn_ext
+from networking_bgpvpn.neutron.extensions import bgpvpn_revisions
+from networking_bgpvpn.neutron.extensions import bgpvpn_status
 from networking_bgpvpn.neutron.extensions\
     import bgpvpn_routes_control as bgpvpn_rc_ext
 from networking_bgpvpn.neutron.services.common import utils
 
 LOG = log.getLogger(__name__)
 
+# BGPVPN attributes holding a list of route targets or route distinguishers
+RTRD_KINDS = ('route_targets', 'import_targets', 'export_targets',
+              'route_distinguishers')
+
+# operations recorded in the change log
+CHANGE_OPERATIONS = ('create', 'update', 'delete')
+
+# states of the journal entries: entries are deleted once synced
+JOURNAL_PENDING = 'pending'
+JOURNAL_PROCESSING = 'processing'
+JOURNAL_FAILED = 'failed'
+JOURNAL_STATES = (JOURNAL_PENDING, JOURNAL_PROCESSING, JOURNAL_FAILED)
+
 
 class HasProjectNotNullable(model_base.HasProject):
 
@@ -46,10 +73,25 @@ class HasProjectNotNullable(model_base.HasProject):
                            nullable=False)
 
 
+class HasRevisionNumber(object):
+    """Revision number, bumped by every flush changing a resource
+
+    See _bump_revision_numbers.
+    """
+
+    revision_number = sa.Column(sa.BigInteger(), nullable=False,
+                                default=0, server_default='0')
+
+
 class BGPVPNNetAssociation(model_base.BASEV2, model_base.HasId,
-                           HasProjectNotNullable):
+                           HasProjectNotNullable, HasRevisionNumber):
     """Represents the association between a bgpvpn and a network."""
     __tablename__ = 'bgpvpn_network_associations'
+    __table_args__ = (
+        sa.UniqueConstraint('bgpvpn_id', 'network_id'),
+        sa.Index('ix_bgpvpn_network_associations_network_id_bgpvpn_id',
+                 'network_id', 'bgpvpn_id', unique=True),
+    )
 
     bgpvpn_id = sa.Column(sa.String(36),
                           sa.ForeignKey('bgpvpns.id', ondelete='CASCADE'),
@@ -57,17 +99,24 @@ class BGPVPNNetAssociation(model_base.BASEV2, model_base.HasId,
     network_id = sa.Column(sa.String(36),
                            sa.ForeignKey('networks.id', ondelete='CASCADE'),
                            nullable=False)
-    sa.UniqueConstraint(bgpvpn_id, network_id)
+    # associated Neutron resources are not loaded along with association
+    # rows, which only need their ids: queries needing these resources opt
+    # in, e.g. with .options(orm.joinedload(BGPVPNNetAssociation.network))
     network = orm.relationship("Network",
                                backref=orm.backref('bgpvpn_associations',
                                                    cascade='all'),
-                               lazy='joined',)
+                               lazy='select',)
 
 
 class BGPVPNRouterAssociation(model_base.BASEV2, model_base.HasId,
-                              HasProjectNotNullable):
+                              HasProjectNotNullable, HasRevisionNumber):
     """Represents the association between a bgpvpn and a router."""
     __tablename__ = 'bgpvpn_router_associations'
+    __table_args__ = (
+        sa.UniqueConstraint('bgpvpn_id', 'router_id'),
+        sa.Index('ix_bgpvpn_router_associations_router_id_bgpvpn_id',
+                 'router_id', 'bgpvpn_id', unique=True),
+    )
 
     bgpvpn_id = sa.Column(sa.String(36),
                           sa.ForeignKey('bgpvpns.id', ondelete='CASCADE'),
@@ -75,19 +124,23 @@ class BGPVPNRouterAssociation(model_base.BASEV2, model_base.HasId,
     router_id = sa.Column(sa.String(36),
                           sa.ForeignKey('routers.id', ondelete='CASCADE'),
                           nullable=False)
-    sa.UniqueConstraint(bgpvpn_id, router_id)
     advertise_extra_routes = sa.Column(sa.Boolean(), nullable=False,
                                        server_default=sa.true())
     router = orm.relationship("Router",
                               backref=orm.backref('bgpvpn_associations',
                                                   cascade='all'),
-                              lazy='joined',)
+                              lazy='select',)
 
 
 class BGPVPNPortAssociation(model_base.BASEV2, model_base.HasId,
-                            HasProjectNotNullable):
+                            HasProjectNotNullable, HasRevisionNumber):
     """Represents the association between a bgpvpn and a port."""
     __tablename__ = 'bgpvpn_port_associations'
+    __table_args__ = (
+        sa.UniqueConstraint('bgpvpn_id', 'port_id'),
+        sa.Index('ix_bgpvpn_port_associations_port_id_bgpvpn_id',
+                 'port_id', 'bgpvpn_id', unique=True),
+    )
 
     bgpvpn_id = sa.Column(sa.String(36),
                           sa.ForeignKey('bgpvpns.id', ondelete='CASCADE'),
@@ -95,13 +148,12 @@ class BGPVPNPortAssociation(model_base.BASEV2, model_base.HasId,
     port_id = sa.Column(sa.String(36),
                         sa.ForeignKey('ports.id', ondelete='CASCADE'),
                         nullable=False)
-    sa.UniqueConstraint(bgpvpn_id, port_id)
     advertise_fixed_ips = sa.Column(sa.Boolean(), nullable=False,
                                     server_default=sa.true())
     port = orm.relationship("Port",
                             backref=orm.backref('bgpvpn_associations',
                                                 cascade='all'),
-                            lazy='joined',)
+                            lazy='select',)
     routes = orm.relationship("BGPVPNPortAssociationRoute",
                               backref="bgpvpn_port_associations")
 
@@ -113,7 +165,8 @@ class BGPVPNPortAssociationRoute(model_base.BASEV2, model_base.HasId):
     port_association_id = sa.Column(
         sa.String(length=36),
         sa.ForeignKey('bgpvpn_port_associations.id', ondelete='CASCADE'),
-        nullable=False)
+        nullable=False,
+        index=True)
     type = sa.Column(sa.Enum(*bgpvpn_rc_def.ROUTE_TYPES,
                              name="bgpvpn_port_assoc_route_type"),
                      nullable=False)
@@ -125,34 +178,112 @@ class BGPVPNPortAssociationRoute(model_base.BASEV2, model_base.HasId):
     # bgpvpn_id is NULL unless type is 'bgpvpn'
     bgpvpn_id = sa.Column(sa.String(length=36),
                           sa.ForeignKey('bgpvpns.id', ondelete='CASCADE'),
-                          nullable=True)
+                          nullable=True,
+                          index=True)
 
     port_association = orm.relationship(
         "BGPVPNPortAssociation",
         backref=orm.backref('port_association_routes',
                             cascade='all'),
-        lazy='joined')
+        lazy='select')
     bgpvpn = orm.relationship(
         "BGPVPN",
         backref=orm.backref("port_association_routes",
                             uselist=False,
                             lazy='select',
                             cascade='all, delete-orphan'),
-        lazy='joined')
+        lazy='select')
+
 
+class BGPVPNRouteTarget(model_base.BASEV2):
+    """Represents an item of a route target or route distinguisher list."""
+    __tablename__ = 'bgpvpn_route_targets'
 
-class BGPVPN(model_base.BASEV2, model_base.HasId, model_base.HasProject):
+    bgpvpn_id = sa.Column(sa.String(36),
+                          sa.ForeignKey('bgpvpns.id', ondelete='CASCADE'),
+                          primary_key=True)
+    kind = sa.Column(sa.Enum(*RTRD_KINDS, name="bgpvpn_route_target_kind"),
+                     primary_key=True)
+    value = sa.Column(sa.String(64), primary_key=True, index=True)
+    # position of the value in its list, to preserve the ordering
+    position = sa.Column(sa.Integer, nullable=False)
+
+
+class _RTRDComparator(hybrid.Comparator):
+    """Comparator for the route target/distinguisher lists of BGPVPNs
+
+    BGPVPN.<kind>.in_(values) matches the BGPVPNs having any of the values
+    in their <kind> list, with an EXISTS subquery relying on the
+    bgpvpn_route_targets index on values. This is what the neutron filters
+    on these attributes translate to.
+    """
+
+    def __init__(self, kind):
+        super(_RTRDComparator, self).__init__(BGPVPNRouteTarget.value)
+        self.kind = kind
+
+    def in_(self, values):
+        return sa.exists().where(sa.and_(
+            BGPVPNRouteTarget.bgpvpn_id == BGPVPN.id,
+            BGPVPNRouteTarget.kind == self.kind,
+            BGPVPNRouteTarget.value.in_(values)))
+
+
+def _rtrd_hybrid_property(kind):
+    """Comma-joined string view of a route target/distinguisher list
+
+    This preserves the interface of the former bgpvpns string columns for
+    consumers of the BGPVPN model, the list itself being stored in
+    bgpvpn_route_targets.
+    """
+
+    def fget(self):
+        return utils.rtrd_list2str(rtrd_values(self, kind))
+
+    def fset(self, value):
+        existing = dict((entry.value, entry)
+                        for entry in self.route_target_entries
+                        if entry.kind == kind)
+        entries = [entry for entry in self.route_target_entries
+                   if entry.kind != kind]
+        for position, item in enumerate(utils.rtrd_str2list(value)):
+            entry = existing.get(item) or BGPVPNRouteTarget(kind=kind,
+                                                            value=item)
+            entry.position = position
+            entries.append(entry)
+        self.route_target_entries = entries
+
+    fget.__name__ = kind
+    prop = hybrid.hybrid_property(fget, fset)
+    return prop.comparator(lambda cls: _RTRDComparator(kind))
+
+
+def rtrd_values(bgpvpn_db, kind):
+    """Return the route target or route distinguisher list of a BGPVPN"""
+    return [entry.value for entry in bgpvpn_db.route_target_entries
+            if entry.kind == kind]
+
+
+class BGPVPN(model_base.BASEV2, model_base.HasId, model_base.HasProject,
+             HasRevisionNumber):
     """Represents a BGPVPN Object."""
     name = sa.Column(sa.String(255))
     type = sa.Column(sa.Enum("l2", "l3",
                              name="bgpvpn_type"),
                      nullable=False)
-    route_targets = sa.Column(sa.String(255), nullable=False)
-    import_targets = sa.Column(sa.String(255), nullable=True)
-    export_targets = sa.Column(sa.String(255), nullable=True)
-    route_distinguishers = sa.Column(sa.String(255), nullable=True)
+    route_targets = _rtrd_hybrid_property('route_targets')
+    import_targets = _rtrd_hybrid_property('import_targets')
+    export_targets = _rtrd_hybrid_property('export_targets')
+    route_distinguishers = _rtrd_hybrid_property('route_distinguishers')
     vni = sa.Column(sa.Integer, nullable=True)
     local_pref = sa.Column(sa.BigInteger, nullable=True)
+    status = sa.Column(sa.String(16), nullable=False,
+                       server_default=const.ACTIVE)
+    route_target_entries = orm.relationship(
+        "BGPVPNRouteTarget",
+        order_by="BGPVPNRouteTarget.position",
+        lazy='select',
+        cascade='all, delete-orphan')
     network_associations = orm.relationship("BGPVPNNetAssociation",
                                             backref="bgpvpn",
                                             lazy='select',
@@ -166,28 +297,307 @@ class BGPVPN(model_base.BASEV2, model_base.HasId, model_base.HasProject):
                                          lazy='select',
                                          cascade='all, delete-orphan')
 
+    @property
+    def _extra_keys(self):
+        return list(RTRD_KINDS)
+
+
+_ASSOC_MODELS = (BGPVPNNetAssociation, BGPVPNRouterAssociation,
+                 BGPVPNPortAssociation)
+
+
+def _bump_revision_numbers(session, flush_context, instances):
+    """Bump the revision numbers of the resources changed by a flush
+
+    The revision number of an association is bumped when it is updated,
+    which includes changes of the routes of a port association, and the
+    revision number of a BGPVPN is bumped once per flush when it is
+    updated, or when any of its associations is created, updated or
+    deleted.
+
+    The BGPVPNs only changed through their associations are bumped with a
+    single UPDATE, without loading them, and their change is logged from
+    a SELECT.
+    """
+    bumped_bgpvpn_ids = set()
+    assoc_bgpvpn_ids = set()
+    for obj in session.dirty:
+        if (not isinstance(obj, _ASSOC_MODELS + (BGPVPN,)) or
+                not session.is_modified(obj)):
+            continue
+        obj.revision_number += 1
+        if isinstance(obj, BGPVPN):
+            bumped_bgpvpn_ids.add(obj.id)
+        else:
+            assoc_bgpvpn_ids.add(obj.bgpvpn_id)
+    assoc_bgpvpn_ids.update(
+        obj.bgpvpn_id for obj in itertools.chain(session.new, session.deleted)
+        if isinstance(obj, _ASSOC_MODELS))
+    bumped_bgpvpn_ids.update(obj.id for obj in session.deleted
+                             if isinstance(obj, BGPVPN))
+    bgpvpn_ids = assoc_bgpvpn_ids - bumped_bgpvpn_ids
+    if not bgpvpn_ids:
+        return
+    criterion = BGPVPN.id.in_(bgpvpn_ids)
+    session.query(BGPVPN).filter(criterion).update(
+        {'revision_number': BGPVPN.revision_number + 1},
+        synchronize_session=False)
+    _log_changes_from_select(session, BGPVPN, 'update', criterion)
+    # the revision numbers of the BGPVPNs of the session are reloaded
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, BGPVPN) and obj.id in bgpvpn_ids:
+            session.expire(obj, ['revision_number'])
+
+
+sa.event.listen(orm.Session, 'before_flush', _bump_revision_numbers)
+
+
+class BGPVPNChange(model_base.BASEV2):
+    """Represents an entry of the log of changes of BGPVPNs and associations
+
+    Entries are written in the transaction of the change they record, and
+    their ids give their ordering, used by consumers as a cursor.
+    """
+    __tablename__ = 'bgpvpn_changes'
+
+    id = sa.Column(sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                   primary_key=True, autoincrement=True)
+    resource_type = sa.Column(sa.String(32), nullable=False)
+    resource_id = sa.Column(sa.String(36), nullable=False)
+    bgpvpn_id = sa.Column(sa.String(36), nullable=False, index=True)
+    operation = sa.Column(sa.Enum(*CHANGE_OPERATIONS,
+                                  name='bgpvpn_change_operation'),
+                          nullable=False)
+    revision_number = sa.Column(sa.BigInteger(), nullable=False)
+    created_at = sa.Column(sa.DateTime(), nullable=False, index=True)
+
+
+_CHANGE_COLUMNS = ('resource_type', 'resource_id', 'bgpvpn_id', 'operation',
+                   'revision_number', 'created_at')
+
+_RESOURCE_TYPES = {
+    BGPVPN: 'bgpvpn',
+    BGPVPNNetAssociation: 'network_association',
+    BGPVPNRouterAssociation: 'router_association',
+    BGPVPNPortAssociation: 'port_association',
+}
+
+
+def _log_changes(session, flush_context):
+    """Log the changes of BGPVPNs and associations made by a flush
+
+    Runs after the flush, so that the ids of the new resources and their
+    bumped revision numbers are known, and inserts the log entries with a
+    single statement.
+    """
+    changes = [(obj, 'create') for obj in session.new]
+    changes += [(obj, 'update') for obj in session.dirty
+                if type(obj) in _RESOURCE_TYPES and session.is_modified(obj)]
+    changes += [(obj, 'delete') for obj in session.deleted]
+    changes = [(obj, operation) for obj, operation in changes
+               if type(obj) in _RESOURCE_TYPES]
+    if not changes:
+        return
+    # a BGPVPN is logged before the creation of its associations, and after
+    # their deletion
+    changes.sort(key=lambda change: (
+        1 if not isinstance(change[0], BGPVPN) else
+        2 if change[1] == 'delete' else 0))
+    now = timeutils.utcnow()
+    session.execute(BGPVPNChange.__table__.insert(), [
+        {'resource_type': _RESOURCE_TYPES[type(obj)],
+         'resource_id': obj.id,
+         'bgpvpn_id': obj.id if isinstance(obj, BGPVPN) else obj.bgpvpn_id,
+         'operation': operation,
+         'revision_number': obj.revision_number,
+         'created_at': now}
+        for obj, operation in changes])
+
+
+sa.event.listen(orm.Session, 'after_flush', _log_changes)
+
+
+def _log_changes_from_select(session, model, operation, criterion):
+    """Log a change of the rows of model matching criterion
+
+    For changes made with set-based statements, which do not go through
+    the session flushes, the entries are inserted from a SELECT, without
+    loading the changed rows.
+    """
+    select = sa.select([sa.literal(_RESOURCE_TYPES[model]),
+                        model.id,
+                        model.id if model is BGPVPN else model.bgpvpn_id,
+                        sa.literal(operation),
+                        model.revision_number,
+                        sa.literal(timeutils.utcnow())]).where(criterion)
+    session.execute(BGPVPNChange.__table__.insert().from_select(
+        _CHANGE_COLUMNS, select))
+
+
+class BGPVPNJournalEntry(model_base.BASEV2):
+    """Represents a change of a BGPVPN or association to sync to a backend
+
+    Entries are written in the transaction of the change, by the drivers
+    syncing their backend from the journal, and deleted once synced. Their
+    ids give the order in which the entries of a BGPVPN are synced.
+    """
+    __tablename__ = 'bgpvpn_journal'
+    __table_args__ = (
+        sa.Index('ix_bgpvpn_journal_state_next_attempt_at',
+                 'state', 'next_attempt_at'),
+    )
+
+    id = sa.Column(sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                   primary_key=True, autoincrement=True)
+    resource_type = sa.Column(sa.String(32), nullable=False)
+    resource_id = sa.Column(sa.String(36), nullable=False)
+    bgpvpn_id = sa.Column(sa.String(36), nullable=False, index=True)
+    operation = sa.Column(sa.Enum(*CHANGE_OPERATIONS,
+                                  name='bgpvpn_journal_operation'),
+                          nullable=False)
+    data = sa.Column(sa.Text(), nullable=False)
+    state = sa.Column(sa.Enum(*JOURNAL_STATES, name='bgpvpn_journal_state'),
+                      nullable=False)
+    retry_count = sa.Column(sa.Integer(), nullable=False, default=0)
+    # when a pending entry is due, or when the claim of an entry being
+    # processed expires, for instance if its worker died
+    next_attempt_at = sa.Column(sa.DateTime(), nullable=False)
+    created_at = sa.Column(sa.DateTime(), nullable=False)
+
+
+def _enforce_revision_constraint(context, collection, resource):
+    """Enforce the revision number constraint of an If-Match request
+
+    The API sets the revision number given in the If-Match header of an
+    update or delete request as a transaction constraint of the request
+    context. The constraint is consumed here, so that it does not apply to
+    other resources changed in the same transaction.
+    """
+    constraint = context.get_transaction_constraint()
+    if (constraint is None or constraint.resource != collection or
+            constraint.resource_id != resource['id']):
+        return
+    if constraint.if_revision_match != resource['revision_number']:
+        raise bgpvpn_revisions.BGPVPNRevisionNumberConstraintFailed(
+            expected=constraint.if_revision_match,
+            current=resource['revision_number'])
+    context.clear_transaction_constraint()
+
+
+# BGPVPN API fields stored in a column of the bgpvpns table
+_BGPVPN_COLUMN_FIELDS = {
+    'id': 'id',
+    'tenant_id': 'project_id',
+    'project_id': 'project_id',
+    'name': 'name',
+    'type': 'type',
+    'revision_number': 'revision_number',
+    bgpvpn_status.STATUS: 'status',
+    bgpvpn_vni_def.VNI: 'vni',
+    bgpvpn_rc_def.LOCAL_PREF_KEY: 'local_pref',
+}
+
+# BGPVPN API fields built from an association collection:
+#   field -> (relationship, associated resource id column)
+_BGPVPN_ASSOC_FIELDS = {
+    'networks': ('network_associations', 'network_id'),
+    'routers': ('router_associations', 'router_id'),
+    'ports': ('port_associations', 'port_id'),
+}
+
+
+def _field_wanted(field, fields):
+    return not fields or field in fields
+
+
+def _bgpvpn_changed_fields(session, bgpvpn_db, fields):
+    """Return which of fields are changed in a BGPVPN model
+
+    Column fields are checked against the attribute history of the model,
+    and route target and route distinguisher lists are changed when entries
+    of their kind are added to the model, removed from it or moved.
+    """
+    state = sa.inspect(bgpvpn_db)
+    history = state.attrs.route_target_entries.history
+    changed_kinds = set(
+        entry.kind for entry in itertools.chain(
+            history.added, history.deleted,
+            (entry for entry in bgpvpn_db.route_target_entries
+             if session.is_modified(entry))))
+    changed_fields = set()
+    for field in fields:
+        if field in RTRD_KINDS:
+            changed = field in changed_kinds
+        elif field in _BGPVPN_COLUMN_FIELDS:
+            changed = state.attrs[
+                _BGPVPN_COLUMN_FIELDS[field]].history.has_changes()
+        else:
+            changed = True
+        if changed:
+            changed_fields.add(field)
+    return changed_fields
+
+
+def _bgpvpn_query_for_fields(query, fields=None):
+    """Load only what is needed to build the requested fields of BGPVPNs
+
+    Only the columns backing the requested fields are selected, and each
+    requested association collection is loaded with a single query for all
+    the BGPVPNs of the query, rather than one query per BGPVPN.
+    """
+    options = [orm.subqueryload(getattr(BGPVPN, relationship))
+               for field, (relationship, _id_column)
+               in _BGPVPN_ASSOC_FIELDS.items()
+               if _field_wanted(field, fields)]
+    if any(_field_wanted(field, fields) for field in RTRD_KINDS):
+        options.append(orm.subqueryload(BGPVPN.route_target_entries))
+    if fields:
+        columns = set(['id'])
+        columns.update(column for field, column
+                       in _BGPVPN_COLUMN_FIELDS.items() if field in fields)
+        options.append(orm.load_only(*columns))
+    return query.options(*options)
+
+
+def _keyset_sorts(sorts, limit):
+    """Sort keys for a stable marker/limit pagination of a collection
+
+    Pages are delimited on the values of the sort keys of the marker row,
+    which only gives a total ordering if a unique key is part of the sort
+    keys: the id is appended when not already there.
+    """
+    sorts = list(sorts or [])
+    if limit and 'id' not in [key for key, _direction in sorts]:
+        sorts.append(('id', True))
+    return sorts
+
 
 def _list_bgpvpns_result_filter_hook(query, filters):
-    values = filters and filters.get('networks', [])
+    # each association filter is a correlated EXISTS subquery rather than
+    # a join, so that a BGPVPN matching several of the filter values is
+    # returned only once
+    if not filters:
+        return query
+
+    values = filters.get('networks', [])
     if values:
-        query = query.join(BGPVPNNetAssociation)
-        query = query.filter(BGPVPNNetAssociation.network_id.in_(values))
+        query = query.filter(BGPVPN.network_associations.any(
+            BGPVPNNetAssociation.network_id.in_(values)))
 
-    values = filters and filters.get('routers', [])
+    values = filters.get('routers', [])
     if values:
-        query = query.join(BGPVPNRouterAssociation)
-        query = query.filter(BGPVPNRouterAssociation.router_id.in_(values))
+        query = query.filter(BGPVPN.router_associations.any(
+            BGPVPNRouterAssociation.router_id.in_(values)))
 
-    values = filters and filters.get('ports', [])
+    values = filters.get('ports', [])
     if values:
-        query = query.join(BGPVPNRouterAssociation)
-        query = query.filter(BGPVPNPortAssociation.port_id.in_(values))
+        query = query.filter(BGPVPN.port_associations.any(
+            BGPVPNPortAssociation.port_id.in_(values)))
 
     return query
 
 
-@db_api.context_manager.writer
-def _add_port_assoc_route_db_from_dict(context, route, port_association_id):
+def _port_assoc_route_db_from_dict(route):
     if route['type'] == 'prefix':
         kwargs = {'prefix': route['prefix']}
     elif route['type'] == 'bgpvpn':
@@ -196,12 +606,15 @@ def _add_port_assoc_route_db_from_dict(context, route, port_association_id):
         # not reached
         pass
 
-    context.session.add(BGPVPNPortAssociationRoute(
-        port_association_id=port_association_id,
+    # the id is set here rather than by the column default so that the
+    # session flushes the routes of an association with a single
+    # executemany INSERT
+    return BGPVPNPortAssociationRoute(
+        id=uuidutils.generate_uuid(),
         type=route['type'],
         local_pref=route.get('local_pref', None),
         **kwargs
-    ))
+    )
 
 
 def port_assoc_route_dict_from_db(route_db):
@@ -231,7 +644,7 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
     @db_api.context_manager.reader
     def _get_bgpvpns_for_tenant(self, session, tenant_id, fields):
         try:
-            qry = session.query(BGPVPN)
+            qry = _bgpvpn_query_for_fields(session.query(BGPVPN), fields)
             bgpvpns = qry.filter_by(tenant_id=tenant_id)
         except exc.NoResultFound:
             return
@@ -241,67 +654,163 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
 
     @db_api.context_manager.reader
     def _make_bgpvpn_dict(self, bgpvpn_db, fields=None):
-        net_list = [net_assocs.network_id for net_assocs in
-                    bgpvpn_db.network_associations]
-        router_list = [router_assocs.router_id for router_assocs in
-                       bgpvpn_db.router_associations]
-        port_list = [port_assocs.port_id for port_assocs in
-                     bgpvpn_db.port_associations]
-        res = {
-            'id': bgpvpn_db['id'],
-            'tenant_id': bgpvpn_db['tenant_id'],
-            'networks': net_list,
-            'routers': router_list,
-            'ports': port_list,
-            'name': bgpvpn_db['name'],
-            'type': bgpvpn_db['type'],
-            'route_targets':
-                utils.rtrd_str2list(bgpvpn_db['route_targets']),
-            'route_distinguishers':
-                utils.rtrd_str2list(bgpvpn_db['route_distinguishers']),
-            'import_targets':
-                utils.rtrd_str2list(bgpvpn_db['import_targets']),
-            'export_targets':
-                utils.rtrd_str2list(bgpvpn_db['export_targets'])
-        }
+        # only the requested fields are built, so that columns and
+        # associations not loaded by _bgpvpn_query_for_fields are not
+        # lazy-loaded here
+        res = {'id': bgpvpn_db['id']}
+        if (_field_wanted('tenant_id', fields) or
+                _field_wanted('project_id', fields)):
+            res['tenant_id'] = bgpvpn_db['tenant_id']
+        for field in ('name', 'type', 'revision_number'):
+            if _field_wanted(field, fields):
+                res[field] = bgpvpn_db[field]
+        for field in RTRD_KINDS:
+            if _field_wanted(field, fields):
+                res[field] = rtrd_values(bgpvpn_db, field)
+        for field, (relationship, id_column) in _BGPVPN_ASSOC_FIELDS.items():
+            if _field_wanted(field, fields):
+                res[field] = [assoc[id_column]
+                              for assoc in bgpvpn_db[relationship]]
 
         plugin = directory.get_plugin(bgpvpn_def.ALIAS)
-        if utils.is_extension_supported(plugin, bgpvpn_vni_def.ALIAS):
+        if (_field_wanted(bgpvpn_vni_def.VNI, fields) and
+                utils.is_extension_supported(plugin, bgpvpn_vni_def.ALIAS)):
             res[bgpvpn_vni_def.VNI] = bgpvpn_db.get(bgpvpn_vni_def.VNI)
-        if utils.is_extension_supported(plugin, bgpvpn_rc_def.ALIAS):
+        if (_field_wanted(bgpvpn_rc_def.LOCAL_PREF_KEY, fields) and
+                utils.is_extension_supported(plugin, bgpvpn_rc_def.ALIAS)):
             res[bgpvpn_rc_def.LOCAL_PREF_KEY] = bgpvpn_db.get(
                 bgpvpn_rc_def.LOCAL_PREF_KEY)
+        if (_field_wanted(bgpvpn_status.STATUS, fields) and
+                utils.is_extension_supported(plugin, bgpvpn_status.ALIAS)):
+            res[bgpvpn_status.STATUS] = bgpvpn_db.status
 
         return self._fields(res, fields)
 
+    @staticmethod
+    def _bgpvpn_db_from_dict(bgpvpn):
+        return BGPVPN(
+            id=uuidutils.generate_uuid(),
+            tenant_id=bgpvpn['tenant_id'],
+            name=bgpvpn['name'],
+            type=bgpvpn['type'],
+            route_targets=bgpvpn['route_targets'],
+            import_targets=bgpvpn['import_targets'],
+            export_targets=bgpvpn['export_targets'],
+            route_distinguishers=bgpvpn.get('route_distinguishers'),
+            vni=bgpvpn.get(bgpvpn_vni_def.VNI),
+            local_pref=bgpvpn.get(bgpvpn_rc_def.LOCAL_PREF_KEY),
+            status=bgpvpn.get(bgpvpn_status.STATUS, const.ACTIVE),
+            # a new BGPVPN has no association, setting this avoids
+            # lazy-loading the empty collections to build its dict
+            network_associations=[],
+            router_associations=[],
+            port_associations=[],
+        )
+
     @db_api.context_manager.writer
     def create_bgpvpn(self, context, bgpvpn):
-        rt = utils.rtrd_list2str(bgpvpn['route_targets'])
-        i_rt = utils.rtrd_list2str(bgpvpn['import_targets'])
-        e_rt = utils.rtrd_list2str(bgpvpn['export_targets'])
-        rd = utils.rtrd_list2str(bgpvpn.get('route_distinguishers', ''))
-
         with db_api.context_manager.writer.using(context):
-            bgpvpn_db = BGPVPN(
-                id=uuidutils.generate_uuid(),
-                tenant_id=bgpvpn['tenant_id'],
-                name=bgpvpn['name'],
-                type=bgpvpn['type'],
-                route_targets=rt,
-                import_targets=i_rt,
-                export_targets=e_rt,
-                route_distinguishers=rd,
-                vni=bgpvpn.get(bgpvpn_vni_def.VNI),
-                local_pref=bgpvpn.get(bgpvpn_rc_def.LOCAL_PREF_KEY),
-            )
+            bgpvpn_db = self._bgpvpn_db_from_dict(bgpvpn)
             context.session.add(bgpvpn_db)
 
         return self._make_bgpvpn_dict(bgpvpn_db)
 
+    @db_api.context_manager.writer
+    def create_bgpvpns(self, context, bgpvpns):
+        with db_api.context_manager.writer.using(context):
+            bgpvpn_dbs = [self._bgpvpn_db_from_dict(bgpvpn)
+                          for bgpvpn in bgpvpns]
+            # the rows of all the BGPVPNs are inserted by a single flush
+            context.session.add_all(bgpvpn_dbs)
+            context.session.flush()
+
+        return [self._make_bgpvpn_dict(bgpvpn_db) for bgpvpn_db in bgpvpn_dbs]
+
+    @db_api.context_manager.reader
+    def get_bgpvpns(self, context, filters=None, fields=None, sorts=None,
+                    limit=None, marker=None, page_reverse=False):
+        sorts = _keyset_sorts(sorts, limit)
+        for key, _direction in sorts:
+            if key in RTRD_KINDS:
+                msg = _("%s is invalid attribute for sort_key") % key
+                raise n_exc.BadRequest(resource='bgpvpn', msg=msg)
+        marker_obj = self._get_marker_obj(context, 'bgpvpn', limit, marker)
+        query = self._get_collection_query(context, BGPVPN, filters=filters,
+                                           sorts=sorts, limit=limit,
+                                           marker_obj=marker_obj,
+                                           page_reverse=page_reverse)
+        bgpvpns = [self._make_bgpvpn_dict(bgpvpn_db, fields)
+                   for bgpvpn_db in _bgpvpn_query_for_fields(query, fields)]
+        if limit and page_reverse:
+            bgpvpns.reverse()
+        return bgpvpns
+
     @db_api.context_manager.reader
-    def get_bgpvpns(self, context, filters=None, fields=None):
-        return self._get_collection(context, BGPVPN, self._make_bgpvpn_dict,
-                                    filters=filters, fields=fields)
+    def get_bgpvpns_count(self, context, filters=None):
+        return self._get_collection_count(context, BGPVPN, filters=filters)
+
+    @db_api.context_manager.reader
+    def bgpvpn_exists(self, context, filters=None):
+        """Return whether any BGPVPN matches filters
+
+        A single EXISTS query, which neither loads nor counts the matching
+        BGPVPNs.
+        """
+        query = self._get_collection_query(context, BGPVPN, filters=filters)
+        return context.session.query(
+            query.with_entities(BGPVPN.id).exists()).scalar()
+
+    @db_api.context_manager.reader
+    def get_network_router_bgpvpns(self, context, network_ids):
+        """Return the BGPVPNs associated to the routers of networks
+
+        Returns (network id, BGPVPN id) pairs for the BGPVPNs owned by the
+        tenant of a network and associated to a router with an interface on
+        this network. A single query joins the router interface ports of the
+        networks to the router associations.
+        """
+        Port = models_v2.Port
+        query = context.session.query(
+            Port.network_id, BGPVPNRouterAssociation.bgpvpn_id
+        ).join(
+            BGPVPNRouterAssociation,
+            BGPVPNRouterAssociation.router_id == Port.device_id
+        ).join(
+            BGPVPN, BGPVPN.id == BGPVPNRouterAssociation.bgpvpn_id
+        ).join(
+            models_v2.Network, models_v2.Network.id == Port.network_id
+        ).filter(
+            Port.network_id.in_(network_ids),
+            Port.device_owner == const.DEVICE_OWNER_ROUTER_INTF,
+            BGPVPN.project_id == models_v2.Network.project_id
+        ).distinct()
+        return query.all()
+
+    @db_api.context_manager.reader
+    def get_router_network_bgpvpns(self, context, router_ids):
+        """Return the BGPVPNs associated to the networks of routers
+
+        Returns (router id, network id, BGPVPN id) tuples for the BGPVPNs
+        owned by the tenant of a router and associated to a network on which
+        this router has an interface. A single query joins the interface
+        ports of the routers to the network associations.
+        """
+        Port = models_v2.Port
+        query = context.session.query(
+            Port.device_id, Port.network_id, BGPVPNNetAssociation.bgpvpn_id
+        ).join(
+            BGPVPNNetAssociation,
+            BGPVPNNetAssociation.network_id == Port.network_id
+        ).join(
+            BGPVPN, BGPVPN.id == BGPVPNNetAssociation.bgpvpn_id
+        ).join(
+            l3.Router, l3.Router.id == Port.device_id
+        ).filter(
+            Port.device_id.in_(router_ids),
+            Port.device_owner == const.DEVICE_OWNER_ROUTER_INTF,
+            BGPVPN.project_id == l3.Router.project_id
+        ).distinct()
+        return query.all()
 
     @db_api.context_manager.reader
     def _get_bgpvpn(self, context, id):
@@ -312,42 +821,198 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
 
     @db_api.context_manager.reader
     def get_bgpvpn(self, context, id, fields=None):
-        bgpvpn_db = self._get_bgpvpn(context, id)
+        query = _bgpvpn_query_for_fields(self._model_query(context, BGPVPN),
+                                         fields)
+        try:
+            bgpvpn_db = query.filter(BGPVPN.id == id).one()
+        except exc.NoResultFound:
+            raise bgpvpn_ext.BGPVPNNotFound(id=id)
         return self._make_bgpvpn_dict(bgpvpn_db, fields)
 
+    @db_api.context_manager.reader
+    def get_bgpvpn_revision_number(self, context, id):
+        """Return the revision number of a BGPVPN, None if it is deleted
+
+        Only the revision_number column of the BGPVPN row is read, which is
+        much cheaper than get_bgpvpn, to check whether a copy of the BGPVPN
+        is still current.
+        """
+        row = context.session.query(BGPVPN.revision_number).filter(
+            BGPVPN.id == id).first()
+        return row.revision_number if row is not None else None
+
+    @db_api.context_manager.writer
+    def set_bgpvpn_status(self, context, id, status):
+        """Set the status of a BGPVPN, if it still exists
+
+        The change goes through the session, so that it bumps the revision
+        number of the BGPVPN and is logged like its other changes. Returns
+        whether the status changed.
+        """
+        bgpvpn_db = context.session.query(BGPVPN).get(id)
+        if bgpvpn_db is None or bgpvpn_db.status == status:
+            return False
+        if (status == const.PENDING_UPDATE and
+                bgpvpn_db.status == const.PENDING_CREATE):
+            # the creation of the BGPVPN is not pushed yet
+            return False
+        bgpvpn_db.status = status
+        return True
+
+    @db_api.context_manager.writer
+    def get_bgpvpn_for_update(self, context, id):
+        """Get a BGPVPN model, locking its row until the end of the transaction
+
+        The BGPVPN and its associations are loaded in the session, so that
+        the model can be updated with update_bgpvpn_model, and turned into a
+        dict with _make_bgpvpn_dict, without loading them again.
+        """
+        query = _bgpvpn_query_for_fields(self._model_query(context, BGPVPN))
+        try:
+            bgpvpn_db = query.filter(BGPVPN.id == id).with_for_update().one()
+        except exc.NoResultFound:
+            raise bgpvpn_ext.BGPVPNNotFound(id=id)
+        _enforce_revision_constraint(context, 'bgpvpns', bgpvpn_db)
+        return bgpvpn_db
+
+    @db_api.context_manager.writer
+    def update_bgpvpn_model(self, context, bgpvpn_db, bgpvpn):
+        """Update a BGPVPN model, returning the names of the changed fields
+
+        A field set to its current value is not changed, according to the
+        attribute history of the model. The changes are written by the next
+        flush of the session, route target and route distinguisher lists
+        being stored in bgpvpn_route_targets by the BGPVPN model setters.
+        """
+        bgpvpn_db.update(bgpvpn)
+        return _bgpvpn_changed_fields(context.session, bgpvpn_db, bgpvpn)
+
     @db_api.context_manager.writer
     def update_bgpvpn(self, context, id, bgpvpn):
-        bgpvpn_db = self._get_bgpvpn(context, id)
-        if bgpvpn:
-            # Format Route Target lists to string
-            if 'route_targets' in bgpvpn:
-                rt = utils.rtrd_list2str(bgpvpn['route_targets'])
-                bgpvpn['route_targets'] = rt
-            if 'import_targets' in bgpvpn:
-                i_rt = utils.rtrd_list2str(bgpvpn['import_targets'])
-                bgpvpn['import_targets'] = i_rt
-            if 'export_targets' in bgpvpn:
-                e_rt = utils.rtrd_list2str(bgpvpn['export_targets'])
-                bgpvpn['export_targets'] = e_rt
-            if 'route_distinguishers' in bgpvpn:
-                rd = utils.rtrd_list2str(bgpvpn['route_distinguishers'])
-                bgpvpn['route_distinguishers'] = rd
-            bgpvpn_db.update(bgpvpn)
+        bgpvpn_db = self.get_bgpvpn_for_update(context, id)
+        if self.update_bgpvpn_model(context, bgpvpn_db, bgpvpn):
+            # bumps the revision number
+            context.session.flush()
         return self._make_bgpvpn_dict(bgpvpn_db)
 
     @db_api.context_manager.writer
     def delete_bgpvpn(self, context, id):
-        bgpvpn_db = self._get_bgpvpn(context, id)
-        bgpvpn = self._make_bgpvpn_dict(bgpvpn_db)
-        context.session.delete(bgpvpn_db)
+        bgpvpn = self.get_bgpvpn(context, id)
+        _enforce_revision_constraint(context, 'bgpvpns', bgpvpn)
+        # the rows depending on the BGPVPN are deleted with one DELETE per
+        # table rather than loaded and deleted one by one by the ORM
+        # cascades, which does not scale with the number of associations
+        port_assoc_ids = context.session.query(
+            BGPVPNPortAssociation.id).filter(
+            BGPVPNPortAssociation.bgpvpn_id == id).subquery()
+        # the port associations of other BGPVPNs leaking the routes of this
+        # BGPVPN lose these routes
+        leaking_assoc_ids = context.session.query(
+            BGPVPNPortAssociationRoute.port_association_id).filter(
+            BGPVPNPortAssociationRoute.bgpvpn_id == id).subquery()
+        leaking = sa.and_(BGPVPNPortAssociation.bgpvpn_id != id,
+                          BGPVPNPortAssociation.id.in_(leaking_assoc_ids))
+        context.session.query(BGPVPNPortAssociation).filter(leaking).update(
+            {'revision_number': BGPVPNPortAssociation.revision_number + 1},
+            synchronize_session=False)
+        _log_changes_from_select(context.session, BGPVPNPortAssociation,
+                                 'update', leaking)
+        for model in _ASSOC_MODELS:
+            _log_changes_from_select(context.session, model, 'delete',
+                                     model.bgpvpn_id == id)
+        context.session.query(BGPVPNPortAssociationRoute).filter(
+            sa.or_(BGPVPNPortAssociationRoute.bgpvpn_id == id,
+                   BGPVPNPortAssociationRoute.port_association_id.in_(
+                       port_assoc_ids))).delete(synchronize_session=False)
+        for model in (BGPVPNPortAssociation, BGPVPNRouterAssociation,
+                      BGPVPNNetAssociation, BGPVPNRouteTarget):
+            context.session.query(model).filter(
+                model.bgpvpn_id == id).delete(synchronize_session=False)
+        context.session.query(BGPVPN).filter(BGPVPN.id == id).delete(
+            synchronize_session=False)
+        context.session.execute(BGPVPNChange.__table__.insert(), {
+            'resource_type': _RESOURCE_TYPES[BGPVPN],
+            'resource_id': id,
+            'bgpvpn_id': id,
+            'operation': 'delete',
+            'revision_number': bgpvpn['revision_number'],
+            'created_at': timeutils.utcnow()})
         return bgpvpn
 
+    @db_api.context_manager.writer
+    def _add_assocs(self, context, model, id_column, bgpvpn_id, assoc_dbs,
+                    already_exists):
+        """Add association rows of a BGPVPN with a single flush
+
+        already_exists(resource_id) gives the exception to raise for a
+        resource which is already associated to the BGPVPN, or more than
+        once in assoc_dbs.
+        """
+        resource_ids = [assoc_db[id_column] for assoc_db in assoc_dbs]
+        duplicates = set(resource_id for resource_id, count
+                         in collections.Counter(resource_ids).items()
+                         if count > 1)
+        column = getattr(model, id_column)
+        existing = context.session.query(column).filter(
+            model.bgpvpn_id == bgpvpn_id, column.in_(resource_ids))
+        duplicates.update(resource_id for resource_id, in existing)
+        if duplicates:
+            raise already_exists(sorted(duplicates)[0])
+        context.session.add_all(assoc_dbs)
+        context.session.flush()
+
+    @db_api.context_manager.writer
+    def _delete_assocs(self, context, model, bgpvpn_id, assoc_ids,
+                       make_dict, not_found):
+        """Delete association rows of a BGPVPN, returning their dicts
+
+        not_found(assoc_id) gives the exception to raise if one of the
+        associations is not one of this BGPVPN.
+        """
+        assoc_dbs = self._model_query(context, model).filter(
+            model.bgpvpn_id == bgpvpn_id, model.id.in_(assoc_ids)).all()
+        found = set(assoc_db.id for assoc_db in assoc_dbs)
+        for assoc_id in assoc_ids:
+            if assoc_id not in found:
+                raise not_found(assoc_id)
+        assocs = [make_dict(assoc_db) for assoc_db in assoc_dbs]
+        for assoc_db in assoc_dbs:
+            context.session.delete(assoc_db)
+        return assocs
+
+    @db_api.context_manager.reader
+    def _assocs_diff(self, context, model, id_column, bgpvpn_id,
+                     resource_ids):
+        """Compare the resources associated to a BGPVPN with resource_ids
+
+        Returns the resource_ids not associated to the BGPVPN yet, and the
+        ids of the associations of the BGPVPN to resources not in
+        resource_ids.
+        """
+        resource_ids = list(resource_ids)
+        column = getattr(model, id_column)
+        query = self._model_query(context, model).filter(
+            model.bgpvpn_id == bgpvpn_id)
+        to_remove = query.with_entities(model.id)
+        if resource_ids:
+            to_remove = to_remove.filter(~column.in_(resource_ids))
+            associated = set(
+                resource_id for resource_id, in query.with_entities(
+                    column).filter(column.in_(resource_ids)))
+        else:
+            associated = set()
+        to_add = [resource_id for resource_id
+                  in collections.OrderedDict.fromkeys(resource_ids)
+                  if resource_id not in associated]
+        return to_add, [assoc_id for assoc_id, in to_remove]
+
     @db_api.context_manager.reader
     def _make_net_assoc_dict(self, net_assoc_db, fields=None):
         res = {'id': net_assoc_db['id'],
                'tenant_id': net_assoc_db['tenant_id'],
                'bgpvpn_id': net_assoc_db['bgpvpn_id'],
-               'network_id': net_assoc_db['network_id']}
+               'network_id': net_assoc_db['network_id'],
+               'revision_number': net_assoc_db['revision_number']}
         return self._fields(res, fields)
 
     @db_api.context_manager.reader
@@ -379,19 +1044,48 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
             raise bgpvpn_ext.BGPVPNNetAssocAlreadyExists(
                 bgpvpn_id=bgpvpn_id, net_id=net_assoc['network_id'])
 
+    @db_api.context_manager.writer
+    def create_net_assocs(self, context, bgpvpn_id, net_assocs):
+        net_assoc_dbs = [
+            BGPVPNNetAssociation(tenant_id=net_assoc['tenant_id'],
+                                 bgpvpn_id=bgpvpn_id,
+                                 network_id=net_assoc['network_id'])
+            for net_assoc in net_assocs]
+        self._add_assocs(
+            context, BGPVPNNetAssociation, 'network_id', bgpvpn_id,
+            net_assoc_dbs,
+            lambda net_id: bgpvpn_ext.BGPVPNNetAssocAlreadyExists(
+                bgpvpn_id=bgpvpn_id, net_id=net_id))
+        return [self._make_net_assoc_dict(net_assoc_db)
+                for net_assoc_db in net_assoc_dbs]
+
     @db_api.context_manager.reader
     def get_net_assoc(self, context, assoc_id, bgpvpn_id, fields=None):
         net_assoc_db = self._get_net_assoc(context, assoc_id, bgpvpn_id)
         return self._make_net_assoc_dict(net_assoc_db, fields)
 
     @db_api.context_manager.reader
-    def get_net_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_net_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                       sorts=None, limit=None, marker=None,
+                       page_reverse=False):
         if not filters:
             filters = {}
         filters['bgpvpn_id'] = [bgpvpn_id]
+        marker_obj = None
+        if limit and marker:
+            marker_obj = self._get_net_assoc(context, marker, bgpvpn_id)
         return self._get_collection(context, BGPVPNNetAssociation,
                                     self._make_net_assoc_dict,
-                                    filters, fields)
+                                    filters, fields,
+                                    sorts=_keyset_sorts(sorts, limit),
+                                    limit=limit, marker_obj=marker_obj,
+                                    page_reverse=page_reverse)
+
+    @db_api.context_manager.reader
+    def get_net_assocs_count(self, context, bgpvpn_id, filters=None):
+        filters = dict(filters or {}, bgpvpn_id=[bgpvpn_id])
+        return self._get_collection_count(context, BGPVPNNetAssociation,
+                                          filters=filters)
 
     @db_api.context_manager.writer
     def delete_net_assoc(self, context, assoc_id, bgpvpn_id):
@@ -399,10 +1093,27 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
                  "BGPVPN %(bgpvpn)s", {'id': assoc_id,
                                        'bgpvpn': bgpvpn_id})
         net_assoc_db = self._get_net_assoc(context, assoc_id, bgpvpn_id)
+        _enforce_revision_constraint(context, 'network_associations',
+                                     net_assoc_db)
         net_assoc = self._make_net_assoc_dict(net_assoc_db)
         context.session.delete(net_assoc_db)
         return net_assoc
 
+    def get_net_assocs_diff(self, context, bgpvpn_id, network_ids):
+        return self._assocs_diff(context, BGPVPNNetAssociation, 'network_id',
+                                 bgpvpn_id, network_ids)
+
+    @db_api.context_manager.writer
+    def delete_net_assocs(self, context, bgpvpn_id, assoc_ids):
+        LOG.info("deleting network associations %(ids)s for "
+                 "BGPVPN %(bgpvpn)s", {'ids': assoc_ids,
+                                       'bgpvpn': bgpvpn_id})
+        return self._delete_assocs(
+            context, BGPVPNNetAssociation, bgpvpn_id, assoc_ids,
+            self._make_net_assoc_dict,
+            lambda assoc_id: bgpvpn_ext.BGPVPNNetAssocNotFound(
+                id=assoc_id, bgpvpn_id=bgpvpn_id))
+
     @db_api.context_manager.reader
     def _make_router_assoc_dict(self, router_assoc_db, fields=None):
         res = {'id': router_assoc_db['id'],
@@ -410,7 +1121,8 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
                'bgpvpn_id': router_assoc_db['bgpvpn_id'],
                'router_id': router_assoc_db['router_id'],
                'advertise_extra_routes': router_assoc_db[
-                   'advertise_extra_routes']
+                   'advertise_extra_routes'],
+               'revision_number': router_assoc_db['revision_number']
                }
         return self._fields(res, fields)
 
@@ -444,25 +1156,58 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
             raise bgpvpn_ext.BGPVPNRouterAssocAlreadyExists(
                 bgpvpn_id=bgpvpn_id, router_id=router_association['router_id'])
 
+    @db_api.context_manager.writer
+    def create_router_assocs(self, context, bgpvpn_id, router_assocs):
+        router_assoc_dbs = [
+            BGPVPNRouterAssociation(tenant_id=router_assoc['tenant_id'],
+                                    bgpvpn_id=bgpvpn_id,
+                                    router_id=router_assoc['router_id'])
+            for router_assoc in router_assocs]
+        self._add_assocs(
+            context, BGPVPNRouterAssociation, 'router_id', bgpvpn_id,
+            router_assoc_dbs,
+            lambda router_id: bgpvpn_ext.BGPVPNRouterAssocAlreadyExists(
+                bgpvpn_id=bgpvpn_id, router_id=router_id))
+        return [self._make_router_assoc_dict(router_assoc_db)
+                for router_assoc_db in router_assoc_dbs]
+
     @db_api.context_manager.reader
     def get_router_assoc(self, context, assoc_id, bgpvpn_id, fields=None):
         router_assoc_db = self._get_router_assoc(context, assoc_id, bgpvpn_id)
         return self._make_router_assoc_dict(router_assoc_db, fields)
 
     @db_api.context_manager.reader
-    def get_router_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_router_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                          sorts=None, limit=None, marker=None,
+                          page_reverse=False):
         if not filters:
             filters = {}
         filters['bgpvpn_id'] = [bgpvpn_id]
+        marker_obj = None
+        if limit and marker:
+            marker_obj = self._get_router_assoc(context, marker, bgpvpn_id)
         return self._get_collection(context, BGPVPNRouterAssociation,
                                     self._make_router_assoc_dict,
-                                    filters, fields)
+                                    filters, fields,
+                                    sorts=_keyset_sorts(sorts, limit),
+                                    limit=limit, marker_obj=marker_obj,
+                                    page_reverse=page_reverse)
+
+    @db_api.context_manager.reader
+    def get_router_assocs_count(self, context, bgpvpn_id, filters=None):
+        filters = dict(filters or {}, bgpvpn_id=[bgpvpn_id])
+        return self._get_collection_count(context, BGPVPNRouterAssociation,
+                                          filters=filters)
 
     @db_api.context_manager.writer
     def update_router_assoc(self, context, assoc_id, bgpvpn_id, router_assoc):
         router_assoc_db = self._get_router_assoc(context,
                                                  assoc_id, bgpvpn_id)
+        _enforce_revision_constraint(context, 'router_associations',
+                                     router_assoc_db)
         router_assoc_db.update(router_assoc)
+        # bumps the revision number
+        context.session.flush()
         return self._make_router_assoc_dict(router_assoc_db)
 
     @db_api.context_manager.writer
@@ -472,20 +1217,38 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
                  {'id': assoc_id, 'bgpvpn': bgpvpn_id})
         router_assoc_db = self._get_router_assoc(context, assoc_id,
                                                  bgpvpn_id)
+        _enforce_revision_constraint(context, 'router_associations',
+                                     router_assoc_db)
         router_assoc = self._make_router_assoc_dict(router_assoc_db)
         context.session.delete(router_assoc_db)
         return router_assoc
 
+    def get_router_assocs_diff(self, context, bgpvpn_id, router_ids):
+        return self._assocs_diff(context, BGPVPNRouterAssociation,
+                                 'router_id', bgpvpn_id, router_ids)
+
+    @db_api.context_manager.writer
+    def delete_router_assocs(self, context, bgpvpn_id, assoc_ids):
+        LOG.info("deleting router associations %(ids)s for "
+                 "BGPVPN %(bgpvpn)s",
+                 {'ids': assoc_ids, 'bgpvpn': bgpvpn_id})
+        return self._delete_assocs(
+            context, BGPVPNRouterAssociation, bgpvpn_id, assoc_ids,
+            self._make_router_assoc_dict,
+            lambda assoc_id: bgpvpn_ext.BGPVPNRouterAssocNotFound(
+                id=assoc_id, bgpvpn_id=bgpvpn_id))
+
     @db_api.context_manager.reader
     def _make_port_assoc_dict(self, port_assoc_db, fields=None):
-        routes = [port_assoc_route_dict_from_db(r)
-                  for r in port_assoc_db['routes']]
         res = {'id': port_assoc_db['id'],
                'tenant_id': port_assoc_db['tenant_id'],
                'bgpvpn_id': port_assoc_db['bgpvpn_id'],
                'port_id': port_assoc_db['port_id'],
                'advertise_fixed_ips': port_assoc_db['advertise_fixed_ips'],
-               'routes': routes}
+               'revision_number': port_assoc_db['revision_number']}
+        if _field_wanted('routes', fields):
+            res['routes'] = [port_assoc_route_dict_from_db(r)
+                             for r in port_assoc_db['routes']]
         return self._fields(res, fields)
 
     @db_api.context_manager.reader
@@ -509,8 +1272,11 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
                     tenant_id=port_association['tenant_id'],
                     bgpvpn_id=bgpvpn_id,
                     port_id=port_id,
-                    advertise_fixed_ips=advertise_fixed_ips)
+                    advertise_fixed_ips=advertise_fixed_ips,
+                    routes=[_port_assoc_route_db_from_dict(route)
+                            for route in port_association['routes']])
                 context.session.add(port_assoc_db)
+                context.session.flush()
         except db_exc.DBDuplicateEntry:
             LOG.warning(("port %(port_id)s is already associated to "
                          "BGPVPN %(bgpvpn_id)s"),
@@ -518,38 +1284,111 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
                          'bgpvpn_id': bgpvpn_id})
             raise bgpvpn_rc_ext.BGPVPNPortAssocAlreadyExists(
                 bgpvpn_id=bgpvpn_id, port_id=port_association['port_id'])
-
-        with db_api.context_manager.writer.using(context):
-            for route in port_association['routes']:
-                    _add_port_assoc_route_db_from_dict(context,
-                                                       route, port_assoc_db.id)
         return self._make_port_assoc_dict(port_assoc_db)
 
+    @db_api.context_manager.writer
+    def create_port_assocs(self, context, bgpvpn_id, port_assocs):
+        port_assoc_dbs = [
+            BGPVPNPortAssociation(
+                tenant_id=port_assoc['tenant_id'],
+                bgpvpn_id=bgpvpn_id,
+                port_id=port_assoc['port_id'],
+                advertise_fixed_ips=port_assoc['advertise_fixed_ips'],
+                routes=[_port_assoc_route_db_from_dict(route)
+                        for route in port_assoc['routes']])
+            for port_assoc in port_assocs]
+        self._add_assocs(
+            context, BGPVPNPortAssociation, 'port_id', bgpvpn_id,
+            port_assoc_dbs,
+            lambda port_id: bgpvpn_rc_ext.BGPVPNPortAssocAlreadyExists(
+                bgpvpn_id=bgpvpn_id, port_id=port_id))
+        return [self._make_port_assoc_dict(port_assoc_db)
+                for port_assoc_db in port_assoc_dbs]
+
     @db_api.context_manager.reader
     def get_port_assoc(self, context, assoc_id, bgpvpn_id, fields=None):
         port_assoc_db = self._get_port_assoc(context, assoc_id, bgpvpn_id)
         return self._make_port_assoc_dict(port_assoc_db, fields)
 
     @db_api.context_manager.reader
-    def get_port_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_port_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                        sorts=None, limit=None, marker=None,
+                        page_reverse=False):
         if not filters:
             filters = {}
         filters['bgpvpn_id'] = [bgpvpn_id]
-        return self._get_collection(context, BGPVPNPortAssociation,
-                                    self._make_port_assoc_dict,
-                                    filters, fields)
+        marker_obj = None
+        if limit and marker:
+            marker_obj = self._get_port_assoc(context, marker, bgpvpn_id)
+        query = self._get_collection_query(context, BGPVPNPortAssociation,
+                                           filters=filters,
+                                           sorts=_keyset_sorts(sorts, limit),
+                                           limit=limit, marker_obj=marker_obj,
+                                           page_reverse=page_reverse)
+        if _field_wanted('routes', fields):
+            # routes of all the port associations loaded with one query
+            query = query.options(
+                orm.subqueryload(BGPVPNPortAssociation.routes))
+        port_assocs = [self._make_port_assoc_dict(port_assoc_db, fields)
+                       for port_assoc_db in query]
+        if limit and page_reverse:
+            port_assocs.reverse()
+        return port_assocs
+
+    @db_api.context_manager.reader
+    def get_port_assocs_count(self, context, bgpvpn_id, filters=None):
+        filters = dict(filters or {}, bgpvpn_id=[bgpvpn_id])
+        return self._get_collection_count(context, BGPVPNPortAssociation,
+                                          filters=filters)
 
     @db_api.context_manager.reader
     def update_port_assoc(self, context, assoc_id, bgpvpn_id, port_assoc):
-        with db_api.context_manager.writer.using(context):
-            port_assoc_db = self._get_port_assoc(context, assoc_id, bgpvpn_id)
-            for route_db in port_assoc_db.routes:
+        return self.update_port_assoc_with_diff(context, assoc_id, bgpvpn_id,
+                                                port_assoc)[1]
+
+    @db_api.context_manager.writer
+    def update_port_assoc_with_diff(self, context, assoc_id, bgpvpn_id,
+                                    port_assoc):
+        """Update a port association, returning what the update changed
+
+        Returns the port association before and after the update, and the
+        lists of the routes added and removed by the update.
+        """
+        port_assoc_db = self._get_port_assoc(context, assoc_id, bgpvpn_id)
+        _enforce_revision_constraint(context, 'port_associations',
+                                     port_assoc_db)
+        old_port_assoc = self._make_port_assoc_dict(port_assoc_db)
+        routes = port_assoc.pop('routes', None)
+        added_routes, removed_routes = [], []
+        if routes is not None:
+            added_routes, removed_routes = self._update_port_assoc_routes(
+                context, port_assoc_db, routes)
+        port_assoc_db.update(port_assoc)
+        # bumps the revision number
+        context.session.flush()
+        return (old_port_assoc, self._make_port_assoc_dict(port_assoc_db),
+                added_routes, removed_routes)
+
+    def _update_port_assoc_routes(self, context, port_assoc_db, routes):
+        """Make routes the routes of a port association
+
+        Only the rows of the routes that are removed or added are touched:
+        the rows of the routes that are kept, keep their ids. Returns the
+        routes added and removed.
+        """
+        route_dbs = list(port_assoc_db.routes)
+        old_routes = [port_assoc_route_dict_from_db(route_db)
+                      for route_db in route_dbs]
+        added_routes, removed_routes = (
+            utils.get_port_assoc_routes_differences(routes, old_routes))
+        removed_ids = set(id(route) for route in removed_routes)
+        for route, route_db in zip(old_routes, route_dbs):
+            if id(route) in removed_ids:
+                port_assoc_db.routes.remove(route_db)
                 context.session.delete(route_db)
-            for route in port_assoc.pop('routes', []):
-                _add_port_assoc_route_db_from_dict(context, route, assoc_id)
-            port_assoc_db.update(port_assoc)
-        context.session.refresh(port_assoc_db)
-        return self._make_port_assoc_dict(port_assoc_db)
+        port_assoc_db.routes.extend(_port_assoc_route_db_from_dict(route)
+                                    for route in added_routes)
+        return added_routes, removed_routes
 
     @db_api.context_manager.writer
     def delete_port_assoc(self, context, assoc_id, bgpvpn_id):
@@ -558,6 +1397,169 @@ class BGPVPNPluginDb(common_db_mixin.CommonDbMixin):
                  {'id': assoc_id, 'bgpvpn': bgpvpn_id})
         port_assoc_db = self._get_port_assoc(context, assoc_id,
                                              bgpvpn_id)
+        _enforce_revision_constraint(context, 'port_associations',
+                                     port_assoc_db)
         port_assoc = self._make_port_assoc_dict(port_assoc_db)
         context.session.delete(port_assoc_db)
         return port_assoc
+
+    @db_api.context_manager.writer
+    def delete_port_assocs(self, context, bgpvpn_id, assoc_ids):
+        LOG.info("deleting port associations %(ids)s for "
+                 "BGPVPN %(bgpvpn)s",
+                 {'ids': assoc_ids, 'bgpvpn': bgpvpn_id})
+        return self._delete_assocs(
+            context, BGPVPNPortAssociation, bgpvpn_id, assoc_ids,
+            self._make_port_assoc_dict,
+            lambda assoc_id: bgpvpn_rc_ext.BGPVPNPortAssocNotFound(
+                id=assoc_id, bgpvpn_id=bgpvpn_id))
+
+    @staticmethod
+    def _make_change_dict(change_db):
+        return {'id': change_db.id,
+                'resource_type': change_db.resource_type,
+                'resource_id': change_db.resource_id,
+                'bgpvpn_id': change_db.bgpvpn_id,
+                'operation': change_db.operation,
+                'revision_number': change_db.revision_number,
+                'created_at': change_db.created_at}
+
+    @db_api.context_manager.reader
+    def get_changes(self, context, cursor=None, limit=None):
+        """Return the logged changes following cursor, in their order
+
+        cursor is the id of the last change already processed by the
+        consumer, None to start from the oldest change still logged.
+        """
+        query = context.session.query(BGPVPNChange)
+        if cursor is not None:
+            query = query.filter(BGPVPNChange.id > cursor)
+        query = query.order_by(BGPVPNChange.id)
+        if limit:
+            query = query.limit(limit)
+        return [self._make_change_dict(change_db) for change_db in query]
+
+    @db_api.context_manager.writer
+    def prune_changes(self, context, cursor=None, max_age=None):
+        """Delete the logged changes up to cursor, or older than max_age
+
+        max_age is in seconds. Returns the number of deleted changes.
+        """
+        criteria = []
+        if cursor is not None:
+            criteria.append(BGPVPNChange.id <= cursor)
+        if max_age is not None:
+            criteria.append(BGPVPNChange.created_at <
+                            timeutils.utcnow() -
+                            datetime.timedelta(seconds=max_age))
+        if not criteria:
+            return 0
+        return context.session.query(BGPVPNChange).filter(
+            sa.or_(*criteria)).delete(synchronize_session=False)
+
+    @staticmethod
+    def _make_journal_entry_dict(entry_db):
+        return {'id': entry_db.id,
+                'resource_type': entry_db.resource_type,
+                'resource_id': entry_db.resource_id,
+                'bgpvpn_id': entry_db.bgpvpn_id,
+                'operation': entry_db.operation,
+                'data': jsonutils.loads(entry_db.data),
+                'retry_count': entry_db.retry_count,
+                'created_at': entry_db.created_at}
+
+    @db_api.context_manager.writer
+    def add_journal_entries(self, context, resource_type, operation,
+                            resources):
+        """Journal the operation on resources, with a single INSERT
+
+        resource_type is 'bgpvpn', or the type of the associations, as in
+        the change log.
+        """
+        if not resources:
+            return
+        now = timeutils.utcnow()
+        context.session.execute(BGPVPNJournalEntry.__table__.insert(), [
+            {'resource_type': resource_type,
+             'resource_id': resource['id'],
+             'bgpvpn_id': (resource['id'] if resource_type == 'bgpvpn'
+                           else resource['bgpvpn_id']),
+             'operation': operation,
+             'data': jsonutils.dumps(resource),
+             'state': JOURNAL_PENDING,
+             'retry_count': 0,
+             'next_attempt_at': now,
+             'created_at': now}
+            for resource in resources])
+
+    @db_api.context_manager.writer
+    def claim_journal_entries(self, context, limit, processing_timeout):
+        """Claim the journal entries ready to be synced
+
+        An entry is ready if it is due, and if no older entry of its BGPVPN
+        is pending or being processed, so that the entries of a BGPVPN,
+        and hence a BGPVPN and its associations, are synced in order.
+        Entries being processed whose claim expired are claimed again.
+        Claimed entries are processing for processing_timeout seconds, and
+        are claimed with a conditional UPDATE, so that concurrent workers,
+        possibly in other processes, do not claim the same entries.
+        """
+        now = timeutils.utcnow()
+        Entry = BGPVPNJournalEntry
+        Older = orm.aliased(BGPVPNJournalEntry)
+        active_states = (JOURNAL_PENDING, JOURNAL_PROCESSING)
+        blocked = sa.exists().where(sa.and_(
+            Older.bgpvpn_id == Entry.bgpvpn_id,
+            Older.id < Entry.id,
+            Older.state.in_(active_states)))
+        # the claims below do not update the entries of the session
+        candidates = context.session.query(Entry).populate_existing().filter(
+            Entry.state.in_(active_states),
+            Entry.next_attempt_at <= now,
+            ~blocked).order_by(Entry.id).limit(limit).all()
+        claim_until = now + datetime.timedelta(seconds=processing_timeout)
+        claimed = []
+        for entry_db in candidates:
+            if context.session.query(Entry).filter(
+                    Entry.id == entry_db.id,
+                    Entry.state == entry_db.state,
+                    Entry.next_attempt_at == entry_db.next_attempt_at
+            ).update({'state': JOURNAL_PROCESSING,
+                      'next_attempt_at': claim_until},
+                     synchronize_session=False):
+                claimed.append(self._make_journal_entry_dict(entry_db))
+        return claimed
+
+    @db_api.context_manager.writer
+    def complete_journal_entry(self, context, entry_id):
+        context.session.query(BGPVPNJournalEntry).filter(
+            BGPVPNJournalEntry.id == entry_id).delete(
+                synchronize_session=False)
+
+    @db_api.context_manager.writer
+    def retry_journal_entry(self, context, entry_id, delay):
+        """Make a journal entry pending again after delay seconds
+
+        If delay is None, the entry is failed: it is kept for inspection,
+        but no longer synced, and no longer blocks the other entries of its
+        BGPVPN.
+        """
+        values = {'retry_count': BGPVPNJournalEntry.retry_count + 1}
+        if delay is None:
+            values['state'] = JOURNAL_FAILED
+        else:
+            values['state'] = JOURNAL_PENDING
+            values['next_attempt_at'] = (
+                timeutils.utcnow() + datetime.timedelta(seconds=delay))
+        context.session.query(BGPVPNJournalEntry).filter(
+            BGPVPNJournalEntry.id == entry_id).update(
+                values, synchronize_session=False)
+
+    @db_api.context_manager.reader
+    def get_journal_counts(self, context):
+        """Return the number of journal entries in each state"""
+        counts = dict((state, 0) for state in JOURNAL_STATES)
+        counts.update(context.session.query(
+            BGPVPNJournalEntry.state, sa.func.count(BGPVPNJournalEntry.id)
+        ).group_by(BGPVPNJournalEntry.state).all())
+        return counts
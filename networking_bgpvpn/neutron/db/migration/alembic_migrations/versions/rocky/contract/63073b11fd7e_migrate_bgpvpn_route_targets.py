@@ -0,0 +1,71 @@
+# Copyright 2018 <PUT YOUR NAME/COMPANY HERE>
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Move BGPVPN route targets and route distinguishers to their own table
+
+The values are copied by the expand migration. The BGPVPNs created by the
+servers not upgraded yet since then, which have no row in
+bgpvpn_route_targets, get theirs copied here before the columns are dropped.
+
+Revision ID: 63073b11fd7e
+Revises: 23ce05e0a19f
+Create Date: 2018-06-04 10:14:02.871390
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '63073b11fd7e'
+down_revision = '23ce05e0a19f'
+depends_on = ('4063dcebdaad',)
+
+from alembic import op
+import sqlalchemy as sa
+
+
+RTRD_KINDS = ('route_targets', 'import_targets', 'export_targets',
+              'route_distinguishers')
+
+bgpvpns = sa.Table(
+    'bgpvpns', sa.MetaData(),
+    sa.Column('id', sa.String(36)),
+    *[sa.Column(kind, sa.String(255)) for kind in RTRD_KINDS])
+
+bgpvpn_route_targets = sa.Table(
+    'bgpvpn_route_targets', sa.MetaData(),
+    sa.Column('bgpvpn_id', sa.String(36)),
+    sa.Column('kind', sa.Enum(*RTRD_KINDS, name='bgpvpn_route_target_kind')),
+    sa.Column('value', sa.String(64)),
+    sa.Column('position', sa.Integer()))
+
+
+def upgrade():
+    rows = []
+    copied = sa.select([bgpvpn_route_targets.c.bgpvpn_id]).distinct()
+    for bgpvpn in op.get_bind().execute(
+            sa.select([bgpvpns]).where(~bgpvpns.c.id.in_(copied))):
+        for kind in RTRD_KINDS:
+            values = getattr(bgpvpn, kind)
+            if not values:
+                continue
+            for position, value in enumerate(values.split(',')):
+                rows.append({'bgpvpn_id': bgpvpn.id,
+                             'kind': kind,
+                             'value': value,
+                             'position': position})
+    if rows:
+        op.bulk_insert(bgpvpn_route_targets, rows)
+
+    for kind in RTRD_KINDS:
+        op.drop_column('bgpvpns', kind)
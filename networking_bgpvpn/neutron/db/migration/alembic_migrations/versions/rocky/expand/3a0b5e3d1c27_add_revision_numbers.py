@@ -0,0 +1,39 @@
+# Copyright 2018 <PUT YOUR NAME/COMPANY HERE>
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add revision numbers to BGPVPNs and to their associations
+
+Revision ID: 3a0b5e3d1c27
+Revises: f62d031bf6a5
+Create Date: 2018-06-20 10:12:31.540193
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3a0b5e3d1c27'
+down_revision = 'f62d031bf6a5'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    for table in ('bgpvpns',
+                  'bgpvpn_network_associations',
+                  'bgpvpn_router_associations',
+                  'bgpvpn_port_associations'):
+        op.add_column(table,
+                      sa.Column('revision_number', sa.BigInteger(),
+                                nullable=False, server_default='0'))
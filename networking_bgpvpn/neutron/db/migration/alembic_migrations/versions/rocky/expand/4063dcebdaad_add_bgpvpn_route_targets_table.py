@@ -0,0 +1,72 @@
+# Copyright 2018 <PUT YOUR NAME/COMPANY HERE>
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add table for BGPVPN route targets and route distinguishers
+
+The values of the route target and route distinguisher columns of the
+bgpvpns table are copied to the new table, which is what the servers read
+once upgraded, the columns being dropped by the contract migration.
+
+Revision ID: 4063dcebdaad
+Revises: 666c706fea3b
+Create Date: 2018-06-04 10:12:31.204512
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4063dcebdaad'
+down_revision = '666c706fea3b'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+RTRD_KINDS = ('route_targets', 'import_targets', 'export_targets',
+              'route_distinguishers')
+
+bgpvpns = sa.Table(
+    'bgpvpns', sa.MetaData(),
+    sa.Column('id', sa.String(36)),
+    *[sa.Column(kind, sa.String(255)) for kind in RTRD_KINDS])
+
+
+def upgrade():
+    bgpvpn_route_targets = op.create_table(
+        'bgpvpn_route_targets',
+        sa.Column('bgpvpn_id', sa.String(length=36), nullable=False),
+        sa.ForeignKeyConstraint(['bgpvpn_id'], ['bgpvpns.id'],
+                                ondelete='CASCADE'),
+        sa.Column('kind', sa.Enum('route_targets', 'import_targets',
+                                  'export_targets', 'route_distinguishers',
+                                  name='bgpvpn_route_target_kind'),
+                  nullable=False),
+        sa.Column('value', sa.String(64), index=True, nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('bgpvpn_id', 'kind', 'value')
+    )
+
+    rows = []
+    for bgpvpn in op.get_bind().execute(sa.select([bgpvpns])):
+        for kind in RTRD_KINDS:
+            values = getattr(bgpvpn, kind)
+            if not values:
+                continue
+            for position, value in enumerate(values.split(',')):
+                rows.append({'bgpvpn_id': bgpvpn.id,
+                             'kind': kind,
+                             'value': value,
+                             'position': position})
+    if rows:
+        op.bulk_insert(bgpvpn_route_targets, rows)
@@ -0,0 +1,35 @@
+# Copyright 2018 <PUT YOUR NAME/COMPANY HERE>
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add the backend synchronization status of BGPVPNs
+
+Revision ID: 5c8e1f4b7a29
+Revises: 9d6b2c4e8a13
+Create Date: 2018-06-25 14:03:48.216734
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5c8e1f4b7a29'
+down_revision = '9d6b2c4e8a13'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('bgpvpns',
+                  sa.Column('status', sa.String(16), nullable=False,
+                            server_default='ACTIVE'))
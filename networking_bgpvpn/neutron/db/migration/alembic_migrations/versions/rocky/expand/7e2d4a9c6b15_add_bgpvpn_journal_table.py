@@ -0,0 +1,52 @@
+# Copyright 2018 <PUT YOUR NAME/COMPANY HERE>
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add table for the journal of changes to sync to the backends
+
+Revision ID: 7e2d4a9c6b15
+Revises: 5c8e1f4b7a29
+Create Date: 2018-06-27 11:18:32.504917
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '7e2d4a9c6b15'
+down_revision = '5c8e1f4b7a29'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'bgpvpn_journal',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                  primary_key=True, autoincrement=True),
+        sa.Column('resource_type', sa.String(32), nullable=False),
+        sa.Column('resource_id', sa.String(36), nullable=False),
+        sa.Column('bgpvpn_id', sa.String(36), index=True, nullable=False),
+        sa.Column('operation', sa.Enum('create', 'update', 'delete',
+                                       name='bgpvpn_journal_operation'),
+                  nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('state', sa.Enum('pending', 'processing', 'failed',
+                                   name='bgpvpn_journal_state'),
+                  nullable=False),
+        sa.Column('retry_count', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Index('ix_bgpvpn_journal_state_next_attempt_at',
+                 'state', 'next_attempt_at')
+    )
@@ -0,0 +1,45 @@
+# Copyright 2018 <PUT YOUR NAME/COMPANY HERE>
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add table for the log of changes of BGPVPNs and associations
+
+Revision ID: 9d6b2c4e8a13
+Revises: 3a0b5e3d1c27
+Create Date: 2018-06-22 09:41:05.712390
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9d6b2c4e8a13'
+down_revision = '3a0b5e3d1c27'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'bgpvpn_changes',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
+                  primary_key=True, autoincrement=True),
+        sa.Column('resource_type', sa.String(32), nullable=False),
+        sa.Column('resource_id', sa.String(36), nullable=False),
+        sa.Column('bgpvpn_id', sa.String(36), index=True, nullable=False),
+        sa.Column('operation', sa.Enum('create', 'update', 'delete',
+                                       name='bgpvpn_change_operation'),
+                  nullable=False),
+        sa.Column('revision_number', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), index=True, nullable=False)
+    )
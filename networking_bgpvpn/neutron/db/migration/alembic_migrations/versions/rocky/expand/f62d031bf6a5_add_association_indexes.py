@@ -0,0 +1,41 @@
+# Copyright 2018 <PUT YOUR NAME/COMPANY HERE>
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add indexes on associated resources of BGPVPN associations
+
+Revision ID: f62d031bf6a5
+Revises: 4063dcebdaad
+Create Date: 2018-06-11 14:02:47.318260
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f62d031bf6a5'
+down_revision = '4063dcebdaad'
+
+from alembic import op
+
+
+def upgrade():
+    for resource in ('network', 'router', 'port'):
+        table = 'bgpvpn_%s_associations' % resource
+        column = '%s_id' % resource
+        op.create_index(op.f('ix_%s_%s_bgpvpn_id' % (table, column)),
+                        table, [column, 'bgpvpn_id'], unique=True)
+
+    for column in ('bgpvpn_id', 'port_association_id'):
+        op.create_index(
+            op.f('ix_bgpvpn_port_association_routes_%s' % column),
+            'bgpvpn_port_association_routes', [column], unique=False)
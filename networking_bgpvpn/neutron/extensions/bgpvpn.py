@@ -37,6 +37,15 @@ LOG = log.getLogger(__name__)
 
 extensions.append_api_extensions_path(bgpvpn_extensions.__path__)
 
+# PUT /bgpvpn/bgpvpns/<id>/<action> member actions, setting the exact list
+# of networks or routers associated to a BGPVPN
+ACTION_MAP = {
+    bgpvpn_api_def.RESOURCE_NAME: {
+        'replace_network_associations': 'PUT',
+        'replace_router_associations': 'PUT',
+    }
+}
+
 
 class BGPVPNNotFound(n_exc.NotFound):
     message = _("BGPVPN %(id)s could not be found")
@@ -108,8 +117,10 @@ class Bgpvpn(api_extensions.APIExtensionDescriptor):
             plural_mappings,
             bgpvpn_api_def.RESOURCE_ATTRIBUTE_MAP,
             bgpvpn_api_def.ALIAS,
+            action_map=ACTION_MAP,
             register_quota=True,
-            translate_name=True)
+            translate_name=True,
+            allow_bulk=True)
         plugin = directory.get_plugin(bgpvpn_api_def.ALIAS)
         for collection_name in bgpvpn_api_def.SUB_RESOURCE_ATTRIBUTE_MAP:
             # Special handling needed for sub-resources with 'y' ending
@@ -157,7 +168,8 @@ class BGPVPNPluginBase(libbase.ServicePluginBase):
         pass
 
     @abc.abstractmethod
-    def get_bgpvpns(self, context, filters=None, fields=None):
+    def get_bgpvpns(self, context, filters=None, fields=None, sorts=None,
+                    limit=None, marker=None, page_reverse=False):
         pass
 
     @abc.abstractmethod
@@ -184,7 +196,9 @@ class BGPVPNPluginBase(libbase.ServicePluginBase):
 
     @abc.abstractmethod
     def get_bgpvpn_network_associations(self, context, bgpvpn_id,
-                                        filters=None, fields=None):
+                                        filters=None, fields=None,
+                                        sorts=None, limit=None, marker=None,
+                                        page_reverse=False):
         pass
 
     @abc.abstractmethod
@@ -208,7 +222,8 @@ class BGPVPNPluginBase(libbase.ServicePluginBase):
 
     @abc.abstractmethod
     def get_bgpvpn_router_associations(self, context, bgpvpn_id, filters=None,
-                                       fields=None):
+                                       fields=None, sorts=None, limit=None,
+                                       marker=None, page_reverse=False):
         pass
 
     @abc.abstractmethod
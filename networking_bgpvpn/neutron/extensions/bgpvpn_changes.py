@@ -0,0 +1,120 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.api import extensions
+from neutron.api.v2 import resource
+from neutron import wsgi
+
+from neutron_lib.api.definitions import bgpvpn as bgpvpn_api_def
+from neutron_lib.api import extensions as api_extensions
+from neutron_lib.api import faults
+from neutron_lib import exceptions as n_exc
+from neutron_lib.plugins import directory
+
+from networking_bgpvpn._i18n import _
+
+
+ALIAS = 'bgpvpn-changes'
+COLLECTION_NAME = 'changes'
+
+
+def _int_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = -1
+    if value < 0:
+        raise n_exc.BadRequest(
+            resource=COLLECTION_NAME,
+            msg=_("%s must be a non-negative integer") % name)
+    return value
+
+
+class BGPVPNChangesController(wsgi.Controller):
+    """Admin API to the log of changes of BGPVPNs and associations
+
+    GET /bgpvpn/changes?cursor=<id>&limit=<count> returns the changes
+    following the change with the given id, PUT /bgpvpn/changes/prune
+    with a {"cursor": <id>} and/or {"max_age": <seconds>} body forgets the
+    changes up to the given id or older than the given age.
+    """
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+
+    @staticmethod
+    def _check_admin(context):
+        if not context.is_admin:
+            raise n_exc.AdminRequired(
+                reason=_("Only admin can access the BGPVPN change log"))
+
+    def index(self, request, **kwargs):
+        context = request.context
+        self._check_admin(context)
+        changes = self._plugin.get_bgpvpn_changes(
+            context, cursor=_int_param(request.GET, 'cursor'),
+            limit=_int_param(request.GET, 'limit'))
+        for change in changes:
+            change['created_at'] = change['created_at'].isoformat()
+        return {'bgpvpn_changes': changes}
+
+    def prune(self, request, body=None, **kwargs):
+        context = request.context
+        self._check_admin(context)
+        body = body or {}
+        pruned = self._plugin.prune_bgpvpn_changes(
+            context, cursor=_int_param(body, 'cursor'),
+            max_age=_int_param(body, 'max_age'))
+        return {'pruned': pruned}
+
+
+class Bgpvpn_changes(api_extensions.ExtensionDescriptor):
+    """Log of the changes of BGPVPNs and of their associations
+
+    Each create, update or delete of a BGPVPN or association is logged in
+    the transaction making it, so that consumers can sync incrementally
+    from the last change they have processed rather than listing all
+    BGPVPNs and associations.
+    """
+
+    @classmethod
+    def get_name(cls):
+        return "BGPVPN changes"
+
+    @classmethod
+    def get_alias(cls):
+        return ALIAS
+
+    @classmethod
+    def get_description(cls):
+        return "Log of the changes of BGPVPNs and of their associations"
+
+    @classmethod
+    def get_updated(cls):
+        return "2018-06-22T10:00:00-00:00"
+
+    def get_required_extensions(self):
+        return [bgpvpn_api_def.ALIAS]
+
+    @classmethod
+    def get_resources(cls):
+        controller = resource.Resource(
+            BGPVPNChangesController(
+                directory.get_plugin(bgpvpn_api_def.ALIAS)),
+            faults=faults.FAULT_MAP)
+        return [extensions.ResourceExtension(
+            COLLECTION_NAME, controller,
+            path_prefix=bgpvpn_api_def.ALIAS,
+            collection_actions={'prune': 'PUT'})]
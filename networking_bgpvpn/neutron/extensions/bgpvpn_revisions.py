@@ -0,0 +1,85 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import webob.exc
+
+from neutron_lib.api.definitions import bgpvpn as bgpvpn_api_def
+from neutron_lib.api.definitions import bgpvpn_routes_control as bgpvpn_rc_def
+from neutron_lib.api import extensions as api_extensions
+
+from networking_bgpvpn._i18n import _
+
+
+ALIAS = 'bgpvpn-revisions'
+REVISION_NUMBER = 'revision_number'
+
+_REVISION_NUMBER_ATTRIBUTE = {
+    REVISION_NUMBER: {'allow_post': False, 'allow_put': False,
+                      'is_visible': True, 'is_filter': True,
+                      'is_sort_key': True},
+}
+
+RESOURCE_ATTRIBUTE_MAP = {
+    bgpvpn_api_def.COLLECTION_NAME: dict(_REVISION_NUMBER_ATTRIBUTE),
+}
+
+SUB_RESOURCE_ATTRIBUTE_MAP = dict(
+    (collection, {'parameters': dict(_REVISION_NUMBER_ATTRIBUTE)})
+    for collection in ('network_associations', 'router_associations',
+                       bgpvpn_rc_def.PORT_ASSOCIATIONS))
+
+
+class BGPVPNRevisionNumberConstraintFailed(webob.exc.HTTPPreconditionFailed):
+
+    def __init__(self, expected, current):
+        detail = (_("Constrained to revision number %(expected)s, but "
+                    "current revision number is %(current)s") %
+                  {'expected': expected, 'current': current})
+        super(BGPVPNRevisionNumberConstraintFailed, self).__init__(
+            detail=detail)
+
+
+class Bgpvpn_revisions(api_extensions.ExtensionDescriptor):
+    """Revision numbers of BGPVPNs and of their associations
+
+    The revision number of a BGPVPN or association is bumped by each of its
+    changes, the revision number of a BGPVPN being also bumped by changes of
+    its associations. Updates and deletes can be made conditional with an
+    'If-Match: revision_number=<revision number>' header.
+    """
+
+    @classmethod
+    def get_name(cls):
+        return "BGPVPN revisions"
+
+    @classmethod
+    def get_alias(cls):
+        return ALIAS
+
+    @classmethod
+    def get_description(cls):
+        return ("Revision numbers of BGPVPNs and of their associations, "
+                "bumped on every change")
+
+    @classmethod
+    def get_updated(cls):
+        return "2018-06-20T10:00:00-00:00"
+
+    def get_required_extensions(self):
+        return [bgpvpn_api_def.ALIAS]
+
+    def get_extended_resources(self, version):
+        if version == "2.0":
+            resources = dict(RESOURCE_ATTRIBUTE_MAP)
+            resources.update(SUB_RESOURCE_ATTRIBUTE_MAP)
+            return resources
+        return {}
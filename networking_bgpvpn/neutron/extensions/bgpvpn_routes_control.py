@@ -59,6 +59,10 @@ class BGPVPNPortAssocRouteBGPVPNTypeDiffer(n_exc.BadRequest):
                 "differing from type of associated BGPVPN %(bgpvpn_type)s)")
 
 
+class BGPVPNPortAssocRoutesInvalid(n_exc.BadRequest):
+    message = _("invalid bgpvpn routes: %(errors)s")
+
+
 class Bgpvpn_routes_control(api_extensions.APIExtensionDescriptor):
 
     api_definition = api_def
@@ -119,7 +123,9 @@ class BGPVPNRoutesControlPluginBase(libbase.ServicePluginBase):
 
     @abc.abstractmethod
     def get_bgpvpn_port_associations(self, context, bgpvpn_id,
-                                     filters=None, fields=None):
+                                     filters=None, fields=None, sorts=None,
+                                     limit=None, marker=None,
+                                     page_reverse=False):
         pass
 
     @abc.abstractmethod
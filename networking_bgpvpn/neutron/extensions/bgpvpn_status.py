@@ -0,0 +1,61 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron_lib.api.definitions import bgpvpn as bgpvpn_api_def
+from neutron_lib.api import extensions as api_extensions
+
+
+ALIAS = 'bgpvpn-status'
+STATUS = 'status'
+
+RESOURCE_ATTRIBUTE_MAP = {
+    bgpvpn_api_def.COLLECTION_NAME: {
+        STATUS: {'allow_post': False, 'allow_put': False,
+                 'is_visible': True, 'is_filter': True,
+                 'is_sort_key': True},
+    },
+}
+
+
+class Bgpvpn_status(api_extensions.ExtensionDescriptor):
+    """Backend synchronization status of BGPVPNs
+
+    The status of a BGPVPN is PENDING_CREATE until its creation is pushed to
+    the backend, PENDING_UPDATE while changes of the BGPVPN or of its
+    associations are being pushed, and then ACTIVE, or ERROR if pushing one
+    of them failed.
+    """
+
+    @classmethod
+    def get_name(cls):
+        return "BGPVPN status"
+
+    @classmethod
+    def get_alias(cls):
+        return ALIAS
+
+    @classmethod
+    def get_description(cls):
+        return ("Status of the synchronization of BGPVPNs with the backend, "
+                "when their changes are pushed asynchronously")
+
+    @classmethod
+    def get_updated(cls):
+        return "2018-06-25T10:00:00-00:00"
+
+    def get_required_extensions(self):
+        return [bgpvpn_api_def.ALIAS]
+
+    def get_extended_resources(self, version):
+        if version == "2.0":
+            return RESOURCE_ATTRIBUTE_MAP
+        return {}
@@ -13,6 +13,10 @@
 from neutron.conf.services import provider_configuration
 from oslo_config import cfg
 
+from networking_bgpvpn.neutron.services.common import cache
+from networking_bgpvpn.neutron.services.common import coalescing
+from networking_bgpvpn.neutron.services.common import journal
+from networking_bgpvpn.neutron.services.common import task_queue
 from networking_bgpvpn.neutron.services.service_drivers.opencontrail \
     import opencontrail_client
 
@@ -41,3 +45,27 @@ def list_opencontrail_driver_opts():
     return [
         ('apiserver', opencontrail_client.opencontrail_opts),
     ]
+
+
+def list_bgpvpn_cache_opts():
+    return [
+        ('bgpvpn_cache', cache.bgpvpn_cache_opts),
+    ]
+
+
+def list_bgpvpn_async_postcommit_opts():
+    return [
+        ('bgpvpn_async_postcommit', task_queue.bgpvpn_async_postcommit_opts),
+    ]
+
+
+def list_bgpvpn_journal_opts():
+    return [
+        ('bgpvpn_journal', journal.bgpvpn_journal_opts),
+    ]
+
+
+def list_bgpvpn_push_coalescing_opts():
+    return [
+        ('bgpvpn_push_coalescing', coalescing.bgpvpn_push_coalescing_opts),
+    ]
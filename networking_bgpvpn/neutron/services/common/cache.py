@@ -0,0 +1,135 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import copy
+import threading
+
+from oslo_config import cfg
+from oslo_utils import timeutils
+
+from networking_bgpvpn._i18n import _
+
+bgpvpn_cache_opts = [
+    cfg.BoolOpt('enabled', default=False,
+                help=_('Cache the BGPVPNs read by the BGPVPN service plugin '
+                       'and its database backed drivers, rather than '
+                       'loading them from the database on each read.')),
+    cfg.IntOpt('max_size', default=1000, min=1,
+               help=_('Maximum number of BGPVPNs in the cache, the least '
+                      'recently used ones being evicted first.')),
+    cfg.IntOpt('ttl', default=60, min=0,
+               help=_('Number of seconds after which a cached BGPVPN is '
+                      'loaded again from the database, 0 to keep it until '
+                      'it is changed or evicted.')),
+    cfg.BoolOpt('check_revision_number', default=True,
+                help=_('Check that the revision number of a cached BGPVPN '
+                       'is still the one in the database before using it, '
+                       'so that the changes made by other neutron-server '
+                       'workers are seen. This only reads the revision '
+                       'number column of the BGPVPN row. Can be disabled '
+                       'when neutron-server runs a single worker.')),
+]
+cfg.CONF.register_opts(bgpvpn_cache_opts, 'bgpvpn_cache')
+
+
+class BGPVPNCache(object):
+    """Bounded LRU cache of BGPVPN dicts, with an optional time to live
+
+    The cache holds and returns copies of the dicts, which their users can
+    modify. Changes made by other processes are not seen by the cache: its
+    users check that a returned BGPVPN is current, and call discard_stale
+    otherwise. Each invalidation bumps a generation, and a dict read from the
+    database is only cached if no invalidation happened since the read
+    started, so that a read racing with a change does not cache the state
+    before the change:
+
+        generation = cache.generation
+        bgpvpn = <read from database>
+        cache.put(bgpvpn['id'], bgpvpn, generation)
+    """
+
+    def __init__(self, max_size, ttl=0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    def get(self, id):
+        with self._lock:
+            entry = self._entries.pop(id, None)
+            if entry is not None and (
+                    self.ttl and timeutils.now() - entry[1] > self.ttl):
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[id] = entry
+            self.hits += 1
+            return copy.deepcopy(entry[0])
+
+    def put(self, id, value, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries.pop(id, None)
+            self._entries[id] = (copy.deepcopy(value), timeutils.now())
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard_stale(self, id):
+        """Discard a BGPVPN found outdated after get returned it
+
+        The get is counted as a miss rather than as a hit.
+        """
+        with self._lock:
+            self._entries.pop(id, None)
+            self.hits -= 1
+            self.misses += 1
+            self.stale += 1
+
+    def invalidate(self, id):
+        with self._lock:
+            self.generation += 1
+            if self._entries.pop(id, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_matching(self, predicate):
+        """Invalidate the cached BGPVPNs for which predicate is true"""
+        with self._lock:
+            self.generation += 1
+            for id in [id for id, entry in self._entries.items()
+                       if predicate(entry[0])]:
+                del self._entries[id]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries),
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'invalidations': self.invalidations,
+                    'stale': self.stale}
@@ -0,0 +1,113 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from oslo_config import cfg
+from oslo_log import log
+
+from networking_bgpvpn._i18n import _
+
+LOG = log.getLogger(__name__)
+
+bgpvpn_push_coalescing_opts = [
+    cfg.FloatOpt('window', default=0.0, min=0.0,
+                 help=_('Number of seconds during which the updates of a '
+                        'BGPVPN and the changes of its associations are '
+                        'coalesced into a single push of the resulting '
+                        'BGPVPN to the backend, for the drivers pushing '
+                        'whole BGPVPNs. 0 disables coalescing, each change '
+                        'being pushed by the request making it. Coalesced '
+                        'pushes happen after the requests returned, so a '
+                        'failed push is not rolled back; the creations of '
+                        'associations of drivers rolling them back, such as '
+                        'OpenDaylight, are still pushed by their '
+                        'requests.')),
+]
+cfg.CONF.register_opts(bgpvpn_push_coalescing_opts, 'bgpvpn_push_coalescing')
+
+
+class PushCoalescer(object):
+    """Coalesces the pushes of a key requested within a time window
+
+    The first request for a key schedules push(key) window seconds later, and
+    the requests made until then are absorbed by this push, which, running
+    after them, sends their final state. A request made while the push runs
+    schedules another push.
+    """
+
+    def __init__(self, window, push):
+        self.window = window
+        self.push = push
+        self._lock = threading.Lock()
+        self._timers = {}
+        self.requested = 0
+        self.coalesced = 0
+        self.pushed = 0
+        self.failures = 0
+
+    def request(self, key):
+        with self._lock:
+            self.requested += 1
+            if key in self._timers:
+                self.coalesced += 1
+                return
+            timer = threading.Timer(self.window, self._push_scheduled,
+                                    args=(key,))
+            timer.daemon = True
+            self._timers[key] = timer
+            timer.start()
+
+    def _push_scheduled(self, key):
+        with self._lock:
+            # the push may have been cancelled or flushed, and another one
+            # scheduled, in the meantime
+            if self._timers.get(key) is not threading.current_thread():
+                return
+            del self._timers[key]
+        self._push(key)
+
+    def _push(self, key):
+        try:
+            self.push(key)
+        except Exception:
+            LOG.exception("Coalesced push of %s failed", key)
+            failed = True
+        else:
+            failed = False
+        with self._lock:
+            self.pushed += 1
+            if failed:
+                self.failures += 1
+
+    def cancel(self, key):
+        """Cancel the scheduled push of key, if any"""
+        with self._lock:
+            timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+    def flush(self):
+        """Run the scheduled pushes now, rather than at the end of windows"""
+        with self._lock:
+            timers, self._timers = self._timers, {}
+        for key, timer in timers.items():
+            timer.cancel()
+            self._push(key)
+
+    def stats(self):
+        with self._lock:
+            return {'scheduled': len(self._timers),
+                    'requested': self.requested,
+                    'coalesced': self.coalesced,
+                    'pushed': self.pushed,
+                    'failures': self.failures}
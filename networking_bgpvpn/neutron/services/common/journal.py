@@ -0,0 +1,152 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import threading
+
+from neutron_lib import context as n_context
+from oslo_config import cfg
+from oslo_log import log
+
+from networking_bgpvpn._i18n import _
+from networking_bgpvpn.neutron.services.common import task_queue
+
+LOG = log.getLogger(__name__)
+
+bgpvpn_journal_opts = [
+    cfg.IntOpt('sync_workers', default=4, min=1,
+               help=_('Number of threads syncing the journal entries of '
+                      'the BGPVPN drivers using the journal with their '
+                      'backend. The entries of a BGPVPN are synced in '
+                      'order.')),
+    cfg.IntOpt('max_retries', default=5, min=0,
+               help=_('Number of times syncing a journal entry is retried '
+                      'before the entry is marked as failed.')),
+    cfg.IntOpt('retry_interval', default=2, min=1,
+               help=_('Number of seconds before the first retry of a '
+                      'journal entry, doubled at each retry.')),
+    cfg.IntOpt('max_retry_interval', default=300, min=1,
+               help=_('Maximum number of seconds between two retries of a '
+                      'journal entry.')),
+    cfg.IntOpt('sync_interval', default=10, min=1,
+               help=_('Number of seconds between two checks of the journal '
+                      'for entries to sync, in addition to the checks done '
+                      'when entries are written.')),
+    cfg.IntOpt('processing_timeout', default=100, min=1,
+               help=_('Number of seconds after which a journal entry being '
+                      'synced is synced again, in case the neutron-server '
+                      'syncing it died.')),
+]
+cfg.CONF.register_opts(bgpvpn_journal_opts, 'bgpvpn_journal')
+
+
+class JournalSyncWorker(object):
+    """Syncs the entries of the BGPVPN journal with a backend
+
+    A thread claims the entries ready to be synced, and runs
+    sync_entry(context, entry) for each of them in worker threads, the
+    entries of a BGPVPN being synced by the same worker. A synced entry is
+    deleted, an entry whose sync raised is retried with an exponential
+    backoff, and failed after max_retries retries.
+
+    The journal is checked every sync_interval seconds, and when wake is
+    called, typically once entries are committed. The thread is (re)started
+    by start and wake in the process calling them, since threads do not
+    survive the forks of the neutron-server workers.
+    """
+
+    def __init__(self, journal_db, sync_entry, sync_workers=4,
+                 max_retries=5, retry_interval=2, max_retry_interval=300,
+                 sync_interval=10, processing_timeout=100):
+        self.journal_db = journal_db
+        self.sync_entry = sync_entry
+        self.sync_workers = sync_workers
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.sync_interval = sync_interval
+        self.processing_timeout = processing_timeout
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stopped = False
+        self._pid = None
+        self._thread = None
+        self._queue = None
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid() or self._stopped:
+                return
+            self._pid = os.getpid()
+            self._queue = task_queue.OrderedTaskQueue(
+                self.sync_workers, self.sync_workers)
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def wake(self):
+        """Check the journal for entries to sync now"""
+        self.start()
+        self._wake_event.set()
+
+    def stop(self):
+        """Stop syncing, once the entries being synced are synced"""
+        with self._lock:
+            self._stopped = True
+            thread, self._thread = self._thread, None
+        self._wake_event.set()
+        if thread is not None and self._pid == os.getpid():
+            thread.join()
+            self._queue.stop()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake_event.clear()
+            try:
+                synced = self.sync_pending_entries()
+            except Exception:
+                LOG.exception("Failed to sync the BGPVPN journal")
+                synced = 0
+            if not synced:
+                self._wake_event.wait(self.sync_interval)
+
+    def sync_pending_entries(self):
+        """Sync the entries ready to be synced, return how many were"""
+        context = n_context.get_admin_context()
+        entries = self.journal_db.claim_journal_entries(
+            context, self.sync_workers, self.processing_timeout)
+        for entry in entries:
+            self._queue.submit(entry['bgpvpn_id'],
+                               lambda entry=entry: self._sync(entry))
+        self._queue.join()
+        return len(entries)
+
+    def _sync(self, entry):
+        context = n_context.get_admin_context()
+        try:
+            self.sync_entry(context, entry)
+        except Exception:
+            if entry['retry_count'] >= self.max_retries:
+                LOG.exception("Failed to sync %(operation)s of "
+                              "%(resource_type)s %(resource_id)s, giving up "
+                              "after %(retry_count)d retries", entry)
+                delay = None
+            else:
+                delay = min(self.retry_interval * 2 ** entry['retry_count'],
+                            self.max_retry_interval)
+                LOG.warning("Failed to sync %(operation)s of "
+                            "%(resource_type)s %(resource_id)s, retrying in "
+                            "%(delay)d seconds",
+                            dict(entry, delay=delay), exc_info=True)
+            self.journal_db.retry_journal_entry(context, entry['id'], delay)
+        else:
+            self.journal_db.complete_journal_entry(context, entry['id'])
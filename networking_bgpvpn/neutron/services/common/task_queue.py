@@ -0,0 +1,177 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import os
+import threading
+
+from oslo_config import cfg
+from oslo_log import log
+from oslo_utils import timeutils
+from six.moves import queue
+
+from networking_bgpvpn._i18n import _
+
+LOG = log.getLogger(__name__)
+
+bgpvpn_async_postcommit_opts = [
+    cfg.BoolOpt('enabled', default=False,
+                help=_('Run the postcommit operations of the database backed '
+                       'BGPVPN drivers, which push the changes to the '
+                       'backend, in worker threads rather than in the API '
+                       'requests. The status attribute of a BGPVPN then '
+                       'shows whether its changes were pushed.')),
+    cfg.IntOpt('workers', default=4, min=1,
+               help=_('Number of worker threads running the postcommit '
+                      'operations. The operations of a given BGPVPN are run '
+                      'in order by the same worker.')),
+    cfg.IntOpt('max_queue_size', default=1000, min=1,
+               help=_('Maximum number of postcommit operations waiting for '
+                      'each worker. API requests wait for a free slot when '
+                      'the queue of their worker is full.')),
+]
+cfg.CONF.register_opts(bgpvpn_async_postcommit_opts,
+                       'bgpvpn_async_postcommit')
+
+_STOP = object()
+
+
+class OrderedTaskQueue(object):
+    """Bounded queue of tasks run by worker threads, in order per key
+
+    The tasks of a key are always run by the same worker, hence in the order
+    of their submission. done_callback(key, failed) is called by the worker
+    when it has run the last pending task of a key, failed telling whether
+    any task of the key failed since the previous call for this key.
+
+    The workers are started by the first submit of the process, since
+    threads do not survive the forks of the neutron-server workers.
+    """
+
+    def __init__(self, workers, max_size, done_callback=None):
+        self.done_callback = done_callback
+        self.workers = workers
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pending = collections.defaultdict(int)
+        self._failed = set()
+        self.submitted = 0
+        self.executed = 0
+        self.failures = 0
+        self.total_wait_time = 0.0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+        self._pid = None
+        self._queues = []
+        self._threads = []
+
+    def _start(self):
+        # called with self._lock held
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._queues = [queue.Queue(self.max_size)
+                        for _i in range(self.workers)]
+        self._threads = []
+        for worker_queue in self._queues:
+            thread = threading.Thread(target=self._run, args=(worker_queue,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, task):
+        """Queue task, a callable without argument, to be run for key
+
+        Blocks while the queue of the worker of key is full.
+        """
+        with self._lock:
+            self._start()
+            self._pending[key] += 1
+            self.submitted += 1
+            worker_queue = self._queues[hash(key) % len(self._queues)]
+        worker_queue.put((key, task, timeutils.now()))
+
+    def _run(self, worker_queue):
+        while True:
+            item = worker_queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._run_task(*item)
+            finally:
+                worker_queue.task_done()
+
+    def _run_task(self, key, task, submitted_at):
+        started_at = timeutils.now()
+        failed = False
+        try:
+            task()
+        except Exception:
+            LOG.exception("Postcommit task for %s failed", key)
+            failed = True
+        run_time = timeutils.now() - started_at
+        with self._lock:
+            self.executed += 1
+            self.total_wait_time += started_at - submitted_at
+            self.total_run_time += run_time
+            self.max_run_time = max(self.max_run_time, run_time)
+            if failed:
+                self.failures += 1
+                self._failed.add(key)
+            self._pending[key] -= 1
+            done = not self._pending[key]
+            if done:
+                del self._pending[key]
+                failed = key in self._failed
+                self._failed.discard(key)
+        if done and self.done_callback is not None:
+            try:
+                self.done_callback(key, failed)
+            except Exception:
+                LOG.exception("Completion of postcommit tasks for %s "
+                              "failed", key)
+
+    def pending(self, key):
+        """Return the number of tasks of key not run yet"""
+        with self._lock:
+            return self._pending.get(key, 0)
+
+    def join(self):
+        """Wait until all the submitted tasks are run"""
+        if self._pid != os.getpid():
+            return
+        for worker_queue in self._queues:
+            worker_queue.join()
+
+    def stop(self):
+        """Stop the workers once they have run the submitted tasks"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._pid = None
+        for worker_queue in self._queues:
+            worker_queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self):
+        with self._lock:
+            executed = self.executed
+            return {'depth': sum(self._pending.values()),
+                    'submitted': self.submitted,
+                    'executed': executed,
+                    'failures': self.failures,
+                    'avg_wait_time':
+                        self.total_wait_time / executed if executed else 0.0,
+                    'avg_run_time':
+                        self.total_run_time / executed if executed else 0.0,
+                    'max_run_time': self.max_run_time}
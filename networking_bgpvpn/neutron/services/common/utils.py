@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 
 from neutron_lib.api.definitions import bgpvpn as bgpvpn_def
 from neutron_lib.api.definitions import bgpvpn_routes_control as bgpvpn_rc_def
@@ -117,6 +118,28 @@ def make_port_assoc_dict(id, tenant_id, bgpvpn_id, port_id, fields=None):
     return filter_fields(res, fields)
 
 
+def get_port_assoc_routes_differences(current_routes, old_routes):
+    """Compare 2 lists of routes of a port association
+
+    Returns the routes added to and removed from old_routes.
+    """
+    def key(route):
+        return (route['type'], route.get('local_pref'), route.get('prefix'),
+                route.get('bgpvpn_id'))
+
+    old = collections.defaultdict(list)
+    for route in old_routes:
+        old[key(route)].append(route)
+    added = []
+    for route in current_routes:
+        if old.get(key(route)):
+            old[key(route)].pop()
+        else:
+            added.append(route)
+    removed = [route for routes in old.values() for route in routes]
+    return (added, removed)
+
+
 def get_bgpvpn_differences(current_dict, old_dict):
     """Compare 2 BGP VPN
 
@@ -13,7 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import copy
+import itertools
 
 from neutron.db import servicetype_db as st_db
 from neutron.services import provider_configuration as pconf
@@ -23,8 +25,8 @@ from neutron_lib.api.definitions import bgpvpn as bgpvpn_def
 from neutron_lib.callbacks import events
 from neutron_lib.callbacks import registry
 from neutron_lib.callbacks import resources
-from neutron_lib import constants as const
 from neutron_lib import exceptions as n_exc
+from neutron_lib.exceptions import l3 as l3_exc
 from neutron_lib.plugins import constants as plugin_constants
 from neutron_lib.plugins import directory
 
@@ -33,6 +35,9 @@ from oslo_log import log
 from networking_bgpvpn._i18n import _
 
 from networking_bgpvpn.neutron.extensions import bgpvpn
+from networking_bgpvpn.neutron.extensions import bgpvpn_changes
+from networking_bgpvpn.neutron.extensions import bgpvpn_revisions
+from networking_bgpvpn.neutron.extensions import bgpvpn_status
 from networking_bgpvpn.neutron.extensions \
     import bgpvpn_routes_control as bgpvpn_rc
 from networking_bgpvpn.neutron.services.common import constants
@@ -65,6 +70,13 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
                  default_provider)
         self.driver = drivers[default_provider]
 
+        # sorting and pagination are done natively, rather than emulated by
+        # the Neutron API layer on full collections, if the driver does it
+        self.__native_sorting_support = self.driver.native_sorting_support
+        self.__native_pagination_support = (
+            self.driver.native_pagination_support)
+        self.__native_bulk_support = self.driver.native_bulk_support
+
         if len(drivers) > 1:
             LOG.warning("Multiple drivers configured for BGPVPN, although"
                         "running multiple drivers in parallel is not yet"
@@ -74,6 +86,12 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
     def supported_extension_aliases(self):
         exts = copy.copy(super(BGPVPNPlugin, self).supported_extension_aliases)
         exts += self.driver.more_supported_extension_aliases
+        if self.driver.revision_number_support:
+            exts.append(bgpvpn_revisions.ALIAS)
+        if self.driver.change_log_support:
+            exts.append(bgpvpn_changes.ALIAS)
+        if self.driver.status_support:
+            exts.append(bgpvpn_status.ALIAS)
         return exts
 
     @registry.receives(resources.ROUTER_INTERFACE, [events.BEFORE_CREATE])
@@ -82,8 +100,11 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
         context = kwargs.get('context')
         network_id = kwargs.get('network_id')
         router_id = kwargs.get('router_id')
+        # this runs on every router interface addition: only the existence
+        # of BGPVPNs is queried, and the network is only looked at if the
+        # router is bound to a BGPVPN
         try:
-            routers_bgpvpns = self.driver.get_bgpvpns(
+            router_bound = self.driver.bgpvpn_exists(
                 context,
                 filters={
                     'routers': [router_id],
@@ -91,15 +112,13 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
             )
         except bgpvpn.BGPVPNRouterAssociationNotSupported:
             return
-        nets_bgpvpns = self.driver.get_bgpvpns(
-            context,
-            filters={
-                'networks': [network_id],
-                'type': [constants.BGPVPN_L3],
-            },
-        )
 
-        if routers_bgpvpns and nets_bgpvpns:
+        if router_bound and self.driver.bgpvpn_exists(
+                context,
+                filters={
+                    'networks': [network_id],
+                    'type': [constants.BGPVPN_L3],
+                }):
             msg = _('It is not allowed to add an interface to a router if '
                     'both the router and the network are bound to an '
                     'L3 BGPVPN.')
@@ -108,57 +127,82 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
     def _validate_network(self, context, net_id):
         plugin = directory.get_plugin()
         network = plugin.get_network(context, net_id)
-        self._validate_network_has_router_assoc(context, network, plugin)
+        self._validate_network_has_router_assoc(context, [net_id])
         return network
 
-    def _validate_network_has_router_assoc(self, context, network, plugin):
-        filter = {'network_id': [network['id']],
-                  'device_owner': [const.DEVICE_OWNER_ROUTER_INTF]}
-        router_port = plugin.get_ports(context, filters=filter)
-        if router_port:
-            router_id = router_port[0]['device_id']
-            filter = {'tenant_id': [network['tenant_id']]}
-            bgpvpns = self.driver.get_bgpvpns(context, filters=filter)
-            bgpvpns = [str(bgpvpn['id']) for bgpvpn in bgpvpns
-                       if router_id in bgpvpn['routers']]
-            if bgpvpns:
+    def _validate_network_has_router_assoc(self, context, net_ids):
+        linked = collections.defaultdict(list)
+        for net_id, bgpvpn_id in self.driver.get_network_router_bgpvpns(
+                context, net_ids):
+            linked[net_id].append(str(bgpvpn_id))
+        for net_id in net_ids:
+            if net_id in linked:
                 msg = ('Network %(net_id)s is linked to a router which is '
                        'already associated to bgpvpn(s) %(bgpvpns)s'
-                       % {'net_id': network['id'],
-                          'bgpvpns': bgpvpns}
+                       % {'net_id': net_id,
+                          'bgpvpns': sorted(linked[net_id])}
                        )
                 raise n_exc.BadRequest(resource='bgpvpn', msg=msg)
 
+    def _validate_networks(self, context, net_ids):
+        """Batched _validate_network, returning networks by id"""
+        plugin = directory.get_plugin()
+        networks = dict((network['id'], network) for network in
+                        plugin.get_networks(context,
+                                            filters={'id': list(net_ids)}))
+        for net_id in net_ids:
+            if net_id not in networks:
+                raise n_exc.NetworkNotFound(net_id=net_id)
+        self._validate_network_has_router_assoc(context, net_ids)
+        return networks
+
     def _validate_router(self, context, router_id):
         l3_plugin = directory.get_plugin(plugin_constants.L3)
         router = l3_plugin.get_router(context, router_id)
-        plugin = directory.get_plugin()
-        self._validate_router_has_net_assocs(context, router, plugin)
+        self._validate_router_has_net_assocs(context, [router_id])
         return router
 
+    def _validate_routers(self, context, router_ids):
+        """Batched _validate_router, returning routers by id"""
+        l3_plugin = directory.get_plugin(plugin_constants.L3)
+        routers = dict((router['id'], router) for router in
+                       l3_plugin.get_routers(context,
+                                             filters={'id': list(router_ids)}))
+        for router_id in router_ids:
+            if router_id not in routers:
+                raise l3_exc.RouterNotFound(router_id=router_id)
+        self._validate_router_has_net_assocs(context, router_ids)
+        return routers
+
     def _validate_port(self, context, port_id):
         plugin = directory.get_plugin()
         port = plugin.get_port(context, port_id)
         return port
 
-    def _validate_router_has_net_assocs(self, context, router, plugin):
-        filter = {'device_id': [router['id']],
-                  'device_owner': [const.DEVICE_OWNER_ROUTER_INTF]}
-        router_ports = plugin.get_ports(context, filters=filter)
-        if router_ports:
-            filter = {'tenant_id': [router['tenant_id']]}
-            bgpvpns = self.driver.get_bgpvpns(context, filters=filter)
-            for port in router_ports:
-                bgpvpns = [str(bgpvpn['id']) for bgpvpn in bgpvpns
-                           if port['network_id'] in bgpvpn['networks']]
-                if bgpvpns:
-                    msg = ('router %(rtr_id)s has an attached network '
-                           '%(net_id)s which is already associated to '
-                           'bgpvpn(s) %(bgpvpns)s'
-                           % {'rtr_id': router['id'],
-                              'net_id': port['network_id'],
-                              'bgpvpns': bgpvpns})
-                    raise n_exc.BadRequest(resource='bgpvpn', msg=msg)
+    def _validate_ports(self, context, port_ids):
+        """Batched _validate_port, returning ports by id"""
+        plugin = directory.get_plugin()
+        ports = dict((port['id'], port) for port in
+                     plugin.get_ports(context, filters={'id': list(port_ids)}))
+        for port_id in port_ids:
+            if port_id not in ports:
+                raise n_exc.PortNotFound(port_id=port_id)
+        return ports
+
+    def _validate_router_has_net_assocs(self, context, router_ids):
+        linked = collections.defaultdict(list)
+        for router_id, net_id, bgpvpn_id in (
+                self.driver.get_router_network_bgpvpns(context, router_ids)):
+            linked[(router_id, net_id)].append(str(bgpvpn_id))
+        if linked:
+            router_id, net_id = min(linked)
+            msg = ('router %(rtr_id)s has an attached network '
+                   '%(net_id)s which is already associated to '
+                   'bgpvpn(s) %(bgpvpns)s'
+                   % {'rtr_id': router_id,
+                      'net_id': net_id,
+                      'bgpvpns': sorted(linked[(router_id, net_id)])})
+            raise n_exc.BadRequest(resource='bgpvpn', msg=msg)
 
     def get_plugin_type(self):
         return bgpvpn_def.ALIAS
@@ -170,12 +214,79 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
         bgpvpn = bgpvpn['bgpvpn']
         return self.driver.create_bgpvpn(context, bgpvpn)
 
-    def get_bgpvpns(self, context, filters=None, fields=None):
-        return self.driver.get_bgpvpns(context, filters, fields)
+    def create_bgpvpn_bulk(self, context, bgpvpns):
+        bgpvpns = [item['bgpvpn'] for item in bgpvpns['bgpvpns']]
+        return self.driver.create_bgpvpns(context, bgpvpns)
+
+    def get_bgpvpns(self, context, filters=None, fields=None, sorts=None,
+                    limit=None, marker=None, page_reverse=False):
+        return self.driver.get_bgpvpns(context, filters, fields,
+                                       sorts=sorts, limit=limit,
+                                       marker=marker,
+                                       page_reverse=page_reverse)
+
+    def get_bgpvpns_count(self, context, filters=None):
+        return self.driver.get_bgpvpns_count(context, filters)
 
     def get_bgpvpn(self, context, id, fields=None):
         return self.driver.get_bgpvpn(context, id, fields)
 
+    def get_bgpvpn_cache_stats(self):
+        """Return the size and hit/miss counters of the BGPVPN cache
+
+        None is returned if the driver does not cache BGPVPNs, see the
+        [bgpvpn_cache] configuration section.
+        """
+        cache_stats = getattr(self.driver, 'bgpvpn_cache_stats', None)
+        return cache_stats() if cache_stats else None
+
+    def get_bgpvpn_postcommit_stats(self):
+        """Return the metrics of the asynchronous postcommit operations
+
+        The number of operations queued or running ('depth'), the counts of
+        submitted, executed and failed operations, and the average time spent
+        waiting in the queue, and average and maximum execution times, in
+        seconds. None is returned if the driver runs the postcommit
+        operations synchronously, see the [bgpvpn_async_postcommit]
+        configuration section.
+        """
+        postcommit_stats = getattr(self.driver, 'postcommit_stats', None)
+        return postcommit_stats() if postcommit_stats else None
+
+    def get_bgpvpn_journal_stats(self):
+        """Return the number of journal entries in each state
+
+        The entries are 'pending', 'processing' or 'failed', synced entries
+        being deleted. None is returned if the driver does not sync its
+        backend from the journal.
+        """
+        journal_stats = getattr(self.driver, 'journal_stats', None)
+        return journal_stats() if journal_stats else None
+
+    def get_bgpvpn_push_coalescing_stats(self):
+        """Return the counts of the coalesced pushes of BGPVPNs
+
+        The number of BGPVPNs whose push is scheduled, of pushes requested by
+        changes, of requests absorbed by an already scheduled push, and of
+        pushes done and failed. None is returned if the driver does not
+        coalesce its pushes.
+        """
+        coalescing_stats = getattr(self.driver, 'push_coalescing_stats', None)
+        return coalescing_stats() if coalescing_stats else None
+
+    def get_bgpvpn_changes(self, context, cursor=None, limit=None):
+        """Return the changes of BGPVPNs and associations after cursor
+
+        Each change is a dict with the id to use as the cursor of the next
+        call, the type, id and revision number of the changed resource, the
+        id of its BGPVPN, and the 'create', 'update' or 'delete' operation.
+        """
+        return self.driver.get_changes(context, cursor, limit)
+
+    def prune_bgpvpn_changes(self, context, cursor=None, max_age=None):
+        """Forget the changes up to cursor, or older than max_age seconds"""
+        return self.driver.prune_changes(context, cursor, max_age)
+
     def update_bgpvpn(self, context, id, bgpvpn):
         bgpvpn = bgpvpn['bgpvpn']
         return self.driver.update_bgpvpn(context, id, bgpvpn)
@@ -199,13 +310,66 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
             raise n_exc.NotAuthorized(resource='bgpvpn', msg=msg)
         return self.driver.create_net_assoc(context, bgpvpn_id, net_assoc)
 
+    def create_bgpvpn_network_association_bulk(self, context, bgpvpn_id,
+                                               network_associations):
+        net_assocs = [item['network_association'] for item in
+                      network_associations['network_associations']]
+        bgpvpn = self.get_bgpvpn(context, bgpvpn_id)
+        self._validate_net_assocs(context, bgpvpn, net_assocs)
+        return self.driver.create_net_assocs(context, bgpvpn_id, net_assocs)
+
+    def _validate_net_assocs(self, context, bgpvpn, net_assocs):
+        # resources are validated with one query per resource type for the
+        # whole batch
+        nets = self._validate_networks(
+            context, [net_assoc['network_id'] for net_assoc in net_assocs])
+        for net_assoc in net_assocs:
+            if nets[net_assoc['network_id']]['tenant_id'] != (
+                    bgpvpn['tenant_id']):
+                msg = 'network doesn\'t belong to the bgpvpn owner'
+                raise n_exc.NotAuthorized(resource='bgpvpn', msg=msg)
+            if net_assoc['tenant_id'] != bgpvpn['tenant_id']:
+                msg = 'network association and bgpvpn should belong to\
+                    the same tenant'
+                raise n_exc.NotAuthorized(resource='bgpvpn', msg=msg)
+
+    @staticmethod
+    def _get_replace_ids(body, key):
+        ids = (body or {}).get(key)
+        if not isinstance(ids, list):
+            msg = "a list of %s is required" % key
+            raise n_exc.BadRequest(resource='bgpvpn', msg=msg)
+        return ids
+
+    def replace_network_associations(self, context, bgpvpn_id, body):
+        """Make the networks of body the networks associated to a BGPVPN
+
+        Member action of BGPVPNs, PUT with a {"network_ids": [...]} body.
+        Associations are created for the networks not associated yet and
+        deleted for the associated networks not in network_ids, in one
+        transaction. Returns the resulting network associations.
+        """
+        network_ids = self._get_replace_ids(body, 'network_ids')
+        net_assocs = self.driver.replace_net_assocs(
+            context, bgpvpn_id, network_ids, self._validate_net_assocs)
+        return {'network_associations': net_assocs}
+
     def get_bgpvpn_network_association(self, context, assoc_id, bgpvpn_id,
                                        fields=None):
         return self.driver.get_net_assoc(context, assoc_id, bgpvpn_id, fields)
 
     def get_bgpvpn_network_associations(self, context, bgpvpn_id,
-                                        filters=None, fields=None):
-        return self.driver.get_net_assocs(context, bgpvpn_id, filters, fields)
+                                        filters=None, fields=None,
+                                        sorts=None, limit=None, marker=None,
+                                        page_reverse=False):
+        return self.driver.get_net_assocs(context, bgpvpn_id, filters, fields,
+                                          sorts=sorts, limit=limit,
+                                          marker=marker,
+                                          page_reverse=page_reverse)
+
+    def get_bgpvpn_network_associations_count(self, context, bgpvpn_id,
+                                              filters=None):
+        return self.driver.get_net_assocs_count(context, bgpvpn_id, filters)
 
     def update_bgpvpn_network_association(self, context, assoc_id, bgpvpn_id,
                                           network_association):
@@ -215,6 +379,10 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
     def delete_bgpvpn_network_association(self, context, assoc_id, bgpvpn_id):
         self.driver.delete_net_assoc(context, assoc_id, bgpvpn_id)
 
+    def delete_bgpvpn_network_associations(self, context, bgpvpn_id,
+                                           assoc_ids):
+        self.driver.delete_net_assocs(context, bgpvpn_id, assoc_ids)
+
     def create_bgpvpn_router_association(self, context, bgpvpn_id,
                                          router_association):
         router_assoc = router_association['router_association']
@@ -234,15 +402,61 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
         return self.driver.create_router_assoc(context, bgpvpn_id,
                                                router_assoc)
 
+    def create_bgpvpn_router_association_bulk(self, context, bgpvpn_id,
+                                              router_associations):
+        router_assocs = [item['router_association'] for item in
+                         router_associations['router_associations']]
+        bgpvpn = self.get_bgpvpn(context, bgpvpn_id)
+        self._validate_router_assocs(context, bgpvpn, router_assocs)
+        return self.driver.create_router_assocs(context, bgpvpn_id,
+                                                router_assocs)
+
+    def _validate_router_assocs(self, context, bgpvpn, router_assocs):
+        routers = self._validate_routers(
+            context,
+            [router_assoc['router_id'] for router_assoc in router_assocs])
+        if not bgpvpn['type'] == constants.BGPVPN_L3:
+            msg = ("Router associations require the bgpvpn to be of type %s"
+                   % constants.BGPVPN_L3)
+            raise n_exc.BadRequest(resource='bgpvpn', msg=msg)
+        for router_assoc in router_assocs:
+            router = routers[router_assoc['router_id']]
+            if not router['tenant_id'] == bgpvpn['tenant_id']:
+                msg = "router doesn't belong to the bgpvpn owner"
+                raise n_exc.NotAuthorized(resource='bgpvpn', msg=msg)
+            if not (router_assoc['tenant_id'] == bgpvpn['tenant_id']):
+                msg = "router association and bgpvpn should " \
+                      "belong to the same tenant"
+                raise n_exc.NotAuthorized(resource='bgpvpn', msg=msg)
+
+    def replace_router_associations(self, context, bgpvpn_id, body):
+        """Make the routers of body the routers associated to a BGPVPN
+
+        Member action of BGPVPNs, PUT with a {"router_ids": [...]} body.
+        See replace_network_associations.
+        """
+        router_ids = self._get_replace_ids(body, 'router_ids')
+        router_assocs = self.driver.replace_router_assocs(
+            context, bgpvpn_id, router_ids, self._validate_router_assocs)
+        return {'router_associations': router_assocs}
+
     def get_bgpvpn_router_association(self, context, assoc_id, bgpvpn_id,
                                       fields=None):
         return self.driver.get_router_assoc(context, assoc_id, bgpvpn_id,
                                             fields)
 
     def get_bgpvpn_router_associations(self, context, bgpvpn_id, filters=None,
-                                       fields=None):
+                                       fields=None, sorts=None, limit=None,
+                                       marker=None, page_reverse=False):
         return self.driver.get_router_assocs(context, bgpvpn_id, filters,
-                                             fields)
+                                             fields, sorts=sorts, limit=limit,
+                                             marker=marker,
+                                             page_reverse=page_reverse)
+
+    def get_bgpvpn_router_associations_count(self, context, bgpvpn_id,
+                                             filters=None):
+        return self.driver.get_router_assocs_count(context, bgpvpn_id,
+                                                   filters)
 
     def update_bgpvpn_router_association(self, context, assoc_id, bgpvpn_id,
                                          router_association):
@@ -253,34 +467,77 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
     def delete_bgpvpn_router_association(self, context, assoc_id, bgpvpn_id):
         self.driver.delete_router_assoc(context, assoc_id, bgpvpn_id)
 
+    def delete_bgpvpn_router_associations(self, context, bgpvpn_id,
+                                          assoc_ids):
+        self.driver.delete_router_assocs(context, bgpvpn_id, assoc_ids)
+
     def _validate_port_association_routes_bgpvpn(self, context,
                                                  port_association,
-                                                 bgpvpn_id, assoc_id=None):
-        for route in [r for r in port_association.get('routes', []) if
-                      r['type'] == bgpvpn_rc.api_def.BGPVPN_TYPE]:
-            try:
-                route_bgpvpn = self.get_bgpvpn(context, route['bgpvpn_id'])
-            except bgpvpn.BGPVPNNotFound:
-                raise bgpvpn_rc.BGPVPNPortAssocRouteNoSuchBGPVPN(
-                    bgpvpn_id=route['bgpvpn_id'])
-
-            assoc_bgpvpn = self.get_bgpvpn(context, bgpvpn_id)
-            if route_bgpvpn['type'] != assoc_bgpvpn['type']:
-                raise bgpvpn_rc.BGPVPNPortAssocRouteBGPVPNTypeDiffer(
-                    route_bgpvpn_type=route_bgpvpn['type'],
-                    bgpvpn_type=assoc_bgpvpn['type']
-                    )
+                                                 bgpvpn_id, assoc_id=None,
+                                                 bgpvpn=None):
+        """Validate the 'bgpvpn' routes of a port association"""
+        self._validate_port_associations_routes_bgpvpn(
+            context, [port_association], bgpvpn_id, assoc_id=assoc_id,
+            bgpvpn=bgpvpn)
+
+    def _validate_port_associations_routes_bgpvpn(self, context,
+                                                  port_associations,
+                                                  bgpvpn_id, assoc_id=None,
+                                                  bgpvpn=None):
+        """Validate the 'bgpvpn' routes of port associations of a BGPVPN
+
+        The BGPVPNs of the routes of all the associations are loaded with a
+        single query, the BGPVPN of the associations, unless given, and the
+        tenant of the association assoc_id, when updating it, are loaded
+        once, and all the invalid routes are reported together.
+        """
+        assocs_route_bgpvpn_ids = [
+            sorted(set(route['bgpvpn_id']
+                       for route in port_association.get('routes', [])
+                       if route['type'] == bgpvpn_rc.api_def.BGPVPN_TYPE))
+            for port_association in port_associations]
+        route_bgpvpn_ids = sorted(set(itertools.chain.from_iterable(
+            assocs_route_bgpvpn_ids)))
+        if not route_bgpvpn_ids:
+            return
 
+        route_bgpvpns = dict(
+            (route_bgpvpn['id'], route_bgpvpn) for route_bgpvpn in
+            self.get_bgpvpns(context, filters={'id': route_bgpvpn_ids},
+                             fields=['id', 'type', 'tenant_id']))
+        if bgpvpn is None:
+            bgpvpn = self.get_bgpvpn(context, bgpvpn_id, fields=['type'])
+
+        errors = []
+        for port_association, assoc_route_bgpvpn_ids in zip(
+                port_associations, assocs_route_bgpvpn_ids):
+            if not assoc_route_bgpvpn_ids:
+                continue
             assoc_tenant_id = port_association.get('project_id')
             if assoc_tenant_id is None:
                 # update, rather than create, we need to retrieve the tenant
-                assoc = self.get_bgpvpn_port_association(context,
-                                                         assoc_id, bgpvpn_id)
-                assoc_tenant_id = assoc.get('project_id')
-
-            if route_bgpvpn['project_id'] != assoc_tenant_id:
-                raise bgpvpn_rc.BGPVPNPortAssocRouteWrongBGPVPNTenant(
-                    bgpvpn_id=route['bgpvpn_id'])
+                assoc = self.get_bgpvpn_port_association(
+                    context, assoc_id, bgpvpn_id, fields=['tenant_id'])
+                assoc_tenant_id = assoc['tenant_id']
+            for route_bgpvpn_id in assoc_route_bgpvpn_ids:
+                route_bgpvpn = route_bgpvpns.get(route_bgpvpn_id)
+                if route_bgpvpn is None:
+                    errors.append(bgpvpn_rc.BGPVPNPortAssocRouteNoSuchBGPVPN(
+                        bgpvpn_id=route_bgpvpn_id))
+                elif route_bgpvpn['type'] != bgpvpn['type']:
+                    errors.append(
+                        bgpvpn_rc.BGPVPNPortAssocRouteBGPVPNTypeDiffer(
+                            route_bgpvpn_type=route_bgpvpn['type'],
+                            bgpvpn_type=bgpvpn['type']))
+                elif route_bgpvpn['tenant_id'] != assoc_tenant_id:
+                    errors.append(
+                        bgpvpn_rc.BGPVPNPortAssocRouteWrongBGPVPNTenant(
+                            bgpvpn_id=route_bgpvpn_id))
+        if len(errors) == 1:
+            raise errors[0]
+        if errors:
+            raise bgpvpn_rc.BGPVPNPortAssocRoutesInvalid(
+                errors='; '.join(str(error) for error in errors))
 
     def create_bgpvpn_port_association(self, context, bgpvpn_id,
                                        port_association):
@@ -296,17 +553,48 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
             raise n_exc.NotAuthorized(resource='bgpvpn', msg=msg)
         self._validate_port_association_routes_bgpvpn(context,
                                                       port_association,
-                                                      bgpvpn_id)
+                                                      bgpvpn_id,
+                                                      bgpvpn=bgpvpn)
         return self.driver.create_port_assoc(context,
                                              bgpvpn_id, port_association)
 
+    def create_bgpvpn_port_association_bulk(self, context, bgpvpn_id,
+                                            port_associations):
+        port_assocs = [item['port_association'] for item in
+                       port_associations['port_associations']]
+        ports = self._validate_ports(
+            context, [port_assoc['port_id'] for port_assoc in port_assocs])
+        bgpvpn = self.get_bgpvpn(context, bgpvpn_id)
+        for port_assoc in port_assocs:
+            if not ports[port_assoc['port_id']]['tenant_id'] == (
+                    bgpvpn['project_id']):
+                msg = "port doesn't belong to the bgpvpn owner"
+                raise n_exc.NotAuthorized(resource='bgpvpn', msg=msg)
+            if not (port_assoc['project_id'] == bgpvpn['project_id']):
+                msg = "port association and bgpvpn should " \
+                      "belong to the same tenant"
+                raise n_exc.NotAuthorized(resource='bgpvpn', msg=msg)
+        self._validate_port_associations_routes_bgpvpn(context, port_assocs,
+                                                       bgpvpn_id,
+                                                       bgpvpn=bgpvpn)
+        return self.driver.create_port_assocs(context, bgpvpn_id, port_assocs)
+
     def get_bgpvpn_port_association(self, context, assoc_id, bgpvpn_id,
                                     fields=None):
         return self.driver.get_port_assoc(context, assoc_id, bgpvpn_id, fields)
 
     def get_bgpvpn_port_associations(self, context, bgpvpn_id,
-                                     filters=None, fields=None):
-        return self.driver.get_port_assocs(context, bgpvpn_id, filters, fields)
+                                     filters=None, fields=None, sorts=None,
+                                     limit=None, marker=None,
+                                     page_reverse=False):
+        return self.driver.get_port_assocs(context, bgpvpn_id, filters,
+                                           fields, sorts=sorts, limit=limit,
+                                           marker=marker,
+                                           page_reverse=page_reverse)
+
+    def get_bgpvpn_port_associations_count(self, context, bgpvpn_id,
+                                           filters=None):
+        return self.driver.get_port_assocs_count(context, bgpvpn_id, filters)
 
     def update_bgpvpn_port_association(self, context, assoc_id, bgpvpn_id,
                                        port_association):
@@ -319,3 +607,7 @@ class BGPVPNPlugin(bgpvpn.BGPVPNPluginBase,
 
     def delete_bgpvpn_port_association(self, context, assoc_id, bgpvpn_id):
         self.driver.delete_port_assoc(context, assoc_id, bgpvpn_id)
+
+    def delete_bgpvpn_port_associations(self, context, bgpvpn_id,
+                                        assoc_ids):
+        self.driver.delete_port_assocs(context, bgpvpn_id, assoc_ids)
@@ -33,7 +33,6 @@ from oslo_log import log as logging
 from networking_bagpipe.agent.bgpvpn import rpc_client
 
 from networking_bgpvpn.neutron.db import bgpvpn_db
-from networking_bgpvpn.neutron.services.common import utils
 from networking_bgpvpn.neutron.services.service_drivers.bagpipe \
     import bagpipe_v2 as v2
 
@@ -96,13 +95,11 @@ def get_gateway_mac(context, network_id):
 
 
 @db_api.context_manager.reader
-def get_network_ports(context, network_id):
-    # NOTE(tmorin): currents callers don't look at detailed results
-    # but only test if at least one result exist => can be optimized
-    # by returning a count, rather than all port information
-    return (context.session.query(models_v2.Port).
-            filter(models_v2.Port.network_id == network_id,
-                   models_v2.Port.admin_state_up == sql.true()).all())
+def network_has_ports(context, network_id):
+    query = (context.session.query(models_v2.Port.id).
+             filter(models_v2.Port.network_id == network_id,
+                    models_v2.Port.admin_state_up == sql.true()))
+    return context.session.query(query.exists()).scalar()
 
 
 @db_api.context_manager.reader
@@ -127,13 +124,14 @@ def get_router_bgpvpn_assocs(context, router_id):
 
 
 @db_api.context_manager.reader
-def get_network_bgpvpn_assocs(context, net_id):
-    return (
-        context.session.query(bgpvpn_db.BGPVPNNetAssociation).
+def network_has_bgpvpn_assocs(context, net_id):
+    query = (
+        context.session.query(bgpvpn_db.BGPVPNNetAssociation.id).
         filter(
             bgpvpn_db.BGPVPNNetAssociation.network_id == net_id
-        ).all()
+        )
     )
+    return context.session.query(query.exists()).scalar()
 
 
 @db_api.context_manager.reader
@@ -334,27 +332,25 @@ class BaGPipeBGPVPNDriver(v2.BaGPipeBGPVPNDriver):
 
     def delete_bgpvpn_postcommit(self, context, bgpvpn):
         for net_id in self._networks_for_bgpvpn(context, bgpvpn):
-            if get_network_ports(context, net_id):
+            if network_has_ports(context, net_id):
                 # Format BGPVPN before sending notification
                 self.agent_rpc.delete_bgpvpn(
                     context,
                     self._format_bgpvpn(context, bgpvpn, net_id))
 
-    def update_bgpvpn_postcommit(self, context, old_bgpvpn, bgpvpn):
+    def update_bgpvpn_postcommit(self, context, old_bgpvpn, bgpvpn,
+                                 changed_fields):
         super(BaGPipeBGPVPNDriver, self).update_bgpvpn_postcommit(
-            context, old_bgpvpn, bgpvpn)
+            context, old_bgpvpn, bgpvpn, changed_fields)
 
-        (added_keys, removed_keys, changed_keys) = (
-            utils.get_bgpvpn_differences(bgpvpn, old_bgpvpn))
-        ATTRIBUTES_TO_IGNORE = set('name')
-        moving_keys = added_keys | removed_keys | changed_keys
-        if len(moving_keys ^ ATTRIBUTES_TO_IGNORE):
+        ATTRIBUTES_TO_IGNORE = set(['name'])
+        if changed_fields - ATTRIBUTES_TO_IGNORE:
             for net_id in self._networks_for_bgpvpn(context, bgpvpn):
-                if (get_network_ports(context, net_id)):
+                if (network_has_ports(context, net_id)):
                     self._update_bgpvpn_for_network(context, net_id, bgpvpn)
 
     def _update_bgpvpn_for_net_with_id(self, context, network_id, bgpvpn_id):
-        if get_network_ports(context, network_id):
+        if network_has_ports(context, network_id):
             bgpvpn = self.get_bgpvpn(context, bgpvpn_id)
             self._update_bgpvpn_for_network(context, network_id, bgpvpn)
 
@@ -371,7 +367,7 @@ class BaGPipeBGPVPNDriver(v2.BaGPipeBGPVPNDriver):
                                             net_assoc['bgpvpn_id'])
 
     def delete_net_assoc_postcommit(self, context, net_assoc):
-        if get_network_ports(context, net_assoc['network_id']):
+        if network_has_ports(context, net_assoc['network_id']):
             bgpvpn = self.get_bgpvpn(context, net_assoc['bgpvpn_id'])
             formated_bgpvpn = self._format_bgpvpn(context, bgpvpn,
                                                   net_assoc['network_id'])
@@ -468,14 +464,13 @@ class BaGPipeBGPVPNDriver(v2.BaGPipeBGPVPNDriver):
         super(BaGPipeBGPVPNDriver, self).notify_router_interface_created(
             context, router_id, net_id)
 
-        net_assocs = get_network_bgpvpn_assocs(context, net_id)
         router_assocs = get_router_bgpvpn_assocs(context, router_id)
 
         # if this router_interface is on a network bound to a BGPVPN,
         # or if this router is bound to a BGPVPN,
         # then we need to send and update for this network, including
         # the gateway_mac
-        if net_assocs or router_assocs:
+        if router_assocs or network_has_bgpvpn_assocs(context, net_id):
             for bgpvpn in self._bgpvpns_for_network(context, net_id):
                 self._update_bgpvpn_for_network(context, net_id, bgpvpn)
 
@@ -489,10 +484,9 @@ class BaGPipeBGPVPNDriver(v2.BaGPipeBGPVPNDriver):
         super(BaGPipeBGPVPNDriver, self).notify_router_interface_deleted(
             context, router_id, net_id)
 
-        net_assocs = get_network_bgpvpn_assocs(context, net_id)
         router_assocs = get_router_bgpvpn_assocs(context, router_id)
 
-        if net_assocs or router_assocs:
+        if router_assocs or network_has_bgpvpn_assocs(context, net_id):
             for bgpvpn in self._bgpvpns_for_network(context, net_id):
                 self._update_bgpvpn_for_network(context, net_id, bgpvpn)
 
@@ -32,7 +32,6 @@ from oslo_log import helpers as log_helpers
 from oslo_log import log as logging
 
 from networking_bgpvpn.neutron.extensions import bgpvpn as bgpvpn_ext
-from networking_bgpvpn.neutron.services.common import utils
 from networking_bgpvpn.neutron.services.service_drivers import driver_api
 
 from networking_bagpipe.objects import bgpvpn as bgpvpn_objects
@@ -77,6 +76,8 @@ class BaGPipeBGPVPNDriver(driver_api.BGPVPNDriverRC):
     more_supported_extension_aliases = [bgpvpn_rc_def.ALIAS,
                                         bgpvpn_vni_def.ALIAS]
 
+    update_bgpvpn_changed_fields = True
+
     def __init__(self, service_plugin):
         super(BaGPipeBGPVPNDriver, self).__init__(service_plugin)
 
@@ -104,15 +105,14 @@ class BaGPipeBGPVPNDriver(driver_api.BGPVPNDriverRC):
         self._push_bgpvpn_associations(context, bgpvpn['id'],
                                        rpc_events.DELETED)
 
-    def update_bgpvpn_precommit(self, context, old_bgpvpn, bgpvpn):
+    def update_bgpvpn_precommit(self, context, old_bgpvpn, bgpvpn,
+                                changed_fields):
         self._common_precommit_checks(bgpvpn)
 
-    def update_bgpvpn_postcommit(self, context, old_bgpvpn, bgpvpn):
-        (added_keys, removed_keys, changed_keys) = (
-            utils.get_bgpvpn_differences(bgpvpn, old_bgpvpn))
+    def update_bgpvpn_postcommit(self, context, old_bgpvpn, bgpvpn,
+                                 changed_fields):
         ATTRIBUTES_TO_IGNORE = set(['name'])
-        moving_keys = added_keys | removed_keys | changed_keys
-        if len(moving_keys ^ ATTRIBUTES_TO_IGNORE):
+        if changed_fields - ATTRIBUTES_TO_IGNORE:
             self._push_bgpvpn_associations(context, bgpvpn['id'],
                                            rpc_events.UPDATED)
 
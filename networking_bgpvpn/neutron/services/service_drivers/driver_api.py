@@ -14,14 +14,36 @@
 #    under the License.
 
 import abc
-import copy
+import functools
+
 import six
 
 from neutron.db import api as db_api
+from neutron_lib.callbacks import events
+from neutron_lib.callbacks import registry
+from neutron_lib.callbacks import resources
+from neutron_lib import constants as const
+from neutron_lib import context as n_context
+from neutron_lib.plugins import constants as plugin_constants
+from neutron_lib.plugins import directory
+from oslo_config import cfg
+from sqlalchemy import event as sa_event
 
 from networking_bgpvpn.neutron.db import bgpvpn_db
 from networking_bgpvpn.neutron.extensions \
     import bgpvpn_routes_control as bgpvpn_rc
+from networking_bgpvpn.neutron.services.common import cache
+from networking_bgpvpn.neutron.services.common import coalescing
+from networking_bgpvpn.neutron.services.common import journal
+from networking_bgpvpn.neutron.services.common import task_queue
+
+# BGPVPN attributes listing the resources deleted by NETWORK, ROUTER and
+# PORT AFTER_DELETE callbacks
+_BGPVPN_RESOURCE_FIELDS = {
+    resources.NETWORK: 'networks',
+    resources.ROUTER: 'routers',
+    resources.PORT: 'ports',
+}
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -33,6 +55,21 @@ class BGPVPNDriverBase(object):
     """
     more_supported_extension_aliases = []
 
+    # whether get_bgpvpns and get_*_assocs implement sorting and marker/limit
+    # pagination, rather than leaving it to the Neutron API layer
+    native_sorting_support = False
+    native_pagination_support = False
+    # whether create_bgpvpns does better than a loop on create_bgpvpn
+    native_bulk_support = False
+    # whether BGPVPNs and associations carry a revision number
+    revision_number_support = False
+    # whether the changes of BGPVPNs and associations are logged, see
+    # get_changes
+    change_log_support = False
+    # whether BGPVPNs carry the status of their synchronization with the
+    # backend
+    status_support = False
+
     def __init__(self, service_plugin):
         self.service_plugin = service_plugin
 
@@ -44,10 +81,86 @@ class BGPVPNDriverBase(object):
     def create_bgpvpn(self, context, bgpvpn):
         pass
 
+    def create_bgpvpns(self, context, bgpvpns):
+        return [self.create_bgpvpn(context, bgpvpn) for bgpvpn in bgpvpns]
+
     @abc.abstractmethod
-    def get_bgpvpns(self, context, filters=None, fields=None):
+    def get_bgpvpns(self, context, filters=None, fields=None, sorts=None,
+                    limit=None, marker=None, page_reverse=False):
         pass
 
+    def get_bgpvpns_count(self, context, filters=None):
+        return len(self.get_bgpvpns(context, filters, fields=['id']))
+
+    def bgpvpn_exists(self, context, filters=None):
+        """Return whether any BGPVPN matches filters"""
+        return bool(self.get_bgpvpns(context, filters, fields=['id'],
+                                     limit=1))
+
+    def get_network_router_bgpvpns(self, context, network_ids):
+        """Return the BGPVPNs associated to the routers of networks
+
+        Returns (network id, BGPVPN id) pairs for the BGPVPNs owned by the
+        tenant of a network and associated to a router with an interface on
+        this network.
+        """
+        plugin = directory.get_plugin()
+        networks = dict((network['id'], network) for network in
+                        plugin.get_networks(context,
+                                            filters={'id': list(network_ids)},
+                                            fields=['id', 'tenant_id']))
+        router_ports = plugin.get_ports(
+            context,
+            filters={'network_id': list(networks),
+                     'device_owner': [const.DEVICE_OWNER_ROUTER_INTF]},
+            fields=['network_id', 'device_id'])
+        if not router_ports:
+            return []
+        bgpvpns = self.get_bgpvpns(
+            context,
+            filters={'tenant_id': list(set(network['tenant_id'] for
+                                           network in networks.values())),
+                     'routers': list(set(port['device_id'] for
+                                         port in router_ports))},
+            fields=['id', 'tenant_id', 'routers'])
+        return list(set(
+            (port['network_id'], bgpvpn['id'])
+            for port in router_ports for bgpvpn in bgpvpns
+            if bgpvpn['tenant_id'] == networks[port['network_id']]['tenant_id']
+            and port['device_id'] in bgpvpn['routers']))
+
+    def get_router_network_bgpvpns(self, context, router_ids):
+        """Return the BGPVPNs associated to the networks of routers
+
+        Returns (router id, network id, BGPVPN id) tuples for the BGPVPNs
+        owned by the tenant of a router and associated to a network on which
+        this router has an interface.
+        """
+        l3_plugin = directory.get_plugin(plugin_constants.L3)
+        routers = dict((router['id'], router) for router in
+                       l3_plugin.get_routers(context,
+                                             filters={'id': list(router_ids)},
+                                             fields=['id', 'tenant_id']))
+        router_ports = directory.get_plugin().get_ports(
+            context,
+            filters={'device_id': list(routers),
+                     'device_owner': [const.DEVICE_OWNER_ROUTER_INTF]},
+            fields=['network_id', 'device_id'])
+        if not router_ports:
+            return []
+        bgpvpns = self.get_bgpvpns(
+            context,
+            filters={'tenant_id': list(set(router['tenant_id'] for
+                                           router in routers.values())),
+                     'networks': list(set(port['network_id'] for
+                                          port in router_ports))},
+            fields=['id', 'tenant_id', 'networks'])
+        return list(set(
+            (port['device_id'], port['network_id'], bgpvpn['id'])
+            for port in router_ports for bgpvpn in bgpvpns
+            if bgpvpn['tenant_id'] == routers[port['device_id']]['tenant_id']
+            and port['network_id'] in bgpvpn['networks']))
+
     @abc.abstractmethod
     def get_bgpvpn(self, context, id, fields=None):
         pass
@@ -64,34 +177,132 @@ class BGPVPNDriverBase(object):
     def create_net_assoc(self, bgpvpn_id, network_association):
         pass
 
+    def create_net_assocs(self, context, bgpvpn_id, network_associations):
+        return [self.create_net_assoc(context, bgpvpn_id, net_assoc)
+                for net_assoc in network_associations]
+
     @abc.abstractmethod
     def get_net_assoc(self, context, assoc_id, bgpvpn_id, fields=None):
         pass
 
     @abc.abstractmethod
-    def get_net_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_net_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                       sorts=None, limit=None, marker=None,
+                       page_reverse=False):
         pass
 
+    def get_net_assocs_count(self, context, bgpvpn_id, filters=None):
+        return len(self.get_net_assocs(context, bgpvpn_id, filters,
+                                       fields=['id']))
+
     @abc.abstractmethod
     def delete_net_assoc(self, context, assoc_id, bgpvpn_id):
         pass
 
+    def delete_net_assocs(self, context, bgpvpn_id, assoc_ids):
+        for assoc_id in assoc_ids:
+            self.delete_net_assoc(context, assoc_id, bgpvpn_id)
+
+    def get_net_assocs_diff(self, context, bgpvpn_id, network_ids):
+        """Compare the networks associated to a BGPVPN with network_ids
+
+        Returns the network_ids not associated to the BGPVPN yet, and the
+        ids of the associations to networks not in network_ids.
+        """
+        assocs = dict((assoc['network_id'], assoc['id']) for assoc in
+                      self.get_net_assocs(context, bgpvpn_id,
+                                          fields=['id', 'network_id']))
+        wanted = set(network_ids)
+        return ([net_id for net_id in network_ids if net_id not in assocs],
+                [assoc_id for net_id, assoc_id in assocs.items()
+                 if net_id not in wanted])
+
+    def replace_net_assocs(self, context, bgpvpn_id, network_ids,
+                           validate=None):
+        """Make network_ids the networks associated to a BGPVPN
+
+        validate(context, bgpvpn, net_assocs) is called with the network
+        associations to create, before any change. Returns the resulting
+        network associations.
+        """
+        network_ids, assoc_ids = self.get_net_assocs_diff(context, bgpvpn_id,
+                                                          network_ids)
+        net_assocs = []
+        if network_ids:
+            bgpvpn = self.get_bgpvpn(context, bgpvpn_id)
+            net_assocs = [{'tenant_id': bgpvpn['tenant_id'],
+                           'network_id': network_id}
+                          for network_id in network_ids]
+            if validate is not None:
+                validate(context, bgpvpn, net_assocs)
+        self.delete_net_assocs(context, bgpvpn_id, assoc_ids)
+        self.create_net_assocs(context, bgpvpn_id, net_assocs)
+        return self.get_net_assocs(context, bgpvpn_id)
+
     @abc.abstractmethod
     def create_router_assoc(self, context, bgpvpn_id, router_association):
         pass
 
+    def create_router_assocs(self, context, bgpvpn_id, router_associations):
+        return [self.create_router_assoc(context, bgpvpn_id, router_assoc)
+                for router_assoc in router_associations]
+
     @abc.abstractmethod
     def get_router_assoc(self, context, assoc_id, bgpvpn_id, fields=None):
         pass
 
     @abc.abstractmethod
-    def get_router_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_router_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                          sorts=None, limit=None, marker=None,
+                          page_reverse=False):
         pass
 
+    def get_router_assocs_count(self, context, bgpvpn_id, filters=None):
+        return len(self.get_router_assocs(context, bgpvpn_id, filters,
+                                          fields=['id']))
+
     @abc.abstractmethod
     def delete_router_assoc(self, context, assoc_id, bgpvpn_id):
         pass
 
+    def delete_router_assocs(self, context, bgpvpn_id, assoc_ids):
+        for assoc_id in assoc_ids:
+            self.delete_router_assoc(context, assoc_id, bgpvpn_id)
+
+    def get_router_assocs_diff(self, context, bgpvpn_id, router_ids):
+        """Compare the routers associated to a BGPVPN with router_ids
+
+        See get_net_assocs_diff.
+        """
+        assocs = dict((assoc['router_id'], assoc['id']) for assoc in
+                      self.get_router_assocs(context, bgpvpn_id,
+                                             fields=['id', 'router_id']))
+        wanted = set(router_ids)
+        return ([router_id for router_id in router_ids
+                 if router_id not in assocs],
+                [assoc_id for router_id, assoc_id in assocs.items()
+                 if router_id not in wanted])
+
+    def replace_router_assocs(self, context, bgpvpn_id, router_ids,
+                              validate=None):
+        """Make router_ids the routers associated to a BGPVPN
+
+        See replace_net_assocs.
+        """
+        router_ids, assoc_ids = self.get_router_assocs_diff(
+            context, bgpvpn_id, router_ids)
+        router_assocs = []
+        if router_ids:
+            bgpvpn = self.get_bgpvpn(context, bgpvpn_id)
+            router_assocs = [{'tenant_id': bgpvpn['tenant_id'],
+                              'router_id': router_id}
+                             for router_id in router_ids]
+            if validate is not None:
+                validate(context, bgpvpn, router_assocs)
+        self.delete_router_assocs(context, bgpvpn_id, assoc_ids)
+        self.create_router_assocs(context, bgpvpn_id, router_assocs)
+        return self.get_router_assocs(context, bgpvpn_id)
+
 
 @six.add_metaclass(abc.ABCMeta)
 class BGPVPNDriverDBMixin(BGPVPNDriverBase):
@@ -101,32 +312,372 @@ class BGPVPNDriverDBMixin(BGPVPNDriverBase):
     the result to postcommit methods
     """
 
+    native_sorting_support = True
+    native_pagination_support = True
+    native_bulk_support = True
+    revision_number_support = True
+    change_log_support = True
+
+    # Drivers syncing their backend from the journal define
+    # sync_entry(context, entry), called by the journal worker for each
+    # change, rather than the postcommit methods. An entry is a dict with
+    # the resource_type ('bgpvpn', 'network_association',
+    # 'router_association' or 'port_association'), resource_id, bgpvpn_id,
+    # operation ('create', 'update' or 'delete') and data, the resource as
+    # returned by the API. The entries of a BGPVPN are synced in the order
+    # of the changes, and an entry is retried while sync_entry raises.
+    sync_entry = None
+
+    # Drivers pushing whole BGPVPNs to their backend can define
+    # push_bgpvpn(context, bgpvpn), bgpvpn being the BGPVPN as returned by
+    # the API. With push coalescing, it is called once for the updates of a
+    # BGPVPN and the changes of its associations made within a window,
+    # rather than the postcommit methods of these changes.
+    push_bgpvpn = None
+
+    # Drivers rolling back the creation of network and router associations
+    # when their postcommit fails set this to False, so that these
+    # postcommits are run by the request creating the associations rather
+    # than replaced by a coalesced push of the BGPVPN.
+    coalesce_association_creations = True
+
+    # Drivers whose update_bgpvpn_precommit and update_bgpvpn_postcommit
+    # accept a changed_fields keyword argument, the set of the names of the
+    # fields changed by the update, set this to True to be given it.
+    update_bgpvpn_changed_fields = False
+
     def __init__(self, *args, **kwargs):
         super(BGPVPNDriverDBMixin, self).__init__(*args, **kwargs)
         self.bgpvpn_db = bgpvpn_db.BGPVPNPluginDb()
+        self.bgpvpn_cache = None
+        if cfg.CONF.bgpvpn_cache.enabled:
+            self.enable_bgpvpn_cache(
+                cfg.CONF.bgpvpn_cache.max_size, cfg.CONF.bgpvpn_cache.ttl,
+                cfg.CONF.bgpvpn_cache.check_revision_number)
+        self.journal_worker = None
+        if self.sync_entry is not None:
+            self.enable_journal(
+                cfg.CONF.bgpvpn_journal.sync_workers,
+                cfg.CONF.bgpvpn_journal.max_retries,
+                cfg.CONF.bgpvpn_journal.retry_interval,
+                cfg.CONF.bgpvpn_journal.max_retry_interval,
+                cfg.CONF.bgpvpn_journal.sync_interval,
+                cfg.CONF.bgpvpn_journal.processing_timeout)
+        self.postcommit_queue = None
+        # the journal worker already syncs the backends asynchronously
+        if (cfg.CONF.bgpvpn_async_postcommit.enabled and
+                self.journal_worker is None):
+            self.enable_async_postcommit(
+                cfg.CONF.bgpvpn_async_postcommit.workers,
+                cfg.CONF.bgpvpn_async_postcommit.max_queue_size)
+        self.push_coalescer = None
+        if (cfg.CONF.bgpvpn_push_coalescing.window and
+                self.push_bgpvpn is not None and self.journal_worker is None):
+            self.enable_push_coalescing(
+                cfg.CONF.bgpvpn_push_coalescing.window)
+
+    def enable_bgpvpn_cache(self, max_size, ttl=0,
+                            check_revision_number=True):
+        """Cache the BGPVPNs returned by get_bgpvpn
+
+        Cached BGPVPNs are invalidated by the write paths of this class, and
+        when a network, router or port they are associated to is deleted.
+        These only see the changes made by this process: with
+        check_revision_number, a cached BGPVPN is only used if its revision
+        number, bumped by any change of the BGPVPN or of its associations,
+        is still the one in the database.
+        """
+        self.bgpvpn_cache = cache.BGPVPNCache(max_size, ttl)
+        self.bgpvpn_cache_check_revision_number = check_revision_number
+        for resource in _BGPVPN_RESOURCE_FIELDS:
+            registry.subscribe(self._invalidate_bgpvpns_of_deleted_resource,
+                               resource, events.AFTER_DELETE)
+
+    def bgpvpn_cache_stats(self):
+        if self.bgpvpn_cache is None:
+            return None
+        return self.bgpvpn_cache.stats()
+
+    def enable_async_postcommit(self, workers, max_queue_size):
+        """Run the postcommit methods in worker threads
+
+        The postcommit methods of a BGPVPN and of its associations are
+        queued, once the change is committed, to be run in order by the
+        worker of this BGPVPN. A changed BGPVPN is PENDING_CREATE or
+        PENDING_UPDATE until its queued postcommit methods are run, and then
+        ACTIVE, or ERROR if one of them raised.
+        """
+        self.postcommit_queue = task_queue.OrderedTaskQueue(
+            workers, max_queue_size, done_callback=self._postcommit_done)
+        self.status_support = True
+
+    def postcommit_stats(self):
+        if self.postcommit_queue is None:
+            return None
+        return self.postcommit_queue.stats()
+
+    def enable_journal(self, sync_workers, max_retries, retry_interval,
+                       max_retry_interval, sync_interval, processing_timeout):
+        """Sync the backend from the journal rather than in postcommit
+
+        Each change is written to the journal in its transaction, so that
+        it is synced even if the backend is unreachable when the change is
+        committed, or if neutron-server dies before syncing it.
+        """
+        self.journal_worker = journal.JournalSyncWorker(
+            self.bgpvpn_db, self.sync_entry, sync_workers, max_retries,
+            retry_interval, max_retry_interval, sync_interval,
+            processing_timeout)
+        self.journal_worker.start()
+
+    def enable_push_coalescing(self, window):
+        """Coalesce the pushes of a BGPVPN made within window seconds
+
+        The updates of a BGPVPN and the changes of its associations request a
+        push of the BGPVPN rather than calling their postcommit methods, and
+        the BGPVPN is loaded and given to push_bgpvpn once for all the
+        requests made within the window. The creation and deletion of
+        BGPVPNs are still pushed by their postcommit methods, as are the
+        creations of associations unless coalesce_association_creations.
+        """
+        self.push_coalescer = coalescing.PushCoalescer(window,
+                                                       self._push_bgpvpn)
+
+    def push_coalescing_stats(self):
+        if self.push_coalescer is None:
+            return None
+        return self.push_coalescer.stats()
+
+    def journal_stats(self):
+        if self.journal_worker is None:
+            return None
+        return self.bgpvpn_db.get_journal_counts(
+            n_context.get_admin_context())
+
+    def _journal(self, context, resource_type, operation, resources):
+        """Journal a change, in its transaction, if the journal is used"""
+        if self.journal_worker is None:
+            return
+        self.bgpvpn_db.add_journal_entries(context, resource_type,
+                                           operation, resources)
+        sa_event.listen(context.session, 'after_commit',
+                        lambda session: self.journal_worker.wake(),
+                        once=True)
+
+    def _set_bgpvpn_pending(self, context, bgpvpn_id):
+        """Mark a BGPVPN as changed, in the transaction of the change"""
+        if self.postcommit_queue is not None:
+            self.bgpvpn_db.set_bgpvpn_status(context, bgpvpn_id,
+                                             const.PENDING_UPDATE)
+
+    def _postcommit(self, context, bgpvpn_id, postcommit, *args):
+        """Run postcommit(context, *args), or queue it for bgpvpn_id"""
+        if self.journal_worker is not None:
+            # the change is synced from the journal
+            return
+        if self.postcommit_queue is None:
+            postcommit(context, *args)
+            return
+        # the request context and its session are not used by the worker
+        task_context = n_context.Context.from_dict(context.to_dict())
+        self.postcommit_queue.submit(
+            bgpvpn_id, functools.partial(postcommit, task_context, *args))
+
+    def _postcommit_change(self, context, bgpvpn_id, postcommit, *args):
+        """Run the postcommit of a change of an existing BGPVPN
+
+        With push coalescing, a push of the BGPVPN is requested instead.
+        """
+        if self.push_coalescer is None:
+            self._postcommit(context, bgpvpn_id, postcommit, *args)
+        else:
+            self.push_coalescer.request(bgpvpn_id)
+
+    def _postcommit_assoc_creation(self, context, bgpvpn_id, postcommit,
+                                   *args):
+        """Run the postcommit of a change creating associations
+
+        See coalesce_association_creations.
+        """
+        if self.coalesce_association_creations:
+            self._postcommit_change(context, bgpvpn_id, postcommit, *args)
+        else:
+            self._postcommit(context, bgpvpn_id, postcommit, *args)
+
+    def _push_bgpvpn(self, bgpvpn_id):
+        if self.postcommit_queue is not None:
+            # after the postcommit operations of the BGPVPN already queued
+            self.postcommit_queue.submit(
+                bgpvpn_id, functools.partial(self._push_bgpvpn_now, bgpvpn_id))
+        else:
+            self._push_bgpvpn_now(bgpvpn_id)
+
+    def _push_bgpvpn_now(self, bgpvpn_id):
+        context = n_context.get_admin_context()
+        bgpvpns = self.get_bgpvpns(context, filters={'id': [bgpvpn_id]})
+        # not pushed if deleted in the meantime
+        if bgpvpns:
+            self.push_bgpvpn(context, bgpvpns[0])
+
+    def _postcommit_done(self, bgpvpn_id, failed):
+        if self.postcommit_queue.pending(bgpvpn_id):
+            # changed again in the meantime
+            return
+        context = n_context.get_admin_context()
+        status = const.ERROR if failed else const.ACTIVE
+        if self.bgpvpn_db.set_bgpvpn_status(context, bgpvpn_id, status):
+            self._invalidate_bgpvpn(context, bgpvpn_id)
+
+    def _invalidate_bgpvpn(self, context, bgpvpn_id):
+        """Invalidate the cached BGPVPN after a change committed
+
+        If the change is part of an enclosing transaction, the BGPVPN is
+        invalidated again once this transaction is committed, since a
+        concurrent read may have cached its previous state in the meantime.
+        """
+        if self.bgpvpn_cache is None:
+            return
+        self.bgpvpn_cache.invalidate(bgpvpn_id)
+        if context.session.is_active:
+            sa_event.listen(
+                context.session, 'after_commit',
+                lambda session: self.bgpvpn_cache.invalidate(bgpvpn_id),
+                once=True)
+
+    def _invalidate_bgpvpns_of_deleted_resource(self, resource, event,
+                                                trigger, **kwargs):
+        if self.bgpvpn_cache is None:
+            return
+        field = _BGPVPN_RESOURCE_FIELDS[resource]
+        deleted = kwargs.get(resource) or kwargs.get('original') or {}
+        resource_id = deleted.get('id') or kwargs.get('%s_id' % resource)
+        if resource_id is None:
+            self.bgpvpn_cache.clear()
+            return
+        self.bgpvpn_cache.invalidate_matching(
+            lambda bgpvpn: resource_id in bgpvpn.get(field, []))
 
     def create_bgpvpn(self, context, bgpvpn):
+        if self.postcommit_queue is not None:
+            bgpvpn = dict(bgpvpn, status=const.PENDING_CREATE)
         with db_api.context_manager.writer.using(context):
             bgpvpn = self.bgpvpn_db.create_bgpvpn(
                 context, bgpvpn)
             self.create_bgpvpn_precommit(context, bgpvpn)
-        self.create_bgpvpn_postcommit(context, bgpvpn)
+            self._journal(context, 'bgpvpn', 'create', [bgpvpn])
+        self._postcommit(context, bgpvpn['id'],
+                         self.create_bgpvpn_postcommit, bgpvpn)
         return bgpvpn
 
-    def get_bgpvpns(self, context, filters=None, fields=None):
-        return self.bgpvpn_db.get_bgpvpns(context, filters, fields)
+    def create_bgpvpns(self, context, bgpvpns):
+        if self.postcommit_queue is not None:
+            bgpvpns = [dict(bgpvpn, status=const.PENDING_CREATE)
+                       for bgpvpn in bgpvpns]
+        with db_api.context_manager.writer.using(context):
+            bgpvpns = self.bgpvpn_db.create_bgpvpns(context, bgpvpns)
+            self.create_bgpvpns_precommit(context, bgpvpns)
+            self._journal(context, 'bgpvpn', 'create', bgpvpns)
+        if self.journal_worker is not None:
+            # the BGPVPNs are synced from the journal
+            return bgpvpns
+        if self.postcommit_queue is None:
+            self.create_bgpvpns_postcommit(context, bgpvpns)
+        else:
+            # queued per BGPVPN, to keep the order of the changes of each
+            for bgpvpn in bgpvpns:
+                self._postcommit(context, bgpvpn['id'],
+                                 self.create_bgpvpns_postcommit, [bgpvpn])
+        return bgpvpns
+
+    def create_bgpvpns_precommit(self, context, bgpvpns):
+        """Precommit of the creation of a batch of BGPVPNs
+
+        By default, create_bgpvpn_precommit is called for each BGPVPN.
+        """
+        for bgpvpn in bgpvpns:
+            self.create_bgpvpn_precommit(context, bgpvpn)
+
+    def create_bgpvpns_postcommit(self, context, bgpvpns):
+        """Postcommit of the creation of a batch of BGPVPNs
+
+        By default, create_bgpvpn_postcommit is called for each BGPVPN.
+        Drivers can override this to push the whole batch at once.
+        """
+        for bgpvpn in bgpvpns:
+            self.create_bgpvpn_postcommit(context, bgpvpn)
+
+    def get_bgpvpns(self, context, filters=None, fields=None, sorts=None,
+                    limit=None, marker=None, page_reverse=False):
+        return self.bgpvpn_db.get_bgpvpns(context, filters, fields,
+                                          sorts=sorts, limit=limit,
+                                          marker=marker,
+                                          page_reverse=page_reverse)
+
+    def get_bgpvpns_count(self, context, filters=None):
+        return self.bgpvpn_db.get_bgpvpns_count(context, filters)
+
+    def bgpvpn_exists(self, context, filters=None):
+        return self.bgpvpn_db.bgpvpn_exists(context, filters)
+
+    def get_network_router_bgpvpns(self, context, network_ids):
+        return self.bgpvpn_db.get_network_router_bgpvpns(context, network_ids)
+
+    def get_router_network_bgpvpns(self, context, router_ids):
+        return self.bgpvpn_db.get_router_network_bgpvpns(context, router_ids)
 
     def get_bgpvpn(self, context, id, fields=None):
-        return self.bgpvpn_db.get_bgpvpn(context, id, fields)
+        # reads inside a transaction may see uncommitted changes, and are
+        # neither served from nor stored in the cache
+        if self.bgpvpn_cache is None or context.session.is_active:
+            return self.bgpvpn_db.get_bgpvpn(context, id, fields)
+        bgpvpn = self.bgpvpn_cache.get(id)
+        if (bgpvpn is not None and self.bgpvpn_cache_check_revision_number
+                and bgpvpn['revision_number'] !=
+                self.bgpvpn_db.get_bgpvpn_revision_number(context, id)):
+            # changed by another process
+            self.bgpvpn_cache.discard_stale(id)
+            bgpvpn = None
+        # the database applies the visibility rules to the BGPVPNs of other
+        # projects
+        if bgpvpn is None or not (context.is_admin or
+                                  bgpvpn['tenant_id'] == context.tenant_id):
+            generation = self.bgpvpn_cache.generation
+            bgpvpn = self.bgpvpn_db.get_bgpvpn(context, id)
+            self.bgpvpn_cache.put(id, bgpvpn, generation)
+        return self.bgpvpn_db._fields(bgpvpn, fields)
+
+    def get_changes(self, context, cursor=None, limit=None):
+        return self.bgpvpn_db.get_changes(context, cursor, limit)
+
+    def prune_changes(self, context, cursor=None, max_age=None):
+        return self.bgpvpn_db.prune_changes(context, cursor, max_age)
 
     def update_bgpvpn(self, context, id, bgpvpn_delta):
-        old_bgpvpn = self.get_bgpvpn(context, id)
         with db_api.context_manager.writer.using(context):
-            new_bgpvpn = copy.deepcopy(old_bgpvpn)
-            new_bgpvpn.update(bgpvpn_delta)
-            self.update_bgpvpn_precommit(context, old_bgpvpn, new_bgpvpn)
-            bgpvpn = self.bgpvpn_db.update_bgpvpn(context, id, bgpvpn_delta)
-        self.update_bgpvpn_postcommit(context, old_bgpvpn, bgpvpn)
+            # the BGPVPN is loaded once, and locked so that concurrent
+            # updates are serialized; the fields actually changed are found
+            # from the attribute history of its model
+            bgpvpn_db = self.bgpvpn_db.get_bgpvpn_for_update(context, id)
+            old_bgpvpn = self.bgpvpn_db._make_bgpvpn_dict(bgpvpn_db)
+            changed_fields = self.bgpvpn_db.update_bgpvpn_model(
+                context, bgpvpn_db, bgpvpn_delta)
+            if not changed_fields:
+                return old_bgpvpn
+            self._set_bgpvpn_pending(context, id)
+            # writes the changes, bumping the revision number once
+            context.session.flush()
+            bgpvpn = self.bgpvpn_db._make_bgpvpn_dict(bgpvpn_db)
+            kwargs = {}
+            if self.update_bgpvpn_changed_fields:
+                kwargs['changed_fields'] = changed_fields
+            self.update_bgpvpn_precommit(context, old_bgpvpn, bgpvpn,
+                                         **kwargs)
+            self._journal(context, 'bgpvpn', 'update', [bgpvpn])
+        self._invalidate_bgpvpn(context, id)
+        self._postcommit_change(context, id,
+                                functools.partial(
+                                    self.update_bgpvpn_postcommit, **kwargs),
+                                old_bgpvpn, bgpvpn)
         return bgpvpn
 
     def delete_bgpvpn(self, context, id):
@@ -134,27 +685,65 @@ class BGPVPNDriverDBMixin(BGPVPNDriverBase):
             bgpvpn = self.bgpvpn_db.get_bgpvpn(context, id)
             self.delete_bgpvpn_precommit(context, bgpvpn)
             self.bgpvpn_db.delete_bgpvpn(context, id)
-        self.delete_bgpvpn_postcommit(context, bgpvpn)
+            self._journal(context, 'bgpvpn', 'delete', [bgpvpn])
+        self._invalidate_bgpvpn(context, id)
+        if self.push_coalescer is not None:
+            self.push_coalescer.cancel(id)
+        self._postcommit(context, id, self.delete_bgpvpn_postcommit, bgpvpn)
 
     def create_net_assoc(self, context, bgpvpn_id, network_association):
         with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
             assoc = self.bgpvpn_db.create_net_assoc(context,
                                                     bgpvpn_id,
                                                     network_association)
             self.create_net_assoc_precommit(context, assoc)
-        self.create_net_assoc_postcommit(context, assoc)
+            self._journal(context, 'network_association', 'create', [assoc])
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_assoc_creation(
+            context, bgpvpn_id, self.create_net_assoc_postcommit, assoc)
         return assoc
 
+    def create_net_assocs(self, context, bgpvpn_id, network_associations):
+        with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            assocs = self.bgpvpn_db.create_net_assocs(context, bgpvpn_id,
+                                                      network_associations)
+            self.create_net_assocs_precommit(context, assocs)
+            self._journal(context, 'network_association', 'create', assocs)
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_assoc_creation(
+            context, bgpvpn_id, self.create_net_assocs_postcommit, assocs)
+        return assocs
+
+    def create_net_assocs_precommit(self, context, net_assocs):
+        for net_assoc in net_assocs:
+            self.create_net_assoc_precommit(context, net_assoc)
+
+    def create_net_assocs_postcommit(self, context, net_assocs):
+        for net_assoc in net_assocs:
+            self.create_net_assoc_postcommit(context, net_assoc)
+
     def get_net_assoc(self, context, assoc_id, bgpvpn_id, fields=None):
         return self.bgpvpn_db.get_net_assoc(context, assoc_id, bgpvpn_id,
                                             fields)
 
-    def get_net_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_net_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                       sorts=None, limit=None, marker=None,
+                       page_reverse=False):
         return self.bgpvpn_db.get_net_assocs(context, bgpvpn_id,
-                                             filters, fields)
+                                             filters, fields,
+                                             sorts=sorts, limit=limit,
+                                             marker=marker,
+                                             page_reverse=page_reverse)
+
+    def get_net_assocs_count(self, context, bgpvpn_id, filters=None):
+        return self.bgpvpn_db.get_net_assocs_count(context, bgpvpn_id,
+                                                   filters)
 
     def delete_net_assoc(self, context, assoc_id, bgpvpn_id):
         with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
             net_assoc = self.bgpvpn_db.get_net_assoc(context,
                                                      assoc_id,
                                                      bgpvpn_id)
@@ -163,26 +752,137 @@ class BGPVPNDriverDBMixin(BGPVPNDriverBase):
             self.bgpvpn_db.delete_net_assoc(context,
                                             assoc_id,
                                             bgpvpn_id)
-        self.delete_net_assoc_postcommit(context, net_assoc)
+            self._journal(context, 'network_association', 'delete',
+                          [net_assoc])
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.delete_net_assoc_postcommit, net_assoc)
+
+    def delete_net_assocs(self, context, bgpvpn_id, assoc_ids):
+        with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            net_assocs = self.bgpvpn_db.get_net_assocs(
+                context, bgpvpn_id, filters={'id': list(assoc_ids)})
+            self.delete_net_assocs_precommit(context, net_assocs)
+            self.bgpvpn_db.delete_net_assocs(context, bgpvpn_id, assoc_ids)
+            self._journal(context, 'network_association', 'delete',
+                          net_assocs)
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.delete_net_assocs_postcommit, net_assocs)
+
+    def get_net_assocs_diff(self, context, bgpvpn_id, network_ids):
+        return self.bgpvpn_db.get_net_assocs_diff(context, bgpvpn_id,
+                                                  network_ids)
+
+    def replace_net_assocs(self, context, bgpvpn_id, network_ids,
+                           validate=None):
+        with db_api.context_manager.writer.using(context):
+            # the diff is computed with the BGPVPN row locked, concurrent
+            # changes of its associations waiting for this transaction
+            bgpvpn = self.bgpvpn_db._make_bgpvpn_dict(
+                self.bgpvpn_db.get_bgpvpn_for_update(context, bgpvpn_id))
+            network_ids, assoc_ids = self.bgpvpn_db.get_net_assocs_diff(
+                context, bgpvpn_id, network_ids)
+            if not (network_ids or assoc_ids):
+                return self.bgpvpn_db.get_net_assocs(context, bgpvpn_id)
+            network_associations = [{'tenant_id': bgpvpn['tenant_id'],
+                                     'network_id': network_id}
+                                    for network_id in network_ids]
+            if network_associations and validate is not None:
+                validate(context, bgpvpn, network_associations)
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            removed = []
+            if assoc_ids:
+                removed = self.bgpvpn_db.get_net_assocs(
+                    context, bgpvpn_id, filters={'id': list(assoc_ids)})
+                self.delete_net_assocs_precommit(context, removed)
+                self.bgpvpn_db.delete_net_assocs(context, bgpvpn_id,
+                                                 assoc_ids)
+            added = []
+            if network_associations:
+                added = self.bgpvpn_db.create_net_assocs(
+                    context, bgpvpn_id, network_associations)
+                self.create_net_assocs_precommit(context, added)
+            self._journal(context, 'network_association', 'delete', removed)
+            self._journal(context, 'network_association', 'create', added)
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_assoc_creation(
+            context, bgpvpn_id, self.replace_net_assocs_postcommit,
+            added, removed)
+        return self.get_net_assocs(context, bgpvpn_id)
+
+    def replace_net_assocs_postcommit(self, context, added_net_assocs,
+                                      removed_net_assocs):
+        """Postcommit of the replacement of network associations
+
+        By default, delete_net_assocs_postcommit and
+        create_net_assocs_postcommit are called. Drivers can override this
+        to push the resulting state of the BGPVPN once.
+        """
+        self.delete_net_assocs_postcommit(context, removed_net_assocs)
+        self.create_net_assocs_postcommit(context, added_net_assocs)
+
+    def delete_net_assocs_precommit(self, context, net_assocs):
+        for net_assoc in net_assocs:
+            self.delete_net_assoc_precommit(context, net_assoc)
+
+    def delete_net_assocs_postcommit(self, context, net_assocs):
+        for net_assoc in net_assocs:
+            self.delete_net_assoc_postcommit(context, net_assoc)
 
     def create_router_assoc(self, context, bgpvpn_id, router_association):
         with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
             assoc = self.bgpvpn_db.create_router_assoc(context, bgpvpn_id,
                                                        router_association)
             self.create_router_assoc_precommit(context, assoc)
-        self.create_router_assoc_postcommit(context, assoc)
+            self._journal(context, 'router_association', 'create', [assoc])
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_assoc_creation(
+            context, bgpvpn_id, self.create_router_assoc_postcommit, assoc)
         return assoc
 
+    def create_router_assocs(self, context, bgpvpn_id, router_associations):
+        with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            assocs = self.bgpvpn_db.create_router_assocs(context, bgpvpn_id,
+                                                         router_associations)
+            self.create_router_assocs_precommit(context, assocs)
+            self._journal(context, 'router_association', 'create', assocs)
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_assoc_creation(
+            context, bgpvpn_id, self.create_router_assocs_postcommit, assocs)
+        return assocs
+
+    def create_router_assocs_precommit(self, context, router_assocs):
+        for router_assoc in router_assocs:
+            self.create_router_assoc_precommit(context, router_assoc)
+
+    def create_router_assocs_postcommit(self, context, router_assocs):
+        for router_assoc in router_assocs:
+            self.create_router_assoc_postcommit(context, router_assoc)
+
     def get_router_assoc(self, context, assoc_id, bgpvpn_id, fields=None):
         return self.bgpvpn_db.get_router_assoc(context, assoc_id,
                                                bgpvpn_id, fields)
 
-    def get_router_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_router_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                          sorts=None, limit=None, marker=None,
+                          page_reverse=False):
         return self.bgpvpn_db.get_router_assocs(context, bgpvpn_id,
-                                                filters, fields)
+                                                filters, fields,
+                                                sorts=sorts, limit=limit,
+                                                marker=marker,
+                                                page_reverse=page_reverse)
+
+    def get_router_assocs_count(self, context, bgpvpn_id, filters=None):
+        return self.bgpvpn_db.get_router_assocs_count(context, bgpvpn_id,
+                                                      filters)
 
     def delete_router_assoc(self, context, assoc_id, bgpvpn_id):
         with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
             router_assoc = self.bgpvpn_db.get_router_assoc(context,
                                                            assoc_id,
                                                            bgpvpn_id)
@@ -190,8 +890,86 @@ class BGPVPNDriverDBMixin(BGPVPNDriverBase):
             self.bgpvpn_db.delete_router_assoc(context,
                                                assoc_id,
                                                bgpvpn_id)
+            self._journal(context, 'router_association', 'delete',
+                          [router_assoc])
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+
+        self._postcommit_change(context, bgpvpn_id,
+                                self.delete_router_assoc_postcommit,
+                                router_assoc)
+
+    def delete_router_assocs(self, context, bgpvpn_id, assoc_ids):
+        with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            router_assocs = self.bgpvpn_db.get_router_assocs(
+                context, bgpvpn_id, filters={'id': list(assoc_ids)})
+            self.delete_router_assocs_precommit(context, router_assocs)
+            self.bgpvpn_db.delete_router_assocs(context, bgpvpn_id,
+                                                assoc_ids)
+            self._journal(context, 'router_association', 'delete',
+                          router_assocs)
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.delete_router_assocs_postcommit,
+                                router_assocs)
+
+    def get_router_assocs_diff(self, context, bgpvpn_id, router_ids):
+        return self.bgpvpn_db.get_router_assocs_diff(context, bgpvpn_id,
+                                                     router_ids)
+
+    def replace_router_assocs(self, context, bgpvpn_id, router_ids,
+                              validate=None):
+        with db_api.context_manager.writer.using(context):
+            # the diff is computed with the BGPVPN row locked, concurrent
+            # changes of its associations waiting for this transaction
+            bgpvpn = self.bgpvpn_db._make_bgpvpn_dict(
+                self.bgpvpn_db.get_bgpvpn_for_update(context, bgpvpn_id))
+            router_ids, assoc_ids = self.bgpvpn_db.get_router_assocs_diff(
+                context, bgpvpn_id, router_ids)
+            if not (router_ids or assoc_ids):
+                return self.bgpvpn_db.get_router_assocs(context, bgpvpn_id)
+            router_associations = [{'tenant_id': bgpvpn['tenant_id'],
+                                    'router_id': router_id}
+                                   for router_id in router_ids]
+            if router_associations and validate is not None:
+                validate(context, bgpvpn, router_associations)
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            removed = []
+            if assoc_ids:
+                removed = self.bgpvpn_db.get_router_assocs(
+                    context, bgpvpn_id, filters={'id': list(assoc_ids)})
+                self.delete_router_assocs_precommit(context, removed)
+                self.bgpvpn_db.delete_router_assocs(context, bgpvpn_id,
+                                                    assoc_ids)
+            added = []
+            if router_associations:
+                added = self.bgpvpn_db.create_router_assocs(
+                    context, bgpvpn_id, router_associations)
+                self.create_router_assocs_precommit(context, added)
+            self._journal(context, 'router_association', 'delete', removed)
+            self._journal(context, 'router_association', 'create', added)
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_assoc_creation(
+            context, bgpvpn_id, self.replace_router_assocs_postcommit,
+            added, removed)
+        return self.get_router_assocs(context, bgpvpn_id)
+
+    def replace_router_assocs_postcommit(self, context, added_router_assocs,
+                                         removed_router_assocs):
+        """Postcommit of the replacement of router associations
+
+        See replace_net_assocs_postcommit.
+        """
+        self.delete_router_assocs_postcommit(context, removed_router_assocs)
+        self.create_router_assocs_postcommit(context, added_router_assocs)
+
+    def delete_router_assocs_precommit(self, context, router_assocs):
+        for router_assoc in router_assocs:
+            self.delete_router_assoc_precommit(context, router_assoc)
 
-        self.delete_router_assoc_postcommit(context, router_assoc)
+    def delete_router_assocs_postcommit(self, context, router_assocs):
+        for router_assoc in router_assocs:
+            self.delete_router_assoc_postcommit(context, router_assoc)
 
     @abc.abstractmethod
     def create_bgpvpn_postcommit(self, context, bgpvpn):
@@ -207,7 +985,11 @@ class BGPVPNDriverDBMixin(BGPVPNDriverBase):
 
     @abc.abstractmethod
     def update_bgpvpn_precommit(self, context, old_bgpvpn, new_bgpvpn):
-        pass
+        """Precommit of a BGPVPN update changing at least one field
+
+        Updates not changing anything call neither this method nor
+        update_bgpvpn_postcommit. See update_bgpvpn_changed_fields.
+        """
 
     @abc.abstractmethod
     def delete_bgpvpn_postcommit(self, context, bgpvpn):
@@ -262,10 +1044,12 @@ class BGPVPNDriver(BGPVPNDriverDBMixin):
     def create_bgpvpn_postcommit(self, context, bgpvpn):
         pass
 
-    def update_bgpvpn_precommit(self, context, old_bgpvpn, new_bgpvpn):
+    def update_bgpvpn_precommit(self, context, old_bgpvpn, new_bgpvpn,
+                                changed_fields=None):
         pass
 
-    def update_bgpvpn_postcommit(self, context, old_bgpvpn, new_bgpvpn):
+    def update_bgpvpn_postcommit(self, context, old_bgpvpn, new_bgpvpn,
+                                 changed_fields=None):
         pass
 
     def delete_bgpvpn_precommit(self, context, bgpvpn):
@@ -317,14 +1101,24 @@ class BGPVPNDriverRCBase(BGPVPNDriverBase):
     def create_port_assoc(self, bgpvpn_id, port_association):
         pass
 
+    def create_port_assocs(self, context, bgpvpn_id, port_associations):
+        return [self.create_port_assoc(context, bgpvpn_id, port_assoc)
+                for port_assoc in port_associations]
+
     @abc.abstractmethod
     def get_port_assoc(self, context, assoc_id, bgpvpn_id, fields=None):
         pass
 
     @abc.abstractmethod
-    def get_port_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_port_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                        sorts=None, limit=None, marker=None,
+                        page_reverse=False):
         pass
 
+    def get_port_assocs_count(self, context, bgpvpn_id, filters=None):
+        return len(self.get_port_assocs(context, bgpvpn_id, filters,
+                                        fields=['id']))
+
     @abc.abstractmethod
     def update_port_assoc(self, context, assoc_id, port_association):
         pass
@@ -333,6 +1127,10 @@ class BGPVPNDriverRCBase(BGPVPNDriverBase):
     def delete_port_assoc(self, context, assoc_id, bgpvpn_id):
         pass
 
+    def delete_port_assocs(self, context, bgpvpn_id, assoc_ids):
+        for assoc_id in assoc_ids:
+            self.delete_port_assoc(context, assoc_id, bgpvpn_id)
+
 
 @six.add_metaclass(abc.ABCMeta)
 class BGPVPNDriverRCDBMixin(BGPVPNDriverRCBase, BGPVPNDriverDBMixin):
@@ -344,14 +1142,19 @@ class BGPVPNDriverRCDBMixin(BGPVPNDriverRCBase, BGPVPNDriverDBMixin):
     def update_router_assoc(self, context, assoc_id, bgpvpn_id, router_assoc):
         old_router_assoc = self.get_router_assoc(context, assoc_id, bgpvpn_id)
         with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
             router_assoc = self.bgpvpn_db.update_router_assoc(context,
                                                               assoc_id,
                                                               bgpvpn_id,
                                                               router_assoc)
             self.update_router_assoc_precommit(context,
                                                old_router_assoc, router_assoc)
-        self.update_router_assoc_postcommit(context,
-                                            old_router_assoc, router_assoc)
+            self._journal(context, 'router_association', 'update',
+                          [router_assoc])
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.update_router_assoc_postcommit,
+                                old_router_assoc, router_assoc)
         return router_assoc
 
     @abc.abstractmethod
@@ -366,12 +1169,39 @@ class BGPVPNDriverRCDBMixin(BGPVPNDriverRCBase, BGPVPNDriverDBMixin):
 
     def create_port_assoc(self, context, bgpvpn_id, port_association):
         with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
             port_assoc = self.bgpvpn_db.create_port_assoc(context, bgpvpn_id,
                                                           port_association)
             self.create_port_assoc_precommit(context, port_assoc)
-        self.create_port_assoc_postcommit(context, port_assoc)
+            self._journal(context, 'port_association', 'create',
+                          [port_assoc])
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.create_port_assoc_postcommit, port_assoc)
         return port_assoc
 
+    def create_port_assocs(self, context, bgpvpn_id, port_associations):
+        with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            port_assocs = self.bgpvpn_db.create_port_assocs(
+                context, bgpvpn_id, port_associations)
+            self.create_port_assocs_precommit(context, port_assocs)
+            self._journal(context, 'port_association', 'create',
+                          port_assocs)
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.create_port_assocs_postcommit,
+                                port_assocs)
+        return port_assocs
+
+    def create_port_assocs_precommit(self, context, port_assocs):
+        for port_assoc in port_assocs:
+            self.create_port_assoc_precommit(context, port_assoc)
+
+    def create_port_assocs_postcommit(self, context, port_assocs):
+        for port_assoc in port_assocs:
+            self.create_port_assoc_postcommit(context, port_assoc)
+
     @abc.abstractmethod
     def create_port_assoc_precommit(self, context, port_assoc):
         pass
@@ -384,22 +1214,63 @@ class BGPVPNDriverRCDBMixin(BGPVPNDriverRCBase, BGPVPNDriverDBMixin):
         return self.bgpvpn_db.get_port_assoc(context, assoc_id,
                                              bgpvpn_id, fields)
 
-    def get_port_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_port_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                        sorts=None, limit=None, marker=None,
+                        page_reverse=False):
         return self.bgpvpn_db.get_port_assocs(context, bgpvpn_id,
-                                              filters, fields)
+                                              filters, fields,
+                                              sorts=sorts, limit=limit,
+                                              marker=marker,
+                                              page_reverse=page_reverse)
+
+    def get_port_assocs_count(self, context, bgpvpn_id, filters=None):
+        return self.bgpvpn_db.get_port_assocs_count(context, bgpvpn_id,
+                                                    filters)
 
     def update_port_assoc(self, context, assoc_id, bgpvpn_id, port_assoc):
-        old_port_assoc = self.get_port_assoc(context, assoc_id, bgpvpn_id)
         with db_api.context_manager.writer.using(context):
-            port_assoc = self.bgpvpn_db.update_port_assoc(context, assoc_id,
-                                                          bgpvpn_id,
-                                                          port_assoc)
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            # the routes added and removed are those the database update
+            # computed, in its transaction
+            (old_port_assoc, port_assoc,
+             added_routes, removed_routes) = (
+                self.bgpvpn_db.update_port_assoc_with_diff(
+                    context, assoc_id, bgpvpn_id, port_assoc))
             self.update_port_assoc_precommit(context,
                                              old_port_assoc, port_assoc)
-        self.update_port_assoc_postcommit(context,
-                                          old_port_assoc, port_assoc)
+            if added_routes or removed_routes:
+                self.update_port_assoc_routes_precommit(
+                    context, port_assoc, added_routes, removed_routes)
+            self._journal(context, 'port_association', 'update',
+                          [port_assoc])
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.update_port_assoc_postcommit,
+                                old_port_assoc, port_assoc)
+        if added_routes or removed_routes:
+            self._postcommit_change(context, bgpvpn_id,
+                                    self.update_port_assoc_routes_postcommit,
+                                    port_assoc, added_routes, removed_routes)
         return port_assoc
 
+    def update_port_assoc_routes_precommit(self, context, port_assoc,
+                                           added_routes, removed_routes):
+        """Called inside the transaction when routes of a port assoc change
+
+        Called after update_port_assoc_precommit, with the routes added to
+        and removed from the port association by the update.
+        """
+        pass
+
+    def update_port_assoc_routes_postcommit(self, context, port_assoc,
+                                            added_routes, removed_routes):
+        """Called after commit when routes of a port association change
+
+        Called after update_port_assoc_postcommit, so that drivers can push
+        an incremental update of the routes to their backend.
+        """
+        pass
+
     @abc.abstractmethod
     def update_port_assoc_precommit(self, context,
                                     old_port_assoc, port_assoc):
@@ -412,6 +1283,7 @@ class BGPVPNDriverRCDBMixin(BGPVPNDriverRCBase, BGPVPNDriverDBMixin):
 
     def delete_port_assoc(self, context, assoc_id, bgpvpn_id):
         with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
             port_assoc = self.bgpvpn_db.get_port_assoc(context,
                                                        assoc_id,
                                                        bgpvpn_id)
@@ -419,7 +1291,33 @@ class BGPVPNDriverRCDBMixin(BGPVPNDriverRCBase, BGPVPNDriverDBMixin):
             self.bgpvpn_db.delete_port_assoc(context,
                                              assoc_id,
                                              bgpvpn_id)
-        self.delete_port_assoc_postcommit(context, port_assoc)
+            self._journal(context, 'port_association', 'delete',
+                          [port_assoc])
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.delete_port_assoc_postcommit, port_assoc)
+
+    def delete_port_assocs(self, context, bgpvpn_id, assoc_ids):
+        with db_api.context_manager.writer.using(context):
+            self._set_bgpvpn_pending(context, bgpvpn_id)
+            port_assocs = self.bgpvpn_db.get_port_assocs(
+                context, bgpvpn_id, filters={'id': list(assoc_ids)})
+            self.delete_port_assocs_precommit(context, port_assocs)
+            self.bgpvpn_db.delete_port_assocs(context, bgpvpn_id, assoc_ids)
+            self._journal(context, 'port_association', 'delete',
+                          port_assocs)
+        self._invalidate_bgpvpn(context, bgpvpn_id)
+        self._postcommit_change(context, bgpvpn_id,
+                                self.delete_port_assocs_postcommit,
+                                port_assocs)
+
+    def delete_port_assocs_precommit(self, context, port_assocs):
+        for port_assoc in port_assocs:
+            self.delete_port_assoc_precommit(context, port_assoc)
+
+    def delete_port_assocs_postcommit(self, context, port_assocs):
+        for port_assoc in port_assocs:
+            self.delete_port_assoc_postcommit(context, port_assoc)
 
     @abc.abstractmethod
     def delete_port_assoc_precommit(self, context, port_assoc):
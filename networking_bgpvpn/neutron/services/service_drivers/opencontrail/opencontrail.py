@@ -183,7 +183,9 @@ class OpenContrailBGPVPNDriver(driver_api.BGPVPNDriverBase):
 
         return utils.make_bgpvpn_dict(bgpvpn)
 
-    def get_bgpvpns(self, context, filters=None, fields=None):
+    def get_bgpvpns(self, context, filters=None, fields=None, sorts=None,
+                    limit=None, marker=None, page_reverse=False):
+        # no native sorting and pagination support, done by the API layer
         LOG.debug("get_bgpvpns called, fields = %s, filters = %s"
                   % (fields, filters))
 
@@ -360,7 +362,9 @@ class OpenContrailBGPVPNDriver(driver_api.BGPVPNDriverBase):
                                               fields)
         return net_assoc
 
-    def get_net_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_net_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                       sorts=None, limit=None, marker=None,
+                       page_reverse=False):
         LOG.debug("get_net_assocs called for bgpvpn %s, fields = %s, "
                   "filters = %s" % (bgpvpn_id, fields, filters))
 
@@ -422,7 +426,9 @@ class OpenContrailBGPVPNDriver(driver_api.BGPVPNDriverBase):
         raise bgpvpn_ext.BGPVPNRouterAssociationNotSupported(
             driver=OPENCONTRAIL_BGPVPN_DRIVER_NAME)
 
-    def get_router_assocs(self, context, bgpvpn_id, filters=None, fields=None):
+    def get_router_assocs(self, context, bgpvpn_id, filters=None, fields=None,
+                          sorts=None, limit=None, marker=None,
+                          page_reverse=False):
         raise bgpvpn_ext.BGPVPNRouterAssociationNotSupported(
             driver=OPENCONTRAIL_BGPVPN_DRIVER_NAME)
 
@@ -40,6 +40,10 @@ class OpenDaylightBgpvpnDriver(driver_api.BGPVPNDriver):
     driver for Openstack Neutron.
     """
 
+    # the creation of an association is deleted from the database when it
+    # fails to be pushed, which the request creating it has to do
+    coalesce_association_creations = False
+
     def __init__(self, service_plugin):
         LOG.warning("This OpenDaylight BGPVPN driver has been deprecated"
                     "and will be removed. Switch to new v2 Driver: "
@@ -68,21 +72,26 @@ class OpenDaylightBgpvpnDriver(driver_api.BGPVPNDriver):
         self.client.sendjson('delete', url, None)
 
     def update_bgpvpn_postcommit(self, context, old_bgpvpn, bgpvpn):
+        self.push_bgpvpn(context, bgpvpn)
+
+    def push_bgpvpn(self, context, bgpvpn):
+        # also used with push coalescing, for the updates of the BGPVPN and
+        # the deletions of its associations
         url = BGPVPNS + '/' + bgpvpn['id']
         self.client.sendjson('put', url, {BGPVPNS[:-1]: bgpvpn})
 
     def create_net_assoc_precommit(self, context, net_assoc):
-        bgpvpns = self.bgpvpn_db.get_bgpvpns(
-            context,
-            filters={
-                'networks': [net_assoc['network_id']],
-            },
-        )
-        if len(bgpvpns) > 1:
+        filters = {'networks': [net_assoc['network_id']]}
+        # the association being created is already in the database
+        if self.bgpvpn_db.get_bgpvpns_count(context, filters) > 1:
+            other_bgpvpn_ids = [
+                bgpvpn['id'] for bgpvpn in self.bgpvpn_db.get_bgpvpns(
+                    context, filters=filters, fields=['id'])
+                if bgpvpn['id'] != net_assoc['bgpvpn_id']]
             raise bgpvpn_ext.BGPVPNNetworkAssocExistsAnotherBgpvpn(
                 driver=OPENDAYLIGHT_BGPVPN_DRIVER_NAME,
                 network=net_assoc['network_id'],
-                bgpvpn=bgpvpns[0]['id'])
+                bgpvpn=other_bgpvpn_ids[0])
 
     def create_net_assoc_postcommit(self, context, net_assoc):
         bgpvpn = self.get_bgpvpn(context, net_assoc['bgpvpn_id'])
@@ -0,0 +1,99 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of the creation and update of port association routes"""
+
+import time
+
+from oslo_log import log as logging
+from oslo_utils import uuidutils
+
+from neutron.db import api as db_api
+from neutron.db import models_v2
+from neutron.tests.unit import testlib_api
+from neutron_lib import context
+
+from networking_bgpvpn.neutron.db import bgpvpn_db
+from networking_bgpvpn.tests import tools
+
+LOG = logging.getLogger(__name__)
+
+TENANT_ID = uuidutils.generate_uuid()
+
+
+def _routes(count, offset=0):
+    return [{'type': 'prefix',
+             'prefix': '10.%d.%d.0/24' % divmod(i, 256)}
+            for i in range(offset, offset + count)]
+
+
+class PortAssocRoutesBenchmark(testlib_api.SqlTestCase):
+
+    def setUp(self):
+        super(PortAssocRoutesBenchmark, self).setUp()
+        self.ctx = context.get_admin_context()
+        self.plugin_db = bgpvpn_db.BGPVPNPluginDb()
+        with db_api.context_manager.writer.using(self.ctx):
+            bgpvpn = self.plugin_db._bgpvpn_db_from_dict(
+                {'tenant_id': TENANT_ID, 'name': 'bench', 'type': 'l3',
+                 'route_targets': ['64512:1'], 'import_targets': [],
+                 'export_targets': []})
+            self.ctx.session.add(bgpvpn)
+            self.bgpvpn_id = bgpvpn.id
+            network = models_v2.Network(id=uuidutils.generate_uuid(),
+                                        project_id=TENANT_ID,
+                                        admin_state_up=True, status='ACTIVE')
+            self.ctx.session.add(network)
+            self.port_id = uuidutils.generate_uuid()
+            self.ctx.session.add(models_v2.Port(
+                id=self.port_id, project_id=TENANT_ID,
+                network_id=network.id, mac_address='fa:16:3e:00:00:01',
+                admin_state_up=True, status='ACTIVE', device_id='',
+                device_owner=''))
+
+    def _measure(self, func, *args):
+        start = time.time()
+        statements, result = tools.sql_statements(func, *args)
+        elapsed = time.time() - start
+        return result, elapsed, len(statements)
+
+    def _benchmark(self, count):
+        assoc, elapsed, statements = self._measure(
+            self.plugin_db.create_port_assoc, self.ctx, self.bgpvpn_id,
+            {'tenant_id': TENANT_ID, 'port_id': self.port_id,
+             'advertise_fixed_ips': True, 'routes': _routes(count)})
+        LOG.info("creation of a port association with %(count)d routes: "
+                 "%(elapsed).3fs, %(statements)d SQL statements",
+                 {'count': count, 'elapsed': elapsed,
+                  'statements': statements})
+        self.assertEqual(count, len(assoc['routes']))
+        # the association and its routes are inserted with one statement
+        # each, whatever the number of routes
+        self.assertLess(statements, 10)
+
+        # replace half of the routes
+        routes = _routes(count // 2, offset=count // 2) + _routes(
+            count // 2, offset=count)
+        assoc, elapsed, statements = self._measure(
+            self.plugin_db.update_port_assoc, self.ctx, assoc['id'],
+            self.bgpvpn_id, {'routes': routes})
+        LOG.info("update of half of the %(count)d routes of a port "
+                 "association: %(elapsed).3fs, %(statements)d SQL statements",
+                 {'count': count, 'elapsed': elapsed,
+                  'statements': statements})
+        self.assertEqual(len(routes), len(assoc['routes']))
+
+    def test_port_assoc_1k_routes(self):
+        self._benchmark(1000)
+
+    def test_port_assoc_10k_routes(self):
+        self._benchmark(10000)
@@ -0,0 +1,31 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import event
+
+from neutron.db import api as db_api
+
+
+def sql_statements(func, *args, **kwargs):
+    """Return the SQL statements issued by a call, along with its result"""
+    engine = db_api.context_manager.writer.get_engine()
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'after_cursor_execute', _record)
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        event.remove(engine, 'after_cursor_execute', _record)
+    return statements, result
@@ -0,0 +1,63 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.tests import base
+from oslo_serialization import jsonutils
+import webob
+import webob.dec
+
+from networking_bgpvpn.neutron.api import conditional_get
+
+
+class TestConditionalGet(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestConditionalGet, self).setUp()
+        self.body = {'bgpvpn': {'id': 'foo', 'revision_number': 3}}
+
+        @webob.dec.wsgify
+        def application(request):
+            return webob.Response(body=jsonutils.dump_as_bytes(self.body),
+                                  content_type='application/json')
+
+        self.app = conditional_get.ConditionalGet(application)
+
+    def _get(self, path='/v2.0/bgpvpn/bgpvpns/foo', **headers):
+        request = webob.Request.blank(path, headers=headers)
+        return request.get_response(self.app)
+
+    def test_etag_is_revision_number(self):
+        response = self._get()
+        self.assertEqual(200, response.status_int)
+        self.assertEqual('3', response.etag)
+
+    def test_if_none_match_not_modified(self):
+        response = self._get(**{'If-None-Match': '"3"'})
+        self.assertEqual(304, response.status_int)
+        self.assertEqual(b'', response.body)
+
+    def test_if_none_match_modified(self):
+        response = self._get(**{'If-None-Match': '"2"'})
+        self.assertEqual(200, response.status_int)
+        self.assertEqual(self.body, jsonutils.loads(response.body))
+
+    def test_no_etag_on_collection(self):
+        self.body = {'bgpvpns': [{'id': 'foo', 'revision_number': 3}]}
+        response = self._get(path='/v2.0/bgpvpn/bgpvpns',
+                             **{'If-None-Match': '"3"'})
+        self.assertEqual(200, response.status_int)
+        self.assertIsNone(response.etag)
+
+    def test_no_etag_on_other_resources(self):
+        self.body = {'network': {'id': 'foo', 'revision_number': 3}}
+        response = self._get(path='/v2.0/networks/foo')
+        self.assertIsNone(response.etag)
@@ -13,24 +13,52 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from sqlalchemy import event
+
+from neutron.db import api as db_api
+
 from neutron_lib.api.definitions import bgpvpn_routes_control as bgpvpn_rc_def
 from neutron_lib.api.definitions import bgpvpn_vni as bgpvpn_vni_def
+from neutron_lib import constants as const
 from neutron_lib import context
+from neutron_lib import exceptions as n_exc
 
+from networking_bgpvpn.neutron.db import bgpvpn_db
 from networking_bgpvpn.neutron.db.bgpvpn_db import BGPVPNPluginDb
 from networking_bgpvpn.neutron.extensions.bgpvpn \
     import BGPVPNNetAssocAlreadyExists
 from networking_bgpvpn.neutron.extensions.bgpvpn import BGPVPNNetAssocNotFound
 from networking_bgpvpn.neutron.extensions.bgpvpn import BGPVPNNotFound
+from networking_bgpvpn.neutron.extensions import bgpvpn_revisions
 from networking_bgpvpn.neutron.services.common import constants
 from networking_bgpvpn.neutron.services.common import utils
+from networking_bgpvpn.tests import tools
 from networking_bgpvpn.tests.unit.services import test_plugin
 
+_uuid = test_plugin._uuid
+
 
 def _id_list(list):
     return [bgpvpn['id'] for bgpvpn in list]
 
 
+def _row_widths(func, *args, **kwargs):
+    """Return the number of columns of each result set fetched by a call"""
+    engine = db_api.context_manager.writer.get_engine()
+    widths = []
+
+    def _record(conn, cursor, statement, *args):
+        if cursor.description:
+            widths.append(len(cursor.description))
+
+    event.listen(engine, 'after_cursor_execute', _record)
+    try:
+        func(*args, **kwargs)
+    finally:
+        event.remove(engine, 'after_cursor_execute', _record)
+    return widths
+
+
 class BgpvpnDBTestCase(test_plugin.BgpvpnTestCaseMixin):
 
     def setUp(self, service_provider=None):
@@ -415,6 +443,718 @@ class BgpvpnDBTestCase(test_plugin.BgpvpnTestCaseMixin):
             self.assertIn(bgpvpn2['bgpvpn']['id'], bgpvpn_id_list)
             self.assertNotIn(bgpvpn3['bgpvpn']['id'], bgpvpn_id_list)
 
+    def test_db_list_bgpvpns_constant_query_count(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.router(tenant_id=self._tenant_id) as router, \
+                self.bgpvpn() as bgpvpn1, \
+                self.bgpvpn() as bgpvpn2, \
+                self.assoc_net(bgpvpn1['bgpvpn']['id'],
+                               net1['network']['id']), \
+                self.assoc_net(bgpvpn2['bgpvpn']['id'],
+                               net2['network']['id']), \
+                self.assoc_router(bgpvpn2['bgpvpn']['id'],
+                                  router['router']['id']):
+            single, _ = tools.sql_statements(
+                self.plugin_db.get_bgpvpns, self.ctx,
+                filters={'id': [bgpvpn1['bgpvpn']['id']]})
+            full, bgpvpns = tools.sql_statements(self.plugin_db.get_bgpvpns,
+                                                 self.ctx)
+
+            self.assertEqual(len(single), len(full))
+            bgpvpns = {bgpvpn['id']: bgpvpn for bgpvpn in bgpvpns}
+            self.assertEqual([net1['network']['id']],
+                             bgpvpns[bgpvpn1['bgpvpn']['id']]['networks'])
+            self.assertEqual([], bgpvpns[bgpvpn1['bgpvpn']['id']]['routers'])
+            self.assertEqual([net2['network']['id']],
+                             bgpvpns[bgpvpn2['bgpvpn']['id']]['networks'])
+            self.assertEqual([router['router']['id']],
+                             bgpvpns[bgpvpn2['bgpvpn']['id']]['routers'])
+
+    def test_db_list_bgpvpns_fields_projection(self):
+        with self.network() as net, \
+                self.bgpvpn() as bgpvpn, \
+                self.assoc_net(bgpvpn['bgpvpn']['id'],
+                               net['network']['id']):
+            statements, bgpvpns = tools.sql_statements(
+                self.plugin_db.get_bgpvpns, self.ctx, fields=['id', 'name'])
+            self.assertEqual([{'id': bgpvpn['bgpvpn']['id'],
+                               'name': bgpvpn['bgpvpn']['name']}],
+                             bgpvpns)
+            # no association or route target loading, no unneeded column
+            self.assertEqual(1, len(statements))
+            self.assertNotIn('bgpvpn_route_targets', statements[0])
+
+            statements, bgpvpns = tools.sql_statements(
+                self.plugin_db.get_bgpvpns, self.ctx,
+                fields=['id', 'networks', 'route_targets'])
+            self.assertEqual([{'id': bgpvpn['bgpvpn']['id'],
+                               'networks': [net['network']['id']],
+                               'route_targets':
+                                   bgpvpn['bgpvpn']['route_targets']}],
+                             bgpvpns)
+            # the BGPVPNs, then their networks and their route targets, each
+            # loaded with one query for all the BGPVPNs
+            self.assertEqual(3, len(statements))
+
+            self.assertEqual(
+                {'id': bgpvpn['bgpvpn']['id'], 'type': 'l3'},
+                self.plugin_db.get_bgpvpn(self.ctx, bgpvpn['bgpvpn']['id'],
+                                          fields=['id', 'type']))
+
+    def test_db_list_bgpvpn_filtering_route_targets(self):
+        with self.bgpvpn(route_targets=['64512:1'],
+                         import_targets=['64512:100']) as bgpvpn1, \
+                self.bgpvpn(route_targets=['64512:2'],
+                            export_targets=['64512:100']) as bgpvpn2:
+            bgpvpn1_id = bgpvpn1['bgpvpn']['id']
+            bgpvpn2_id = bgpvpn2['bgpvpn']['id']
+
+            self.assertEqual(
+                [bgpvpn1_id],
+                _id_list(self.plugin_db.get_bgpvpns(
+                    self.ctx, filters={'import_targets': ['64512:100']})))
+            self.assertEqual(
+                [bgpvpn2_id],
+                _id_list(self.plugin_db.get_bgpvpns(
+                    self.ctx, filters={'export_targets': ['64512:100']})))
+            self.assertEqual(
+                sorted([bgpvpn1_id, bgpvpn2_id]),
+                sorted(_id_list(self.plugin_db.get_bgpvpns(
+                    self.ctx,
+                    filters={'route_targets': ['64512:1', '64512:2']}))))
+            self.assertEqual(
+                [],
+                self.plugin_db.get_bgpvpns(
+                    self.ctx, filters={'route_targets': ['64512:100']}))
+
+    def test_db_bgpvpn_long_route_target_lists(self):
+        route_targets = ['64512:%d' % (100000 + i) for i in range(50)]
+        import_targets = list(reversed(route_targets))
+        bgpvpn = self.plugin_db.create_bgpvpn(
+            self.ctx,
+            {"tenant_id": self._tenant_id,
+             "type": "l3",
+             "name": "",
+             "route_targets": route_targets,
+             "import_targets": import_targets,
+             "export_targets": []})
+        bgpvpn = self.plugin_db.get_bgpvpn(self.ctx, bgpvpn['id'])
+        self.assertEqual(route_targets, bgpvpn['route_targets'])
+        self.assertEqual(import_targets, bgpvpn['import_targets'])
+        self.assertEqual([], bgpvpn['export_targets'])
+
+        self.plugin_db.update_bgpvpn(
+            self.ctx, bgpvpn['id'],
+            {'route_targets': route_targets[10:] + ['64512:1']})
+        bgpvpn = self.plugin_db.get_bgpvpn(self.ctx, bgpvpn['id'])
+        self.assertEqual(route_targets[10:] + ['64512:1'],
+                         bgpvpn['route_targets'])
+        self.assertEqual(import_targets, bgpvpn['import_targets'])
+        self.plugin_db.delete_bgpvpn(self.ctx, bgpvpn['id'])
+
+    def test_db_update_bgpvpn_model_changed_fields(self):
+        with self.bgpvpn(route_targets=['64512:1', '64512:2'],
+                         import_targets=['64512:3']) as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            with db_api.context_manager.writer.using(self.ctx):
+                bgpvpn_db = self.plugin_db.get_bgpvpn_for_update(self.ctx,
+                                                                 bgpvpn_id)
+                self.assertEqual(set(), self.plugin_db.update_bgpvpn_model(
+                    self.ctx, bgpvpn_db,
+                    {'name': bgpvpn['bgpvpn']['name'],
+                     'route_targets': ['64512:1', '64512:2'],
+                     'import_targets': ['64512:3']}))
+                self.assertEqual(
+                    set(['name', 'route_targets']),
+                    self.plugin_db.update_bgpvpn_model(
+                        self.ctx, bgpvpn_db,
+                        {'name': 'foo',
+                         'route_targets': ['64512:2', '64512:1'],
+                         'import_targets': ['64512:3']}))
+
+    def test_db_update_bgpvpn_only_writes_changes(self):
+        with self.bgpvpn(route_targets=['64512:1', '64512:2']) as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            old_bgpvpn = self.plugin_db.get_bgpvpn(self.ctx, bgpvpn_id)
+            self.assertEqual(['64512:1', '64512:2'],
+                             old_bgpvpn['route_targets'])
+
+            statements, new_bgpvpn = tools.sql_statements(
+                self.plugin_db.update_bgpvpn, self.ctx, bgpvpn_id,
+                {'name': old_bgpvpn['name'],
+                 'route_targets': ['64512:1', '64512:2']})
+            self.assertEqual(old_bgpvpn, new_bgpvpn)
+            self.assertEqual([], [statement for statement in statements
+                                  if not statement.startswith('SELECT')])
+
+            new_bgpvpn = self.plugin_db.update_bgpvpn(
+                self.ctx, bgpvpn_id, {'name': 'foo'})
+            self.assertEqual('foo', new_bgpvpn['name'])
+            self.assertEqual(['64512:1', '64512:2'],
+                             new_bgpvpn['route_targets'])
+
+    def test_db_revision_numbers(self):
+        with self.network() as net, self.bgpvpn() as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            self.assertEqual(0, bgpvpn['bgpvpn']['revision_number'])
+
+            # an update without changes does not bump the revision number
+            self.plugin_db.update_bgpvpn(self.ctx, bgpvpn_id,
+                                         {'name': bgpvpn['bgpvpn']['name']})
+            self.assertEqual(0, self.plugin_db.get_bgpvpn(
+                self.ctx, bgpvpn_id)['revision_number'])
+
+            new_bgpvpn = self.plugin_db.update_bgpvpn(
+                self.ctx, bgpvpn_id, {'route_targets': ['64512:42']})
+            self.assertEqual(1, new_bgpvpn['revision_number'])
+
+            # association changes bump the revision number of the BGPVPN
+            net_assoc = self.plugin_db.create_net_assoc(
+                self.ctx, bgpvpn_id,
+                {'tenant_id': self._tenant_id,
+                 'network_id': net['network']['id']})
+            self.assertEqual(0, net_assoc['revision_number'])
+            self.assertEqual(2, self.plugin_db.get_bgpvpn(
+                self.ctx, bgpvpn_id)['revision_number'])
+
+            self.plugin_db.delete_net_assoc(self.ctx, net_assoc['id'],
+                                            bgpvpn_id)
+            self.assertEqual(3, self.plugin_db.get_bgpvpn(
+                self.ctx, bgpvpn_id)['revision_number'])
+
+    def test_db_update_bgpvpn_if_match(self):
+        with self.bgpvpn() as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+
+            self.ctx.set_transaction_constraint('bgpvpns', bgpvpn_id, 1)
+            self.assertRaises(
+                bgpvpn_revisions.BGPVPNRevisionNumberConstraintFailed,
+                self.plugin_db.update_bgpvpn,
+                self.ctx, bgpvpn_id, {'name': 'foo'})
+            self.assertEqual(bgpvpn['bgpvpn']['name'],
+                             self.plugin_db.get_bgpvpn(self.ctx,
+                                                       bgpvpn_id)['name'])
+
+            self.ctx.set_transaction_constraint('bgpvpns', bgpvpn_id, 0)
+            new_bgpvpn = self.plugin_db.update_bgpvpn(self.ctx, bgpvpn_id,
+                                                      {'name': 'foo'})
+            self.assertEqual('foo', new_bgpvpn['name'])
+            self.assertEqual(1, new_bgpvpn['revision_number'])
+            # the constraint has been consumed
+            self.assertIsNone(self.ctx.get_transaction_constraint())
+
+    def test_db_change_log(self):
+        with self.network() as net, self.bgpvpn(do_delete=False) as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            cursor = self.plugin_db.get_changes(self.ctx)[-1]['id']
+
+            self.plugin_db.update_bgpvpn(self.ctx, bgpvpn_id, {'name': 'foo'})
+            net_assoc = self.plugin_db.create_net_assoc(
+                self.ctx, bgpvpn_id,
+                {'tenant_id': self._tenant_id,
+                 'network_id': net['network']['id']})
+            self.plugin_db.delete_bgpvpn(self.ctx, bgpvpn_id)
+
+            changes = self.plugin_db.get_changes(self.ctx, cursor)
+            self.assertEqual(
+                [('bgpvpn', bgpvpn_id, 'update', 1),
+                 ('bgpvpn', bgpvpn_id, 'update', 2),
+                 ('network_association', net_assoc['id'], 'create', 0),
+                 ('network_association', net_assoc['id'], 'delete', 0),
+                 ('bgpvpn', bgpvpn_id, 'delete', 2)],
+                [(change['resource_type'], change['resource_id'],
+                  change['operation'], change['revision_number'])
+                 for change in changes])
+            self.assertTrue(all(change['bgpvpn_id'] == bgpvpn_id
+                                for change in changes))
+            self.assertEqual(changes[:2], self.plugin_db.get_changes(
+                self.ctx, cursor, limit=2))
+
+            self.assertEqual(0, self.plugin_db.prune_changes(self.ctx,
+                                                             max_age=3600))
+            self.plugin_db.prune_changes(self.ctx, cursor=changes[1]['id'])
+            self.assertEqual(changes[2:],
+                             self.plugin_db.get_changes(self.ctx))
+
+    def test_db_journal(self):
+        bgpvpn_a = {'id': _uuid(), 'name': 'a'}
+        bgpvpn_b = {'id': _uuid(), 'name': 'b'}
+        net_assoc = {'id': _uuid(), 'bgpvpn_id': bgpvpn_a['id'],
+                     'network_id': _uuid()}
+        self.plugin_db.add_journal_entries(self.ctx, 'bgpvpn', 'create',
+                                           [bgpvpn_a, bgpvpn_b])
+        self.plugin_db.add_journal_entries(self.ctx, 'network_association',
+                                           'create', [net_assoc])
+
+        # the association waits for the creation of its BGPVPN
+        entries = self.plugin_db.claim_journal_entries(self.ctx, 10, 60)
+        self.assertEqual([bgpvpn_a, bgpvpn_b],
+                         [entry['data'] for entry in entries])
+        self.assertEqual([], self.plugin_db.claim_journal_entries(
+            self.ctx, 10, 60))
+        self.assertEqual({bgpvpn_db.JOURNAL_PENDING: 1,
+                          bgpvpn_db.JOURNAL_PROCESSING: 2,
+                          bgpvpn_db.JOURNAL_FAILED: 0},
+                         self.plugin_db.get_journal_counts(self.ctx))
+
+        # a failed sync is retried after its delay, and blocks the
+        # association meanwhile
+        self.plugin_db.retry_journal_entry(self.ctx, entries[0]['id'], 3600)
+        self.plugin_db.complete_journal_entry(self.ctx, entries[1]['id'])
+        self.assertEqual([], self.plugin_db.claim_journal_entries(
+            self.ctx, 10, 60))
+        self.plugin_db.retry_journal_entry(self.ctx, entries[0]['id'], 0)
+        entries = self.plugin_db.claim_journal_entries(self.ctx, 10, 60)
+        self.assertEqual([('bgpvpn', bgpvpn_a['id'], 'create', 2)],
+                         [(entry['resource_type'], entry['resource_id'],
+                           entry['operation'], entry['retry_count'])
+                          for entry in entries])
+
+        # a failed entry no longer blocks the association
+        self.plugin_db.retry_journal_entry(self.ctx, entries[0]['id'], None)
+        entries = self.plugin_db.claim_journal_entries(self.ctx, 10, -1)
+        self.assertEqual([('network_association', net_assoc['id'],
+                           bgpvpn_a['id'], net_assoc)],
+                         [(entry['resource_type'], entry['resource_id'],
+                           entry['bgpvpn_id'], entry['data'])
+                          for entry in entries])
+
+        # entries whose claim expired are claimed again
+        self.assertEqual(entries, self.plugin_db.claim_journal_entries(
+            self.ctx, 10, 60))
+
+    def test_db_delete_bgpvpn_set_based(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.port() as port1, \
+                self.port() as port2, \
+                self.bgpvpn(do_delete=False) as bgpvpn, \
+                self.bgpvpn() as other_bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            other_bgpvpn_id = other_bgpvpn['bgpvpn']['id']
+            self.plugin_db.create_net_assocs(
+                self.ctx, bgpvpn_id,
+                [{'tenant_id': self._tenant_id,
+                  'network_id': net['network']['id']}
+                 for net in (net1, net2)])
+            self.plugin_db.create_port_assoc(
+                self.ctx, bgpvpn_id,
+                {'tenant_id': self._tenant_id,
+                 'port_id': port1['port']['id'],
+                 'advertise_fixed_ips': True,
+                 'routes': [{'type': 'prefix', 'prefix': '12.1.0.0/16'},
+                            {'type': 'prefix', 'prefix': '14.0.0.0/8'}]})
+            # a route of another BGPVPN leaking routes from this BGPVPN
+            other_assoc = self.plugin_db.create_port_assoc(
+                self.ctx, other_bgpvpn_id,
+                {'tenant_id': self._tenant_id,
+                 'port_id': port2['port']['id'],
+                 'advertise_fixed_ips': True,
+                 'routes': [{'type': 'bgpvpn', 'bgpvpn_id': bgpvpn_id},
+                            {'type': 'prefix', 'prefix': '16.0.0.0/8'}]})
+
+            statements, deleted = tools.sql_statements(
+                self.plugin_db.delete_bgpvpn, self.ctx, bgpvpn_id)
+            self.assertEqual(bgpvpn_id, deleted['id'])
+            self.assertEqual(2, len(deleted['networks']))
+            # one DELETE per table, whatever the number of associations
+            self.assertEqual(6, len([statement for statement in statements
+                                     if statement.startswith('DELETE')]))
+
+            self.assertRaises(BGPVPNNotFound, self.plugin_db.get_bgpvpn,
+                              self.ctx, bgpvpn_id)
+            for model in (bgpvpn_db.BGPVPNNetAssociation,
+                          bgpvpn_db.BGPVPNPortAssociation,
+                          bgpvpn_db.BGPVPNRouteTarget):
+                self.assertEqual(0, self.ctx.session.query(model).filter_by(
+                    bgpvpn_id=bgpvpn_id).count())
+            other_assoc = self.plugin_db.get_port_assoc(
+                self.ctx, other_assoc['id'], other_bgpvpn_id)
+            self.assertEqual(['16.0.0.0/8'],
+                             [route['prefix']
+                              for route in other_assoc['routes']])
+            self.plugin_db.delete_port_assoc(self.ctx, other_assoc['id'],
+                                             other_bgpvpn_id)
+
+    def test_db_list_bgpvpn_filtering_many_associated_resources(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.bgpvpn() as bgpvpn, \
+                self.assoc_net(bgpvpn['bgpvpn']['id'],
+                               net1['network']['id']), \
+                self.assoc_net(bgpvpn['bgpvpn']['id'],
+                               net2['network']['id']):
+            net_ids = [net1['network']['id'], net2['network']['id']]
+            one_net, _ = tools.sql_statements(
+                self.plugin_db.get_bgpvpns, self.ctx,
+                filters={'networks': net_ids[:1]}, fields=['id'])
+            # filter values not associated to any BGPVPN do not change the
+            # result nor the cost of the query
+            many_nets, bgpvpns = tools.sql_statements(
+                self.plugin_db.get_bgpvpns,
+                self.ctx,
+                filters={'networks': net_ids + [_uuid() for _ in range(50)]},
+                fields=['id'])
+
+            self.assertEqual([bgpvpn['bgpvpn']['id']], _id_list(bgpvpns))
+            self.assertEqual(len(one_net), len(many_nets))
+
+    def test_db_list_bgpvpn_filtering_associated_port(self):
+        with self.port(tenant_id=self._tenant_id) as port, \
+                self.router(tenant_id=self._tenant_id) as router, \
+                self.bgpvpn() as bgpvpn1, \
+                self.bgpvpn() as bgpvpn2, \
+                self.assoc_port(bgpvpn1['bgpvpn']['id'],
+                                port['port']['id']), \
+                self.assoc_router(bgpvpn2['bgpvpn']['id'],
+                                  router['router']['id']):
+            self.assertEqual(
+                [bgpvpn1['bgpvpn']['id']],
+                _id_list(self.plugin_db.get_bgpvpns(
+                    self.ctx, filters={'ports': [port['port']['id']]})))
+
+    def _query_plan(self, query):
+        engine = db_api.context_manager.writer.get_engine()
+        if engine.dialect.name != 'sqlite':
+            self.skipTest("query plans are only checked with sqlite")
+        statement = query.statement.compile(
+            dialect=engine.dialect, compile_kwargs={'literal_binds': True})
+        return [row[-1] for row in
+                engine.execute('EXPLAIN QUERY PLAN %s' % statement)]
+
+    def test_db_association_lookups_use_indexes(self):
+        session = self.ctx.session
+        net_assoc = bgpvpn_db.BGPVPNNetAssociation
+        router_assoc = bgpvpn_db.BGPVPNRouterAssociation
+        port_assoc = bgpvpn_db.BGPVPNPortAssociation
+        route = bgpvpn_db.BGPVPNPortAssociationRoute
+        lookups = [
+            ('bgpvpn_network_associations',
+             session.query(net_assoc).filter(
+                 net_assoc.network_id == _uuid())),
+            ('bgpvpn_router_associations',
+             session.query(router_assoc).filter(
+                 router_assoc.router_id == _uuid())),
+            ('bgpvpn_port_associations',
+             session.query(port_assoc).filter(
+                 port_assoc.port_id == _uuid())),
+            ('bgpvpn_port_association_routes',
+             session.query(route).filter(route.bgpvpn_id == _uuid())),
+            ('bgpvpn_port_association_routes',
+             session.query(route).filter(
+                 route.port_association_id == _uuid())),
+        ]
+        for table, query in lookups:
+            plan = [detail for detail in self._query_plan(query)
+                    if table in detail]
+            self.assertNotEqual([], plan)
+            for detail in plan:
+                # 'SCAN' would be a full table (or full index) scan
+                self.assertTrue(detail.startswith('SEARCH'),
+                                "%s: %s" % (table, detail))
+
+    def test_db_list_associations_do_not_load_resources(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.port() as port1, \
+                self.port() as port2, \
+                self.bgpvpn() as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            for net in (net1, net2):
+                self.plugin_db.create_net_assoc(
+                    self.ctx, bgpvpn_id,
+                    {'tenant_id': self._tenant_id,
+                     'network_id': net['network']['id']})
+            for port in (port1, port2):
+                self.plugin_db.create_port_assoc(
+                    self.ctx, bgpvpn_id,
+                    {'tenant_id': self._tenant_id,
+                     'port_id': port['port']['id'],
+                     'advertise_fixed_ips': True,
+                     'routes': [{'type': 'prefix',
+                                 'prefix': '12.1.3.0/24'},
+                                {'type': 'bgpvpn',
+                                 'bgpvpn_id': bgpvpn_id}]})
+
+            statements, net_assocs = tools.sql_statements(
+                self.plugin_db.get_net_assocs, self.ctx, bgpvpn_id)
+            self.assertEqual(2, len(net_assocs))
+            self.assertEqual(1, len(statements))
+            self.assertNotIn('networks', statements[0])
+            # only the columns of bgpvpn_network_associations
+            self.assertEqual(
+                [len(bgpvpn_db.BGPVPNNetAssociation.__table__.columns)],
+                _row_widths(self.plugin_db.get_net_assocs,
+                            self.ctx, bgpvpn_id))
+
+            # one query for the associations, one for all their routes
+            statements, port_assocs = tools.sql_statements(
+                self.plugin_db.get_port_assocs, self.ctx, bgpvpn_id)
+            self.assertEqual(2, len(port_assocs))
+            for port_assoc in port_assocs:
+                self.assertEqual(2, len(port_assoc['routes']))
+            self.assertEqual(2, len(statements))
+            for statement in statements:
+                self.assertNotIn('ports.', statement)
+                self.assertNotIn('bgpvpns.', statement)
+
+    def test_db_list_net_assocs_keyset_pagination(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.network() as net3, \
+                self.bgpvpn() as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            net_ids = sorted(net['network']['id']
+                             for net in (net1, net2, net3))
+            for net_id in net_ids:
+                self.plugin_db.create_net_assoc(
+                    self.ctx, bgpvpn_id,
+                    {'tenant_id': self._tenant_id, 'network_id': net_id})
+            sorts = [('network_id', True)]
+
+            page = self.plugin_db.get_net_assocs(self.ctx, bgpvpn_id,
+                                                 sorts=sorts, limit=2)
+            self.assertEqual(net_ids[:2],
+                             [assoc['network_id'] for assoc in page])
+            page = self.plugin_db.get_net_assocs(self.ctx, bgpvpn_id,
+                                                 sorts=sorts, limit=2,
+                                                 marker=page[-1]['id'])
+            self.assertEqual(net_ids[2:],
+                             [assoc['network_id'] for assoc in page])
+            # previous page, in the same order
+            page = self.plugin_db.get_net_assocs(self.ctx, bgpvpn_id,
+                                                 sorts=sorts, limit=2,
+                                                 marker=page[0]['id'],
+                                                 page_reverse=True)
+            self.assertEqual(net_ids[:2],
+                             [assoc['network_id'] for assoc in page])
+
+    def test_db_list_bgpvpns_keyset_pagination(self):
+        with self.bgpvpn(name='bgpvpn1') as bgpvpn1, \
+                self.bgpvpn(name='bgpvpn2') as bgpvpn2, \
+                self.bgpvpn(name='bgpvpn2') as bgpvpn3:
+            # same name: ties are broken on ids
+            tied = sorted([bgpvpn2['bgpvpn']['id'], bgpvpn3['bgpvpn']['id']])
+            sorts = [('name', True)]
+            page = self.plugin_db.get_bgpvpns(self.ctx, sorts=sorts, limit=2)
+            self.assertEqual([bgpvpn1['bgpvpn']['id'], tied[0]],
+                             _id_list(page))
+            page = self.plugin_db.get_bgpvpns(self.ctx, sorts=sorts, limit=2,
+                                              marker=page[-1]['id'])
+            self.assertEqual([tied[1]], _id_list(page))
+
+            self.assertRaises(n_exc.BadRequest,
+                              self.plugin_db.get_bgpvpns, self.ctx,
+                              sorts=[('route_targets', True)], limit=2)
+
+    def test_db_count_bgpvpns_and_associations(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.router(tenant_id=self._tenant_id) as router, \
+                self.bgpvpn() as bgpvpn1, \
+                self.bgpvpn(type=constants.BGPVPN_L2) as bgpvpn2, \
+                self.assoc_net(bgpvpn1['bgpvpn']['id'],
+                               net1['network']['id']), \
+                self.assoc_net(bgpvpn1['bgpvpn']['id'],
+                               net2['network']['id']), \
+                self.assoc_net(bgpvpn2['bgpvpn']['id'],
+                               net2['network']['id']), \
+                self.assoc_router(bgpvpn1['bgpvpn']['id'],
+                                  router['router']['id']):
+            bgpvpn1_id = bgpvpn1['bgpvpn']['id']
+            for filters, expected in (
+                    (None, 2),
+                    ({'type': [constants.BGPVPN_L2]}, 1),
+                    ({'networks': [net2['network']['id']]}, 2),
+                    ({'networks': [net1['network']['id'],
+                                   net2['network']['id']]}, 2),
+                    ({'routers': [router['router']['id']]}, 1),
+                    ({'ports': [_uuid()]}, 0)):
+                statements, count = tools.sql_statements(
+                    self.plugin_db.get_bgpvpns_count, self.ctx,
+                    filters=filters)
+                self.assertEqual(expected, count)
+                self.assertEqual(1, len(statements))
+                self.assertIn('count(', statements[0].lower())
+
+            statements, count = tools.sql_statements(
+                self.plugin_db.get_net_assocs_count, self.ctx, bgpvpn1_id)
+            self.assertEqual(2, count)
+            self.assertEqual(1, len(statements))
+            self.assertEqual(1, self.plugin_db.get_net_assocs_count(
+                self.ctx, bgpvpn1_id,
+                filters={'network_id': [net1['network']['id']]}))
+            self.assertEqual(1, self.plugin_db.get_router_assocs_count(
+                self.ctx, bgpvpn1_id))
+            self.assertEqual(0, self.plugin_db.get_port_assocs_count(
+                self.ctx, bgpvpn1_id))
+
+    def test_db_bgpvpn_exists(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.router(tenant_id=self._tenant_id) as router, \
+                self.bgpvpn() as bgpvpn1, \
+                self.bgpvpn(type=constants.BGPVPN_L2) as bgpvpn2, \
+                self.assoc_net(bgpvpn1['bgpvpn']['id'],
+                               net1['network']['id']), \
+                self.assoc_net(bgpvpn2['bgpvpn']['id'],
+                               net1['network']['id']), \
+                self.assoc_router(bgpvpn1['bgpvpn']['id'],
+                                  router['router']['id']):
+            for filters, expected in (
+                    (None, True),
+                    ({'networks': [net1['network']['id']]}, True),
+                    ({'networks': [net1['network']['id']],
+                      'type': [constants.BGPVPN_L3]}, True),
+                    ({'networks': [net2['network']['id']]}, False),
+                    ({'routers': [router['router']['id']]}, True),
+                    ({'routers': [router['router']['id']],
+                      'type': [constants.BGPVPN_L2]}, False),
+                    ({'ports': [_uuid()]}, False)):
+                statements, exists = tools.sql_statements(
+                    self.plugin_db.bgpvpn_exists, self.ctx, filters=filters)
+                self.assertIs(expected, exists)
+                # a single statement, which does not load any BGPVPN
+                self.assertEqual(1, len(statements))
+                self.assertIn('exists', statements[0].lower())
+
+    def test_db_router_net_assoc_conflicts(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.subnet(network=net1, cidr='10.0.1.0/24') as subnet1, \
+                self.subnet(network=net2, cidr='10.0.2.0/24') as subnet2, \
+                self.router(tenant_id=self._tenant_id) as router, \
+                self.port(subnet=subnet1, device_id=router['router']['id'],
+                          device_owner=const.DEVICE_OWNER_ROUTER_INTF), \
+                self.port(subnet=subnet2, device_id=router['router']['id'],
+                          device_owner=const.DEVICE_OWNER_ROUTER_INTF), \
+                self.bgpvpn() as bgpvpn1, \
+                self.bgpvpn() as bgpvpn2, \
+                self.assoc_net(bgpvpn1['bgpvpn']['id'],
+                               net2['network']['id']), \
+                self.assoc_router(bgpvpn2['bgpvpn']['id'],
+                                  router['router']['id']):
+            net_ids = [net1['network']['id'], net2['network']['id']]
+            router_id = router['router']['id']
+            statements, result = tools.sql_statements(
+                self.plugin_db.get_network_router_bgpvpns, self.ctx, net_ids)
+            self.assertEqual(1, len(statements))
+            self.assertEqual(
+                sorted([(net_id, bgpvpn2['bgpvpn']['id'])
+                        for net_id in net_ids]),
+                sorted(tuple(row) for row in result))
+
+            # net1 is not associated to any BGPVPN
+            statements, result = tools.sql_statements(
+                self.plugin_db.get_router_network_bgpvpns, self.ctx,
+                [router_id])
+            self.assertEqual(1, len(statements))
+            self.assertEqual(
+                [(router_id, net2['network']['id'], bgpvpn1['bgpvpn']['id'])],
+                [tuple(row) for row in result])
+
+            self.assertEqual([], self.plugin_db.get_network_router_bgpvpns(
+                self.ctx, [_uuid()]))
+            self.assertEqual([], self.plugin_db.get_router_network_bgpvpns(
+                self.ctx, [_uuid()]))
+
+    def test_db_create_bgpvpns_single_flush(self):
+        bgpvpns = [{'tenant_id': self._tenant_id,
+                    'name': 'bgpvpn%d' % index,
+                    'type': 'l3',
+                    'route_targets': ['64512:%d' % index],
+                    'import_targets': [],
+                    'export_targets': ['64513:%d' % index]}
+                   for index in range(10)]
+        statements, created = tools.sql_statements(
+            self.plugin_db.create_bgpvpns, self.ctx, bgpvpns)
+        self.assertEqual(['bgpvpn%d' % index for index in range(10)],
+                         [bgpvpn['name'] for bgpvpn in created])
+        self.assertEqual(['64513:3'], created[3]['export_targets'])
+        self.assertEqual([], created[3]['networks'])
+        # one batched INSERT for the BGPVPNs, one for their route targets
+        # and the change-log INSERT of their creation, and no lazy-loading
+        # of the associations of the new BGPVPNs
+        self.assertEqual(3, len(statements))
+        self.assertTrue(all(statement.startswith('INSERT INTO')
+                            for statement in statements))
+        self.assertEqual(
+            sorted(bgpvpn['id'] for bgpvpn in created),
+            sorted(_id_list(self.plugin_db.get_bgpvpns(self.ctx))))
+
+    def test_db_create_delete_net_assocs(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.bgpvpn() as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            net_assocs = [{'tenant_id': self._tenant_id,
+                           'network_id': net['network']['id']}
+                          for net in (net1, net2)]
+            statements, assocs = tools.sql_statements(
+                self.plugin_db.create_net_assocs, self.ctx, bgpvpn_id,
+                net_assocs)
+            self.assertEqual([net1['network']['id'], net2['network']['id']],
+                             [assoc['network_id'] for assoc in assocs])
+            # one query checking for existing associations, a single
+            # UPDATE bumping the revision number of the BGPVPN and the
+            # change-log INSERT of this bump, one INSERT of the associations
+            # and the change-log INSERT of their creation
+            self.assertEqual(5, len(statements))
+            self.assertTrue(statements[1].startswith('UPDATE bgpvpns'))
+
+            # no partial creation if one of the networks is already
+            # associated
+            with self.network() as net3:
+                self.assertRaises(
+                    BGPVPNNetAssocAlreadyExists,
+                    self.plugin_db.create_net_assocs, self.ctx, bgpvpn_id,
+                    [{'tenant_id': self._tenant_id,
+                      'network_id': net3['network']['id']},
+                     net_assocs[0]])
+                self.assertEqual(2, self.plugin_db.get_net_assocs_count(
+                    self.ctx, bgpvpn_id))
+
+            assoc_ids = [assoc['id'] for assoc in assocs]
+            self.assertRaises(BGPVPNNetAssocNotFound,
+                              self.plugin_db.delete_net_assocs, self.ctx,
+                              bgpvpn_id, assoc_ids + [_uuid()])
+            self.assertEqual(2, self.plugin_db.get_net_assocs_count(
+                self.ctx, bgpvpn_id))
+            deleted = self.plugin_db.delete_net_assocs(self.ctx, bgpvpn_id,
+                                                       assoc_ids)
+            self.assertEqual(sorted(assoc_ids),
+                             sorted(assoc['id'] for assoc in deleted))
+            self.assertEqual([], self.plugin_db.get_net_assocs(self.ctx,
+                                                               bgpvpn_id))
+
+    def test_db_net_assocs_diff(self):
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.network() as net3, \
+                self.bgpvpn() as bgpvpn:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            net1_id = net1['network']['id']
+            net2_id = net2['network']['id']
+            net3_id = net3['network']['id']
+            assocs = self.plugin_db.create_net_assocs(
+                self.ctx, bgpvpn_id,
+                [{'tenant_id': self._tenant_id, 'network_id': net_id}
+                 for net_id in (net1_id, net2_id)])
+
+            statements, (to_add, to_remove) = tools.sql_statements(
+                self.plugin_db.get_net_assocs_diff, self.ctx, bgpvpn_id,
+                [net2_id, net3_id])
+            self.assertEqual([net3_id], to_add)
+            self.assertEqual([assocs[0]['id']], to_remove)
+            self.assertEqual(2, len(statements))
+
+            to_add, to_remove = self.plugin_db.get_net_assocs_diff(
+                self.ctx, bgpvpn_id, [])
+            self.assertEqual([], to_add)
+            self.assertEqual(sorted(assoc['id'] for assoc in assocs),
+                             sorted(to_remove))
+
     def test_db_associate_disassociate_port(self):
         with self.port(tenant_id=self._tenant_id) as port, \
                 self.bgpvpn() as bgpvpn:
@@ -479,6 +1219,79 @@ class BgpvpnDBTestCase(test_plugin.BgpvpnTestCaseMixin):
             )
             self.assertEqual(0, len(res['port_association']['routes']))
 
+    def test_db_create_port_association_routes_batched(self):
+        routes = [{'type': 'prefix',
+                   'prefix': '10.%d.%d.0/24' % divmod(i, 256)}
+                  for i in range(1000)]
+        with self.port() as port, \
+                self.bgpvpn() as bgpvpn:
+            statements, assoc = tools.sql_statements(
+                self.plugin_db.create_port_assoc, self.ctx,
+                bgpvpn['bgpvpn']['id'],
+                {'tenant_id': self._tenant_id,
+                 'port_id': port['port']['id'],
+                 'advertise_fixed_ips': True,
+                 'routes': routes})
+            self.assertEqual(1000, len(assoc['routes']))
+            inserts = [statement for statement in statements
+                       if statement.startswith('INSERT')]
+            # one INSERT for the association, one for all its routes, the
+            # change-log INSERT of the revision bump of the BGPVPN and the
+            # change-log INSERT of the creation of the association
+            self.assertEqual(4, len(inserts))
+            self.assertEqual(2, len([statement for statement in inserts
+                                     if 'bgpvpn_changes' in statement]))
+
+    def test_db_update_port_association_routes_delta(self):
+        ROUTE_A = {'type': 'prefix',
+                   'prefix': '12.1.0.0/16'}
+        ROUTE_B = {'type': 'prefix',
+                   'prefix': '14.0.0.0/8',
+                   'local_pref': 200}
+        ROUTE_C = {'type': 'prefix',
+                   'prefix': '18.1.0.0/16'}
+
+        def route_ids(assoc_id):
+            return dict(
+                (route_db.prefix, route_db.id) for route_db in
+                self.ctx.session.query(bgpvpn_db.BGPVPNPortAssociationRoute)
+                .filter_by(port_association_id=assoc_id))
+
+        with self.network() as net, \
+                self.subnet(network={'network': net['network']}) as subnet, \
+                self.port(subnet={'subnet': subnet['subnet']}) as port, \
+                self.bgpvpn() as bgpvpn, \
+                self.assoc_port(bgpvpn['bgpvpn']['id'],
+                                port['port']['id'],
+                                routes=[ROUTE_A, ROUTE_B]) as port_assoc:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            assoc_id = port_assoc['port_association']['id']
+            ids_before = route_ids(assoc_id)
+
+            old_assoc, assoc, added, removed = (
+                self.plugin_db.update_port_assoc_with_diff(
+                    self.ctx, assoc_id, bgpvpn_id,
+                    {'routes': [ROUTE_B, ROUTE_C]}))
+            self.assertEqual(2, len(old_assoc['routes']))
+            self.assertEqual(['18.1.0.0/16'],
+                             [route['prefix'] for route in added])
+            self.assertEqual(['12.1.0.0/16'],
+                             [route['prefix'] for route in removed])
+            self.assertEqual(
+                sorted(['14.0.0.0/8', '18.1.0.0/16']),
+                sorted(route['prefix'] for route in assoc['routes']))
+            ids_after = route_ids(assoc_id)
+            # the row of the route kept is left untouched
+            self.assertEqual(ids_before['14.0.0.0/8'],
+                             ids_after['14.0.0.0/8'])
+            self.assertNotIn('12.1.0.0/16', ids_after)
+
+            # routes are left unchanged if not part of the update
+            assoc = self.plugin_db.update_port_assoc(
+                self.ctx, assoc_id, bgpvpn_id, {'advertise_fixed_ips': False})
+            self.assertEqual(ids_after, route_ids(assoc_id))
+            self.assertEqual(2, len(assoc['routes']))
+
 
 class BgpvpnDBTestCaseWithVNI(BgpvpnDBTestCase):
 
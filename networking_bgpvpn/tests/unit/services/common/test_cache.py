@@ -0,0 +1,82 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from neutron.tests import base
+
+from networking_bgpvpn.neutron.services.common import cache
+
+
+class TestBGPVPNCache(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestBGPVPNCache, self).setUp()
+        self.cache = cache.BGPVPNCache(max_size=2, ttl=10)
+
+    def _put(self, id, **kwargs):
+        self.cache.put(id, dict(id=id, **kwargs), self.cache.generation)
+
+    def test_get_returns_copies(self):
+        self._put('a', networks=['net1'])
+        self.cache.get('a')['networks'].append('net2')
+        self.assertEqual({'id': 'a', 'networks': ['net1']},
+                         self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual({'size': 1, 'hits': 2, 'misses': 1,
+                          'evictions': 0, 'invalidations': 0, 'stale': 0},
+                         self.cache.stats())
+
+    def test_lru_eviction(self):
+        self._put('a')
+        self._put('b')
+        self.cache.get('a')
+        self._put('c')
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertEqual(1, self.cache.stats()['evictions'])
+
+    @mock.patch.object(cache.timeutils, 'now')
+    def test_ttl(self, mock_now):
+        mock_now.return_value = 100
+        self._put('a')
+        mock_now.return_value = 105
+        self.assertIsNotNone(self.cache.get('a'))
+        mock_now.return_value = 111
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_invalidate(self):
+        self._put('a', networks=['net1'])
+        self._put('b', networks=['net2'])
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.invalidate_matching(
+            lambda bgpvpn: 'net2' in bgpvpn['networks'])
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(2, self.cache.stats()['invalidations'])
+
+    def test_put_racing_with_invalidation(self):
+        # a read started before an invalidation is not cached
+        generation = self.cache.generation
+        self.cache.invalidate('a')
+        self.cache.put('a', {'id': 'a'}, generation)
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_discard_stale(self):
+        self._put('a')
+        self.assertIsNotNone(self.cache.get('a'))
+        self.cache.discard_stale('a')
+        self.assertIsNone(self.cache.get('a'))
+        stats = self.cache.stats()
+        self.assertEqual((0, 2, 1), (stats['hits'], stats['misses'],
+                                     stats['stale']))
@@ -0,0 +1,66 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from neutron.tests import base
+
+from networking_bgpvpn.neutron.services.common import coalescing
+
+
+class TestPushCoalescer(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestPushCoalescer, self).setUp()
+        self.pushed = []
+        self.coalescer = coalescing.PushCoalescer(60, self.pushed.append)
+        self.addCleanup(self.coalescer.flush)
+
+    def test_coalesce_per_key(self):
+        for _i in range(3):
+            self.coalescer.request('a')
+        self.coalescer.request('b')
+        self.assertEqual([], self.pushed)
+        self.coalescer.flush()
+        self.assertEqual(['a', 'b'], sorted(self.pushed))
+        self.assertEqual({'scheduled': 0, 'requested': 4, 'coalesced': 2,
+                          'pushed': 2, 'failures': 0},
+                         self.coalescer.stats())
+
+        # requests made after a push schedule another one
+        self.coalescer.request('a')
+        self.assertEqual(1, self.coalescer.stats()['scheduled'])
+
+    def test_push_at_end_of_window(self):
+        pushed = threading.Event()
+        coalescer = coalescing.PushCoalescer(0.01,
+                                             lambda key: pushed.set())
+        coalescer.request('a')
+        coalescer.request('a')
+        self.assertTrue(pushed.wait(10))
+        self.assertEqual(2, coalescer.stats()['requested'])
+
+    def test_cancel(self):
+        self.coalescer.request('a')
+        self.coalescer.request('b')
+        self.coalescer.cancel('a')
+        self.coalescer.flush()
+        self.assertEqual(['b'], self.pushed)
+
+    def test_failure(self):
+        def fail(key):
+            raise Exception("backend unreachable")
+
+        coalescer = coalescing.PushCoalescer(60, fail)
+        coalescer.request('a')
+        coalescer.flush()
+        self.assertEqual(1, coalescer.stats()['failures'])
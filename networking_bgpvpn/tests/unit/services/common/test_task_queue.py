@@ -0,0 +1,90 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from neutron.tests import base
+
+from networking_bgpvpn.neutron.services.common import task_queue
+
+
+class TestOrderedTaskQueue(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestOrderedTaskQueue, self).setUp()
+        self.done = []
+        self.queue = task_queue.OrderedTaskQueue(
+            workers=3, max_size=100,
+            done_callback=lambda key, failed: self.done.append((key, failed)))
+        self.addCleanup(self.queue.stop)
+
+    def test_order_per_key(self):
+        runs = []
+        for index in range(20):
+            for key in ('a', 'b', 'c', 'd'):
+                self.queue.submit(
+                    key,
+                    lambda key=key, index=index: runs.append((key, index)))
+        self.queue.join()
+        for key in ('a', 'b', 'c', 'd'):
+            self.assertEqual(list(range(20)),
+                             [index for run_key, index in runs
+                              if run_key == key])
+        stats = self.queue.stats()
+        self.assertEqual((0, 80, 80, 0),
+                         (stats['depth'], stats['submitted'],
+                          stats['executed'], stats['failures']))
+
+    def test_done_callback(self):
+        def fail():
+            raise Exception("backend unreachable")
+
+        self.queue.submit('a', lambda: None)
+        self.queue.submit('b', fail)
+        self.queue.submit('b', lambda: None)
+        self.queue.join()
+        self.assertEqual([('a', False), ('b', True)], sorted(self.done))
+        self.assertEqual(1, self.queue.stats()['failures'])
+
+        # failures are only reported once
+        self.queue.submit('b', lambda: None)
+        self.queue.join()
+        self.assertEqual(('b', False), self.done[-1])
+
+    def test_pending_and_depth(self):
+        blocked = threading.Event()
+        self.queue.submit('a', blocked.wait)
+        self.queue.submit('a', lambda: None)
+        self.assertEqual(2, self.queue.pending('a'))
+        self.assertEqual(0, self.queue.pending('b'))
+        self.assertEqual(2, self.queue.stats()['depth'])
+        blocked.set()
+        self.queue.join()
+        self.assertEqual(0, self.queue.pending('a'))
+        self.assertEqual([('a', False)], self.done)
+
+    def test_workers_started_per_process(self):
+        # no worker is started before a task is submitted, so that the
+        # neutron-server workers, forked after the plugin is loaded, start
+        # their own
+        self.assertEqual([], self.queue._threads)
+        self.queue.submit('a', lambda: None)
+        self.queue.join()
+        threads = self.queue._threads
+        self.assertEqual(3, len(threads))
+
+        # a forked process starts its own workers
+        self.queue._pid = -1
+        self.queue.submit('a', lambda: None)
+        self.queue.join()
+        self.assertNotEqual(threads, self.queue._threads)
+        self.assertEqual([('a', False), ('a', False)], self.done)
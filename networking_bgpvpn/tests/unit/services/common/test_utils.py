@@ -16,6 +16,8 @@
 from neutron.tests import base
 
 from networking_bgpvpn.neutron.services.common.utils import filter_resource
+from networking_bgpvpn.neutron.services.common.utils import \
+    get_port_assoc_routes_differences
 
 
 class TestFilterResource(base.BaseTestCase):
@@ -59,3 +61,24 @@ class TestFilterResource(base.BaseTestCase):
             'fake_attribute': ['wrong_fake_value1', 'fake_value2'],
         }
         self.assertFalse(filter_resource(self._fake_resource_list, filters))
+
+
+class TestPortAssocRoutesDifferences(base.BaseTestCase):
+
+    def test_get_port_assoc_routes_differences(self):
+        route_a = {'type': 'prefix', 'prefix': '12.1.0.0/16',
+                   'local_pref': None}
+        route_b = {'type': 'prefix', 'prefix': '14.0.0.0/8',
+                   'local_pref': 200}
+        route_b_bis = {'type': 'prefix', 'prefix': '14.0.0.0/8',
+                       'local_pref': 100}
+        route_c = {'type': 'bgpvpn', 'bgpvpn_id': 'fake_bgpvpn_id'}
+
+        added, removed = get_port_assoc_routes_differences(
+            [route_a, route_b_bis, route_c], [route_a, route_b])
+        self.assertEqual([route_b_bis, route_c], added)
+        self.assertEqual([route_b], removed)
+
+        # a route without local_pref is the same as one with local_pref None
+        self.assertEqual(([], []), get_port_assoc_routes_differences(
+            [{'type': 'prefix', 'prefix': '12.1.0.0/16'}], [route_a]))
@@ -15,7 +15,9 @@
 #
 
 import mock
+import requests
 
+from neutron_lib import context
 
 from networking_bgpvpn.tests.unit.services import test_plugin
 
@@ -87,3 +89,74 @@ class TestOdlServiceDriver(TestBgpvpnOdlCommon):
                     mocked_sendjson.assert_called_once_with(mock.ANY,
                                                             mock.ANY,
                                                             formatted_bgpvpn)
+
+    def test_odl_associate_nets_coalesced(self):
+        mocked_sendjson = self.mocked_odlclient.sendjson
+        driver = self.bgpvpn_plugin.driver
+        ctx = context.get_admin_context()
+
+        def flush():
+            if driver.push_coalescer is not None:
+                driver.push_coalescer.flush()
+
+        def associate_and_dissociate(bgpvpn_id, net_ids):
+            assocs = [
+                self.bgpvpn_plugin.create_bgpvpn_network_association(
+                    ctx, bgpvpn_id,
+                    {'network_association': {'tenant_id': self._tenant_id,
+                                             'network_id': net_id}})
+                for net_id in net_ids]
+            flush()
+            associated = mocked_sendjson.call_args[0][2]['bgpvpn']['networks']
+            for assoc in assocs:
+                self.bgpvpn_plugin.delete_bgpvpn_network_association(
+                    ctx, assoc['id'], bgpvpn_id)
+            flush()
+            return associated
+
+        with self.network() as net1, self.network() as net2, \
+                self.network() as net3, self.bgpvpn() as bgpvpn:
+            id = bgpvpn['bgpvpn']['id']
+            net_ids = [net['network']['id'] for net in (net1, net2, net3)]
+
+            # without coalescing, the whole BGPVPN is PUT on each change
+            mocked_sendjson.reset_mock()
+            self.assertEqual(sorted(net_ids),
+                             sorted(associate_and_dissociate(id, net_ids)))
+            self.assertEqual(6, mocked_sendjson.call_count)
+
+            # with coalescing, the dissociations are PUT once, with the
+            # resulting state; the associations are still PUT by their
+            # requests, which delete them if the PUT fails
+            driver.enable_push_coalescing(window=60)
+            self.addCleanup(setattr, driver, 'push_coalescer', None)
+            mocked_sendjson.reset_mock()
+            self.assertEqual(sorted(net_ids),
+                             sorted(associate_and_dissociate(id, net_ids)))
+            self.assertEqual(4, mocked_sendjson.call_count)
+            self.assertEqual([], mocked_sendjson.call_args[0][2]['bgpvpn'][
+                'networks'])
+            stats = self.bgpvpn_plugin.get_bgpvpn_push_coalescing_stats()
+            self.assertEqual({'scheduled': 0, 'requested': 3,
+                              'coalesced': 2, 'pushed': 1, 'failures': 0},
+                             stats)
+
+    def test_odl_associate_net_coalesced_push_fails(self):
+        driver = self.bgpvpn_plugin.driver
+        driver.enable_push_coalescing(window=60)
+        self.addCleanup(setattr, driver, 'push_coalescer', None)
+        ctx = context.get_admin_context()
+        with self.network() as net, self.bgpvpn() as bgpvpn:
+            id = bgpvpn['bgpvpn']['id']
+            self.mocked_odlclient.sendjson.side_effect = (
+                requests.exceptions.ConnectionError())
+            self.assertRaises(
+                requests.exceptions.ConnectionError,
+                self.bgpvpn_plugin.create_bgpvpn_network_association,
+                ctx, id,
+                {'network_association': {'tenant_id': self._tenant_id,
+                                         'network_id': net['network']['id']}})
+            self.mocked_odlclient.sendjson.side_effect = None
+            # the association is rolled back
+            self.assertEqual(
+                [], self.bgpvpn_plugin.get_bgpvpn(ctx, id)['networks'])
@@ -16,11 +16,13 @@
 import contextlib
 import copy
 import mock
+import threading
 import webob.exc
 
 from neutron_lib.plugins import directory
 from oslo_utils import uuidutils
 
+from neutron.api import api_common
 from neutron.api import extensions as api_extensions
 from neutron.db import servicetype_db as sdb
 from neutron import extensions as n_extensions
@@ -29,6 +31,8 @@ from neutron.tests.unit.extensions import test_l3
 from neutron.tests.unit.extensions.test_l3 import TestL3NatServicePlugin
 from neutron_lib.api.definitions import bgpvpn as bgpvpn_def
 from neutron_lib.api.definitions import bgpvpn_vni as bgpvpn_vni_def
+from neutron_lib import constants as const
+from neutron_lib import context
 
 from networking_bgpvpn.neutron.db import bgpvpn_db
 from networking_bgpvpn.neutron import extensions
@@ -439,6 +443,41 @@ class TestBGPVPNServicePlugin(BgpvpnTestCaseMixin):
                 router['router'],
                 bgpvpn['bgpvpn'])
 
+    def test_router_assoc_router_with_several_networks(self):
+        # only the last network of the router is associated to a BGPVPN
+        with self.network() as net1, \
+                self.network() as net2, \
+                self.subnet(network=net1, cidr='10.0.1.0/24') as subnet1, \
+                self.subnet(network=net2, cidr='10.0.2.0/24') as subnet2, \
+                self.bgpvpn() as bgpvpn1, \
+                self.bgpvpn() as bgpvpn2, \
+                self.router(tenant_id=self._tenant_id) as router, \
+                self.assoc_net(bgpvpn1['bgpvpn']['id'],
+                               net2['network']['id']):
+            for subnet in (subnet1, subnet2):
+                req = self.new_update_request(
+                    'routers',
+                    data={'subnet_id': subnet['subnet']['id']},
+                    fmt=self.fmt,
+                    id=router['router']['id'],
+                    subresource='add_router_interface')
+                res = req.get_response(self.ext_api)
+                if res.status_int >= 400:
+                    raise http_client_error(req, res)
+
+            data = {'router_association': {
+                'router_id': router['router']['id'],
+                'tenant_id': self._tenant_id}}
+            req = self.new_create_request(
+                'bgpvpn/bgpvpns',
+                data=data,
+                fmt=self.fmt,
+                id=bgpvpn2['bgpvpn']['id'],
+                subresource='router_associations')
+            res = req.get_response(self.ext_api)
+            self.assertEqual(res.status_int, webob.exc.HTTPBadRequest.code)
+            self.assertIn(bgpvpn1['bgpvpn']['id'], res.body.decode('utf-8'))
+
     def _test_router_net_combination_validation(self, network, router, bgpvpn):
         net_id = network['id']
         bgpvpn_id = bgpvpn['id']
@@ -652,6 +691,75 @@ class TestBGPVPNServicePlugin(BgpvpnTestCaseMixin):
             self.assertIn("bgpvpn specified in route does not belong to "
                           "the tenant", str(res.body))
 
+    def test_bgpvpn_port_assoc_create_bgpvpn_routes_invalid(self):
+        with self.network() as net, \
+                self.subnet(network={'network': net['network']}) as subnet, \
+                self.port(subnet={'subnet': subnet['subnet']}) as port, \
+                self.bgpvpn() as bgpvpn, \
+                self.bgpvpn() as bgpvpn_ok, \
+                self.bgpvpn(tenant_id="notus") as bgpvpn_other:
+
+            data = {'port_association': {
+                    'port_id': port['port']['id'],
+                    'tenant_id': self._tenant_id,
+                    'routes': [{'type': 'bgpvpn', 'bgpvpn_id': bgpvpn_id}
+                               for bgpvpn_id in (
+                                   bgpvpn_ok['bgpvpn']['id'],
+                                   _uuid(),
+                                   bgpvpn_other['bgpvpn']['id'])]
+                    }}
+
+            bgpvpn_port_req = self.new_create_request(
+                'bgpvpn/bgpvpns',
+                data=data,
+                fmt=self.fmt,
+                id=bgpvpn['bgpvpn']['id'],
+                subresource='port_associations')
+            driver = self.bgpvpn_plugin.driver
+            with mock.patch.object(driver, 'get_bgpvpns',
+                                   wraps=driver.get_bgpvpns) as get_bgpvpns:
+                res = bgpvpn_port_req.get_response(self.ext_api)
+            self.assertEqual(res.status_int, webob.exc.HTTPBadRequest.code)
+            # both invalid routes are reported
+            self.assertIn("bgpvpn specified in route does not exist",
+                          str(res.body))
+            self.assertIn("bgpvpn specified in route does not belong to "
+                          "the tenant", str(res.body))
+            # the BGPVPNs of the routes are loaded at once
+            self.assertEqual(1, get_bgpvpns.call_count)
+
+    def test_bgpvpn_port_assoc_bulk_create_bgpvpn_routes(self):
+        with self.network() as net, \
+                self.subnet(network={'network': net['network']}) as subnet, \
+                self.port(subnet={'subnet': subnet['subnet']}) as port1, \
+                self.port(subnet={'subnet': subnet['subnet']}) as port2, \
+                self.bgpvpn() as bgpvpn, \
+                self.bgpvpn() as bgpvpn_ok1, \
+                self.bgpvpn() as bgpvpn_ok2:
+
+            data = {'port_associations': [{
+                    'port_id': port['port']['id'],
+                    'tenant_id': self._tenant_id,
+                    'routes': [{'type': 'bgpvpn',
+                                'bgpvpn_id': route_bgpvpn['bgpvpn']['id']}]
+                    } for port, route_bgpvpn in ((port1, bgpvpn_ok1),
+                                                 (port2, bgpvpn_ok2))]}
+
+            bgpvpn_port_req = self.new_create_request(
+                'bgpvpn/bgpvpns',
+                data=data,
+                fmt=self.fmt,
+                id=bgpvpn['bgpvpn']['id'],
+                subresource='port_associations')
+            driver = self.bgpvpn_plugin.driver
+            with mock.patch.object(driver, 'get_bgpvpns',
+                                   wraps=driver.get_bgpvpns) as get_bgpvpns:
+                res = bgpvpn_port_req.get_response(self.ext_api)
+            self.assertEqual(webob.exc.HTTPCreated.code, res.status_int)
+            # the BGPVPNs of the routes of all the associations are loaded
+            # at once
+            self.assertEqual(1, get_bgpvpns.call_count)
+
     def test_associate_empty_port(self):
         with self.bgpvpn() as bgpvpn:
             id = bgpvpn['bgpvpn']['id']
@@ -837,6 +945,50 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
             list = self._list('bgpvpn/bgpvpns', fmt='json')
             self.assertEqual([], list['bgpvpns'])
 
+    def _bulk_bgpvpn_data(self, *names):
+        return {'bgpvpns': [dict(self.bgpvpn_data['bgpvpn'], name=name)
+                            for name in names]}
+
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'create_bgpvpn_postcommit')
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'create_bgpvpns_postcommit')
+    def test_create_bgpvpn_bulk(self, mock_bulk_postcommit,
+                                mock_create_postcommit):
+        bgpvpn_req = self.new_create_request(
+            'bgpvpn/bgpvpns', self._bulk_bgpvpn_data('bgpvpn1', 'bgpvpn2'))
+        res = bgpvpn_req.get_response(self.ext_api)
+        self.assertEqual(webob.exc.HTTPCreated.code, res.status_int)
+        bgpvpns = self.deserialize(self.fmt, res)['bgpvpns']
+        self.assertEqual(['bgpvpn1', 'bgpvpn2'],
+                         [bgpvpn['name'] for bgpvpn in bgpvpns])
+
+        # the driver is given the whole batch at once
+        mock_bulk_postcommit.assert_called_once_with(mock.ANY, mock.ANY)
+        self.assertEqual(
+            sorted(bgpvpn['id'] for bgpvpn in bgpvpns),
+            sorted(bgpvpn['id']
+                   for bgpvpn in mock_bulk_postcommit.call_args[0][1]))
+        self.assertFalse(mock_create_postcommit.called)
+
+        for bgpvpn in bgpvpns:
+            self._delete('bgpvpn/bgpvpns', bgpvpn['id'])
+
+    def test_create_bgpvpn_bulk_precommit_fails(self):
+        with mock.patch.object(driver_api.BGPVPNDriver,
+                               'create_bgpvpn_precommit',
+                               new=self._raise_bgpvpn_driver_precommit_exc):
+            bgpvpn_req = self.new_create_request(
+                'bgpvpn/bgpvpns', self._bulk_bgpvpn_data('bgpvpn1',
+                                                         'bgpvpn2'))
+            res = bgpvpn_req.get_response(self.ext_api)
+            self.assertEqual(webob.exc.HTTPError.code,
+                             res.status_int)
+
+            # Assert that none of the bgpvpns has been created
+            list = self._list('bgpvpn/bgpvpns', fmt='json')
+            self.assertEqual([], list['bgpvpns'])
+
     def test_delete_bgpvpn_precommit_fails(self):
         with self.bgpvpn(do_delete=False) as bgpvpn, \
                 mock.patch.object(bgpvpn_db.BGPVPNPluginDb,
@@ -896,14 +1048,37 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
                     self.assertIn('routers', res['bgpvpn'])
                     self.assertEqual(router_id, res['bgpvpn']['routers'][0])
 
+    def test_list_bgpvpns_native_pagination(self):
+        self.assertTrue(api_common.is_native_pagination_supported(
+            self.bgpvpn_plugin))
+        self.assertTrue(api_common.is_native_sorting_supported(
+            self.bgpvpn_plugin))
+        with self.bgpvpn(name='bgpvpn1') as bgpvpn1, \
+                self.bgpvpn(name='bgpvpn2') as bgpvpn2, \
+                self.bgpvpn(name='bgpvpn3') as bgpvpn3, \
+                mock.patch.object(bgpvpn_db.BGPVPNPluginDb, 'get_bgpvpns',
+                                  wraps=self.bgpvpn_plugin.driver.bgpvpn_db.
+                                  get_bgpvpns) as mock_get_db:
+            query = 'limit=2&sort_key=name&sort_dir=desc'
+            res = self._list('bgpvpn/bgpvpns', query_params=query)
+            self.assertEqual([bgpvpn3['bgpvpn']['id'],
+                              bgpvpn2['bgpvpn']['id']],
+                             [bgpvpn['id'] for bgpvpn in res['bgpvpns']])
+            # the page is built by the DB query, not by the API layer
+            mock_get_db.assert_called_once_with(
+                mock.ANY, mock.ANY, mock.ANY,
+                sorts=mock.ANY, limit=2, marker=None, page_reverse=False)
+
+            query += '&marker=%s' % bgpvpn2['bgpvpn']['id']
+            res = self._list('bgpvpn/bgpvpns', query_params=query)
+            self.assertEqual([bgpvpn1['bgpvpn']['id']],
+                             [bgpvpn['id'] for bgpvpn in res['bgpvpns']])
+
     @mock.patch.object(driver_api.BGPVPNDriver,
                        'update_bgpvpn_postcommit')
     @mock.patch.object(driver_api.BGPVPNDriver,
                        'update_bgpvpn_precommit')
-    @mock.patch.object(bgpvpn_db.BGPVPNPluginDb,
-                       'update_bgpvpn')
-    def test_update_bgpvpn(self, mock_update_db,
-                           mock_update_precommit,
+    def test_update_bgpvpn(self, mock_update_precommit,
                            mock_update_postcommit):
         with self.bgpvpn() as bgpvpn:
             old_bgpvpn = copy.copy(self.bgpvpn_data['bgpvpn'])
@@ -913,24 +1088,53 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
             old_bgpvpn['ports'] = []
             old_bgpvpn['project_id'] = old_bgpvpn['tenant_id']
             old_bgpvpn['local_pref'] = None
+            old_bgpvpn['revision_number'] = 0
             new_bgpvpn = copy.copy(old_bgpvpn)
-            update = {'name': 'foo'}
-            new_bgpvpn.update(update)
-
-            mock_update_db.return_value = new_bgpvpn
+            new_bgpvpn.update({'name': 'foo', 'revision_number': 1})
 
-            data = {"bgpvpn": {"name": new_bgpvpn['name']}}
+            # the route targets are not changed, only the name is
+            data = {"bgpvpn": {"name": new_bgpvpn['name'],
+                               "route_targets": old_bgpvpn['route_targets']}}
             self._update('bgpvpn/bgpvpns',
                          bgpvpn['bgpvpn']['id'],
                          data)
 
-            mock_update_db.assert_called_once_with(
-                mock.ANY, bgpvpn['bgpvpn']['id'], data['bgpvpn'])
             mock_update_precommit.assert_called_once_with(
                 mock.ANY, old_bgpvpn, new_bgpvpn)
             mock_update_postcommit.assert_called_once_with(
                 mock.ANY, old_bgpvpn, new_bgpvpn)
 
+            # an update not changing anything is not given to the driver
+            mock_update_precommit.reset_mock()
+            mock_update_postcommit.reset_mock()
+            self._update('bgpvpn/bgpvpns',
+                         bgpvpn['bgpvpn']['id'],
+                         data)
+            self.assertFalse(mock_update_precommit.called)
+            self.assertFalse(mock_update_postcommit.called)
+
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'update_bgpvpn_postcommit')
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'update_bgpvpn_precommit')
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'update_bgpvpn_changed_fields', True)
+    def test_update_bgpvpn_changed_fields(self, mock_update_precommit,
+                                          mock_update_postcommit):
+        with self.bgpvpn() as bgpvpn:
+            data = {"bgpvpn": {"name": "foo",
+                               "route_targets": bgpvpn['bgpvpn'][
+                                   'route_targets']}}
+            self._update('bgpvpn/bgpvpns',
+                         bgpvpn['bgpvpn']['id'],
+                         data)
+
+            # drivers asking for them are given the changed fields
+            mock_update_precommit.assert_called_once_with(
+                mock.ANY, mock.ANY, mock.ANY, changed_fields=set(['name']))
+            mock_update_postcommit.assert_called_once_with(
+                mock.ANY, mock.ANY, mock.ANY, changed_fields=set(['name']))
+
     def test_update_bgpvpn_precommit_fails(self):
         with self.bgpvpn() as bgpvpn, \
                 mock.patch.object(driver_api.BGPVPNDriver,
@@ -1002,6 +1206,336 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
                                     bgpvpn['bgpvpn']['id'])
             self.assertEqual([], bgpvpn_new['bgpvpn']['networks'])
 
+    def _bulk_net_assoc_request(self, bgpvpn_id, net_ids):
+        data = {'network_associations': [{'network_id': net_id,
+                                          'tenant_id': self._tenant_id}
+                                         for net_id in net_ids]}
+        return self.new_create_request('bgpvpn/bgpvpns',
+                                       data=data,
+                                       fmt=self.fmt,
+                                       id=bgpvpn_id,
+                                       subresource='network_associations')
+
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'delete_net_assocs_postcommit')
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'create_net_assoc_postcommit')
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'create_net_assocs_postcommit')
+    def test_create_delete_bgpvpn_net_assoc_bulk(self, mock_bulk_postcommit,
+                                                 mock_postcommit,
+                                                 mock_delete_postcommit):
+        with self.bgpvpn() as bgpvpn, \
+                self.network() as net1, \
+                self.network() as net2:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            net_ids = [net1['network']['id'], net2['network']['id']]
+            res = self._bulk_net_assoc_request(
+                bgpvpn_id, net_ids).get_response(self.ext_api)
+            self.assertEqual(webob.exc.HTTPCreated.code, res.status_int)
+            assocs = self.deserialize(self.fmt, res)['network_associations']
+            self.assertEqual(net_ids,
+                             [assoc['network_id'] for assoc in assocs])
+
+            # the driver is notified once for the whole batch
+            self.assertFalse(mock_postcommit.called)
+            mock_bulk_postcommit.assert_called_once_with(mock.ANY, mock.ANY)
+            self.assertEqual(
+                net_ids, [assoc['network_id'] for assoc in
+                          mock_bulk_postcommit.call_args[0][1]])
+            self.assertEqual(
+                sorted(net_ids),
+                sorted(self._show('bgpvpn/bgpvpns',
+                                  bgpvpn_id)['bgpvpn']['networks']))
+
+            self.bgpvpn_plugin.delete_bgpvpn_network_associations(
+                context.get_admin_context(), bgpvpn_id,
+                [assoc['id'] for assoc in assocs])
+            mock_delete_postcommit.assert_called_once_with(mock.ANY,
+                                                           mock.ANY)
+            self.assertEqual(2, len(mock_delete_postcommit.call_args[0][1]))
+            self.assertEqual(
+                [], self._show('bgpvpn/bgpvpns',
+                               bgpvpn_id)['bgpvpn']['networks'])
+
+    def test_create_bgpvpn_net_assoc_bulk_unknown_network(self):
+        with self.bgpvpn() as bgpvpn, \
+                self.network() as net:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            res = self._bulk_net_assoc_request(
+                bgpvpn_id,
+                [net['network']['id'], _uuid()]).get_response(self.ext_api)
+            self.assertEqual(webob.exc.HTTPNotFound.code, res.status_int)
+            # none of the associations is created
+            self.assertEqual(
+                [], self._show('bgpvpn/bgpvpns',
+                               bgpvpn_id)['bgpvpn']['networks'])
+
+    def _replace_assocs(self, bgpvpn_id, action, body):
+        req = self.new_action_request('bgpvpn/bgpvpns', body, bgpvpn_id,
+                                      action)
+        return req.get_response(self.ext_api)
+
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'delete_net_assocs_postcommit')
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'create_net_assocs_postcommit')
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'replace_net_assocs_postcommit')
+    def test_replace_bgpvpn_net_assocs(self, mock_replace_postcommit,
+                                       mock_create_postcommit,
+                                       mock_delete_postcommit):
+        with self.bgpvpn() as bgpvpn, \
+                self.network() as net1, \
+                self.network() as net2:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            net1_id = net1['network']['id']
+            net2_id = net2['network']['id']
+            with self.assoc_net(bgpvpn_id, net_id=net1_id,
+                                do_disassociate=False):
+                pass
+            res = self._replace_assocs(bgpvpn_id,
+                                       'replace_network_associations',
+                                       {'network_ids': [net2_id]})
+            self.assertEqual(webob.exc.HTTPOk.code, res.status_int)
+            assocs = self.deserialize(self.fmt, res)['network_associations']
+            self.assertEqual([net2_id],
+                             [assoc['network_id'] for assoc in assocs])
+
+            # the driver is notified once with what was added and removed
+            mock_replace_postcommit.assert_called_once_with(mock.ANY,
+                                                            mock.ANY,
+                                                            mock.ANY)
+            added, removed = mock_replace_postcommit.call_args[0][1:]
+            self.assertEqual([net2_id],
+                             [assoc['network_id'] for assoc in added])
+            self.assertEqual([net1_id],
+                             [assoc['network_id'] for assoc in removed])
+            self.assertFalse(mock_create_postcommit.called)
+            self.assertFalse(mock_delete_postcommit.called)
+
+            # nothing to change, nothing notified
+            mock_replace_postcommit.reset_mock()
+            self._replace_assocs(bgpvpn_id, 'replace_network_associations',
+                                 {'network_ids': [net2_id]})
+            self.assertFalse(mock_replace_postcommit.called)
+
+            self._replace_assocs(bgpvpn_id, 'replace_network_associations',
+                                 {'network_ids': []})
+            self.assertEqual(
+                [], self._show('bgpvpn/bgpvpns',
+                               bgpvpn_id)['bgpvpn']['networks'])
+
+    def test_replace_bgpvpn_net_assocs_unknown_network(self):
+        with self.bgpvpn() as bgpvpn, \
+                self.network() as net:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            net_id = net['network']['id']
+            with self.assoc_net(bgpvpn_id, net_id=net_id,
+                                do_disassociate=False):
+                pass
+            res = self._replace_assocs(bgpvpn_id,
+                                       'replace_network_associations',
+                                       {'network_ids': [_uuid()]})
+            self.assertEqual(webob.exc.HTTPNotFound.code, res.status_int)
+            # the existing association is not deleted
+            self.assertEqual(
+                [net_id], self._show('bgpvpn/bgpvpns',
+                                     bgpvpn_id)['bgpvpn']['networks'])
+
+    def test_replace_bgpvpn_net_assocs_bad_body(self):
+        with self.bgpvpn() as bgpvpn:
+            res = self._replace_assocs(bgpvpn['bgpvpn']['id'],
+                                       'replace_network_associations',
+                                       {'network_ids': 'foo'})
+            self.assertEqual(webob.exc.HTTPBadRequest.code, res.status_int)
+
+    @mock.patch.object(driver_api.BGPVPNDriver,
+                       'replace_router_assocs_postcommit')
+    def test_replace_bgpvpn_router_assocs(self, mock_replace_postcommit):
+        with self.bgpvpn() as bgpvpn, \
+                self.router(tenant_id=self._tenant_id) as router:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            router_id = router['router']['id']
+            res = self._replace_assocs(bgpvpn_id,
+                                       'replace_router_associations',
+                                       {'router_ids': [router_id]})
+            self.assertEqual(webob.exc.HTTPOk.code, res.status_int)
+            assocs = self.deserialize(self.fmt, res)['router_associations']
+            self.assertEqual([router_id],
+                             [assoc['router_id'] for assoc in assocs])
+            added, removed = mock_replace_postcommit.call_args[0][1:]
+            self.assertEqual([router_id],
+                             [assoc['router_id'] for assoc in added])
+            self.assertEqual([], removed)
+
+            self._replace_assocs(bgpvpn_id, 'replace_router_associations',
+                                 {'router_ids': []})
+            self.assertEqual(
+                [], self._show('bgpvpn/bgpvpns',
+                               bgpvpn_id)['bgpvpn']['routers'])
+
+    def test_get_bgpvpn_cache(self):
+        driver = self.bgpvpn_plugin.driver
+        driver.enable_bgpvpn_cache(max_size=10)
+        self.addCleanup(setattr, driver, 'bgpvpn_cache', None)
+        ctx = context.get_admin_context()
+        with self.bgpvpn() as bgpvpn, self.network() as net:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            net_id = net['network']['id']
+            self.bgpvpn_plugin.get_bgpvpn(ctx, bgpvpn_id)
+            with mock.patch.object(bgpvpn_db.BGPVPNPluginDb,
+                                   'get_bgpvpn') as mock_get_db:
+                self.assertEqual(
+                    {'name': bgpvpn['bgpvpn']['name']},
+                    self.bgpvpn_plugin.get_bgpvpn(ctx, bgpvpn_id,
+                                                  fields=['name']))
+                self.assertFalse(mock_get_db.called)
+            stats = self.bgpvpn_plugin.get_bgpvpn_cache_stats()
+            self.assertEqual((1, 1), (stats['hits'], stats['misses']))
+
+            # the write paths invalidate the cached BGPVPN
+            self._update('bgpvpn/bgpvpns', bgpvpn_id,
+                         {'bgpvpn': {'name': 'foo'}})
+            self.assertEqual(
+                'foo', self.bgpvpn_plugin.get_bgpvpn(ctx, bgpvpn_id)['name'])
+            with self.assoc_net(bgpvpn_id, net_id=net_id,
+                                do_disassociate=False):
+                pass
+            self.assertEqual(
+                [net_id],
+                self.bgpvpn_plugin.get_bgpvpn(ctx, bgpvpn_id)['networks'])
+
+            # and so does the deletion of an associated network
+            self._delete('networks', net_id)
+            self.assertEqual(
+                [], self.bgpvpn_plugin.get_bgpvpn(ctx, bgpvpn_id)['networks'])
+
+    def test_get_bgpvpn_cache_other_worker_changes(self):
+        # two drivers with their own cache, sharing the database, as in two
+        # neutron-server workers
+        worker1 = driver_api.BGPVPNDriverRC(self.bgpvpn_plugin)
+        worker1.enable_bgpvpn_cache(max_size=10)
+        worker2 = driver_api.BGPVPNDriverRC(self.bgpvpn_plugin)
+        worker2.enable_bgpvpn_cache(max_size=10)
+        self.addCleanup(setattr, worker1, 'bgpvpn_cache', None)
+        self.addCleanup(setattr, worker2, 'bgpvpn_cache', None)
+        ctx = context.get_admin_context()
+        with self.bgpvpn() as bgpvpn, self.network() as net:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            net_id = net['network']['id']
+            worker1.get_bgpvpn(ctx, bgpvpn_id)
+            worker1.get_bgpvpn(ctx, bgpvpn_id)
+            self.assertEqual(1, worker1.bgpvpn_cache_stats()['hits'])
+
+            worker2.update_bgpvpn(ctx, bgpvpn_id, {'name': 'foo'})
+            self.assertEqual('foo', worker1.get_bgpvpn(ctx, bgpvpn_id)['name'])
+            worker2.create_net_assoc(ctx, bgpvpn_id,
+                                     {'tenant_id': self._tenant_id,
+                                      'network_id': net_id})
+            self.assertEqual([net_id],
+                             worker1.get_bgpvpn(ctx, bgpvpn_id)['networks'])
+            stats = worker1.bgpvpn_cache_stats()
+            self.assertEqual((1, 3, 2), (stats['hits'], stats['misses'],
+                                         stats['stale']))
+
+            # without the revision number check, the cached BGPVPN is
+            # served until it expires
+            worker1.enable_bgpvpn_cache(max_size=10,
+                                        check_revision_number=False)
+            worker1.get_bgpvpn(ctx, bgpvpn_id)
+            worker2.update_bgpvpn(ctx, bgpvpn_id, {'name': 'bar'})
+            self.assertEqual('foo', worker1.get_bgpvpn(ctx, bgpvpn_id)['name'])
+
+    def test_async_postcommit(self):
+        driver = self.bgpvpn_plugin.driver
+        driver.enable_async_postcommit(workers=2, max_queue_size=10)
+        self.addCleanup(setattr, driver, 'status_support', False)
+        self.addCleanup(setattr, driver, 'postcommit_queue', None)
+        self.addCleanup(driver.postcommit_queue.stop)
+        ctx = context.get_admin_context()
+        pushed = threading.Event()
+        with mock.patch.object(driver, 'create_bgpvpn_postcommit',
+                               side_effect=lambda *args: pushed.wait()):
+            bgpvpn = self.bgpvpn_plugin.create_bgpvpn(
+                ctx, {'bgpvpn': {'tenant_id': self._tenant_id,
+                                 'name': 'async', 'type': 'l3',
+                                 'route_targets': ['64512:1'],
+                                 'import_targets': [],
+                                 'export_targets': []}})
+            # the request returns before the creation is pushed
+            self.assertEqual(const.PENDING_CREATE, bgpvpn['status'])
+            self.assertEqual(
+                1, self.bgpvpn_plugin.get_bgpvpn_postcommit_stats()['depth'])
+            pushed.set()
+            driver.postcommit_queue.join()
+        self.assertEqual(
+            const.ACTIVE,
+            self.bgpvpn_plugin.get_bgpvpn(ctx, bgpvpn['id'])['status'])
+
+        with mock.patch.object(driver, 'update_bgpvpn_postcommit',
+                               side_effect=Exception("backend error")):
+            bgpvpn = self.bgpvpn_plugin.update_bgpvpn(
+                ctx, bgpvpn['id'], {'bgpvpn': {'name': 'foo'}})
+            self.assertEqual(const.PENDING_UPDATE, bgpvpn['status'])
+            driver.postcommit_queue.join()
+        self.assertEqual(
+            const.ERROR,
+            self.bgpvpn_plugin.get_bgpvpn(ctx, bgpvpn['id'])['status'])
+
+        stats = self.bgpvpn_plugin.get_bgpvpn_postcommit_stats()
+        self.assertEqual((0, 2, 2, 1),
+                         (stats['depth'], stats['submitted'],
+                          stats['executed'], stats['failures']))
+        self.bgpvpn_plugin.delete_bgpvpn(ctx, bgpvpn['id'])
+        driver.postcommit_queue.join()
+
+    def test_journal(self):
+        driver = self.bgpvpn_plugin.driver
+        ctx = context.get_admin_context()
+        synced = []
+        all_synced = threading.Event()
+        failures = [Exception("backend unreachable")]
+
+        def sync_entry(context, entry):
+            if entry['operation'] == 'delete' and failures:
+                raise failures.pop()
+            synced.append((entry['resource_type'], entry['operation']))
+            if len(synced) == 3:
+                all_synced.set()
+
+        with mock.patch.object(driver, 'sync_entry', new=sync_entry), \
+                mock.patch.object(driver, 'create_bgpvpn_postcommit') as \
+                mock_postcommit, \
+                self.network() as net:
+            driver.enable_journal(sync_workers=2, max_retries=5,
+                                  retry_interval=0, max_retry_interval=0,
+                                  sync_interval=1, processing_timeout=60)
+            self.addCleanup(setattr, driver, 'journal_worker', None)
+            self.addCleanup(driver.journal_worker.stop)
+            bgpvpn = self.bgpvpn_plugin.create_bgpvpn(
+                ctx, {'bgpvpn': {'tenant_id': self._tenant_id,
+                                 'name': 'journal', 'type': 'l3',
+                                 'route_targets': ['64512:1'],
+                                 'import_targets': [],
+                                 'export_targets': []}})
+            assoc = self.bgpvpn_plugin.create_bgpvpn_network_association(
+                ctx, bgpvpn['id'],
+                {'network_association': {'tenant_id': self._tenant_id,
+                                         'network_id': net['network']['id']}})
+            self.bgpvpn_plugin.delete_bgpvpn_network_association(
+                ctx, assoc['id'], bgpvpn['id'])
+
+            # synced in order, the failed sync being retried
+            self.assertTrue(all_synced.wait(10))
+            driver.journal_worker.stop()
+            self.assertEqual([('bgpvpn', 'create'),
+                              ('network_association', 'create'),
+                              ('network_association', 'delete')], synced)
+            self.assertFalse(mock_postcommit.called)
+            self.assertEqual({'pending': 0, 'processing': 0, 'failed': 0},
+                             self.bgpvpn_plugin.get_bgpvpn_journal_stats())
+
     @mock.patch.object(bgpvpn_db.BGPVPNPluginDb, 'get_net_assoc')
     def test_get_bgpvpn_net_assoc(self, mock_get_db):
         with self.bgpvpn() as bgpvpn:
@@ -1030,7 +1564,11 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
                     self._list(res)
                     mock_get_db.assert_called_once_with(mock.ANY,
                                                         bgpvpn_id,
-                                                        mock.ANY, mock.ANY)
+                                                        mock.ANY, mock.ANY,
+                                                        sorts=mock.ANY,
+                                                        limit=mock.ANY,
+                                                        marker=mock.ANY,
+                                                        page_reverse=mock.ANY)
 
     @mock.patch.object(driver_api.BGPVPNDriver,
                        'delete_net_assoc_precommit')
@@ -1052,6 +1590,8 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
                     # Assert that existing bgpvpn and net-assoc remains
                     list = self._list('bgpvpn/bgpvpns', fmt='json')
                     bgpvpn['bgpvpn']['networks'] = [net_assoc['network_id']]
+                    # the association bumped the revision number of the BGPVPN
+                    bgpvpn['bgpvpn']['revision_number'] = 1
                     self.assertEqual([bgpvpn['bgpvpn']], list['bgpvpns'])
 
     @mock.patch.object(driver_api.BGPVPNDriver,
@@ -1159,7 +1699,11 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
                     self._list(res)
                     mock_get_db.assert_called_once_with(mock.ANY,
                                                         bgpvpn_id,
-                                                        mock.ANY, mock.ANY)
+                                                        mock.ANY, mock.ANY,
+                                                        sorts=mock.ANY,
+                                                        limit=mock.ANY,
+                                                        marker=mock.ANY,
+                                                        page_reverse=mock.ANY)
 
     @mock.patch.object(driver_api.BGPVPNDriver,
                        'delete_router_assoc_precommit')
@@ -1181,6 +1725,8 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
                     # Assert that existing bgpvpn and router-assoc remains
                     list = self._list('bgpvpn/bgpvpns', fmt='json')
                     bgpvpn['bgpvpn']['routers'] = [router_assoc['router_id']]
+                    # the association bumped the revision number of the BGPVPN
+                    bgpvpn['bgpvpn']['revision_number'] = 1
                     self.assertEqual([bgpvpn['bgpvpn']], list['bgpvpns'])
 
     @mock.patch.object(driver_api.BGPVPNDriver,
@@ -1295,7 +1841,11 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
             self._list(res)
             mock_get_db.assert_called_once_with(mock.ANY,
                                                 bgpvpn_id,
-                                                mock.ANY, mock.ANY)
+                                                mock.ANY, mock.ANY,
+                                                sorts=mock.ANY,
+                                                limit=mock.ANY,
+                                                marker=mock.ANY,
+                                                page_reverse=mock.ANY)
 
     @mock.patch.object(driver_api.BGPVPNDriverRC,
                        'delete_port_assoc_precommit')
@@ -1318,13 +1868,16 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
             # Assert that existing bgpvpn and port-assoc remains
             list = self._list('bgpvpn/bgpvpns', fmt='json')
             bgpvpn['bgpvpn']['ports'] = [port_assoc['port_id']]
+            # the association bumped the revision number of the BGPVPN
+            bgpvpn['bgpvpn']['revision_number'] = 1
             self.assertEqual([bgpvpn['bgpvpn']], list['bgpvpns'])
 
     @mock.patch.object(driver_api.BGPVPNDriverRC,
                        'update_port_assoc_precommit')
     @mock.patch.object(driver_api.BGPVPNDriverRC,
                        'update_port_assoc_postcommit')
-    @mock.patch.object(bgpvpn_db.BGPVPNPluginDb, 'update_port_assoc')
+    @mock.patch.object(bgpvpn_db.BGPVPNPluginDb,
+                       'update_port_assoc_with_diff')
     def test_update_bgpvpn_port_assoc(self, mock_db_update,
                                       mock_postcommit, mock_precommit):
         with self.bgpvpn() as bgpvpn, \
@@ -1341,7 +1894,9 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
             changed = {'advertise_fixed_ips': False}
 
             new_port_assoc['port_association'].update(changed)
-            mock_db_update.return_value = new_port_assoc['port_association']
+            mock_db_update.return_value = (
+                assoc['port_association'],
+                new_port_assoc['port_association'], [], [])
 
             data = {"port_association": changed}
             self._update('bgpvpn/bgpvpns/%s/port_associations' % bgpvpn_id,
@@ -1363,6 +1918,31 @@ class TestBGPVPNServiceDriverDB(BgpvpnTestCaseMixin):
                 new_port_assoc['port_association']
                 )
 
+    @mock.patch.object(driver_api.BGPVPNDriverRC,
+                       'update_port_assoc_routes_postcommit')
+    def test_update_bgpvpn_port_assoc_routes(self, mock_routes_postcommit):
+        route_a = {'type': 'prefix', 'prefix': '12.1.0.0/16',
+                   'local_pref': None}
+        route_b = {'type': 'prefix', 'prefix': '14.0.0.0/8',
+                   'local_pref': None}
+        with self.bgpvpn() as bgpvpn, \
+                self.port(tenant_id=self._tenant_id) as port, \
+                self.assoc_port(bgpvpn['bgpvpn']['id'], port['port']['id'],
+                                routes=[route_a]) as assoc:
+            bgpvpn_id = bgpvpn['bgpvpn']['id']
+            self._update('bgpvpn/bgpvpns/%s/port_associations' % bgpvpn_id,
+                         assoc['port_association']['id'],
+                         {'port_association': {'routes': [route_b]}})
+            mock_routes_postcommit.assert_called_once_with(
+                mock.ANY, mock.ANY, [route_b], [route_a])
+
+            # no call if the routes do not change
+            mock_routes_postcommit.reset_mock()
+            self._update('bgpvpn/bgpvpns/%s/port_associations' % bgpvpn_id,
+                         assoc['port_association']['id'],
+                         {'port_association': {'advertise_fixed_ips': False}})
+            self.assertFalse(mock_routes_postcommit.called)
+
     @mock.patch.object(driver_api.BGPVPNDriverRC,
                        'delete_port_assoc_precommit')
     @mock.patch.object(driver_api.BGPVPNDriverRC,